@@ -0,0 +1,45 @@
+"""Add event outbox
+
+Revision ID: 3b7f1c2a9d40
+Revises: e49296d51c76
+Create Date: 2026-10-19 10:02:11.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7f1c2a9d40'
+down_revision: Union[str, Sequence[str], None] = 'e49296d51c76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('event_outbox',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('topic', sa.String(), nullable=False),
+    sa.Column('message_key', sa.String(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_on', sa.DateTime(), nullable=True),
+    sa.Column('sent_on', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_event_outbox_id'), 'event_outbox', ['id'], unique=False)
+    op.create_index(
+        'ix_event_outbox_unsent', 'event_outbox', ['id'], unique=False,
+        postgresql_where=sa.text('sent_on IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_outbox_unsent', table_name='event_outbox')
+    op.drop_index(op.f('ix_event_outbox_id'), table_name='event_outbox')
+    op.drop_table('event_outbox')
@@ -0,0 +1,48 @@
+"""Add link click tables
+
+Revision ID: 5d9e2f61a7c8
+Revises: 8c21d4e7b5a3
+Create Date: 2026-10-19 14:05:37.511920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9e2f61a7c8'
+down_revision: Union[str, Sequence[str], None] = '8c21d4e7b5a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('link_click_buckets',
+    sa.Column('short_link', sa.String(), nullable=False),
+    sa.Column('resolution', sa.String(length=8), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('clicks', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.PrimaryKeyConstraint('short_link', 'resolution', 'bucket_start')
+    )
+    op.create_index(
+        'ix_link_click_buckets_resolution_start', 'link_click_buckets',
+        ['resolution', 'bucket_start'], unique=False
+    )
+    op.create_table('link_click_breakdown',
+    sa.Column('short_link', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('clicks', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.PrimaryKeyConstraint('short_link', 'day', 'dimension', 'value')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('link_click_breakdown')
+    op.drop_index('ix_link_click_buckets_resolution_start', table_name='link_click_buckets')
+    op.drop_table('link_click_buckets')
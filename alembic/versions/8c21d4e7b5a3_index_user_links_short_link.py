@@ -0,0 +1,28 @@
+"""Index user_links.short_link
+
+Revision ID: 8c21d4e7b5a3
+Revises: 3b7f1c2a9d40
+Create Date: 2026-10-19 11:20:43.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c21d4e7b5a3'
+down_revision: Union[str, Sequence[str], None] = '3b7f1c2a9d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_user_links_short_link'), 'user_links', ['short_link'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_links_short_link'), table_name='user_links')
@@ -0,0 +1,33 @@
+"""Add link visitor sketches
+
+Revision ID: a4c8e3f05b16
+Revises: 5d9e2f61a7c8
+Create Date: 2026-10-19 16:42:08.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e3f05b16'
+down_revision: Union[str, Sequence[str], None] = '5d9e2f61a7c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('link_visitor_sketches',
+    sa.Column('short_link', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sketch', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('short_link', 'day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('link_visitor_sketches')
@@ -0,0 +1,36 @@
+"""Add kafka consumer checkpoints
+
+Revision ID: c2f7a91d3e58
+Revises: a4c8e3f05b16
+Create Date: 2026-10-19 18:27:51.630942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f7a91d3e58'
+down_revision: Union[str, Sequence[str], None] = 'a4c8e3f05b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('kafka_consumer_checkpoints',
+    sa.Column('group_id', sa.String(), nullable=False),
+    sa.Column('topic', sa.String(), nullable=False),
+    sa.Column('partition', sa.Integer(), nullable=False),
+    sa.Column('position', sa.BigInteger(), nullable=False),
+    sa.Column('done', sa.LargeBinary(), nullable=True),
+    sa.Column('updated_on', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('group_id', 'topic', 'partition')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('kafka_consumer_checkpoints')
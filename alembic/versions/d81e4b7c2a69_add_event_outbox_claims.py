@@ -0,0 +1,28 @@
+"""Add event outbox claims
+
+Revision ID: d81e4b7c2a69
+Revises: c2f7a91d3e58
+Create Date: 2026-10-19 20:05:13.418270
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81e4b7c2a69'
+down_revision: Union[str, Sequence[str], None] = 'c2f7a91d3e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('event_outbox', sa.Column('claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('event_outbox', 'claimed_until')
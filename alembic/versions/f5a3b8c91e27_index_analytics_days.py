@@ -0,0 +1,32 @@
+"""Index analytics tables by day for retention
+
+Revision ID: f5a3b8c91e27
+Revises: d81e4b7c2a69
+Create Date: 2026-10-19 22:41:07.615302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a3b8c91e27'
+down_revision: Union[str, Sequence[str], None] = 'd81e4b7c2a69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_link_click_buckets_bucket_start', 'link_click_buckets', ['bucket_start'], unique=False)
+    op.create_index('ix_link_click_breakdown_day', 'link_click_breakdown', ['day'], unique=False)
+    op.create_index('ix_link_visitor_sketches_day', 'link_visitor_sketches', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_link_visitor_sketches_day', table_name='link_visitor_sketches')
+    op.drop_index('ix_link_click_breakdown_day', table_name='link_click_breakdown')
+    op.drop_index('ix_link_click_buckets_bucket_start', table_name='link_click_buckets')
@@ -0,0 +1,55 @@
+"""
+Build the binary geo database used for click enrichment
+
+Input is a CSV of IP ranges: start, end, country code. Addresses may be
+dotted/colon notation or integers; a header row and # comments are
+skipped. IPv4 and IPv6 ranges can be mixed.
+
+Usage:
+    python -m app.cli.build_geoip ranges.csv data/geoip.bin
+    python -m app.cli.build_geoip ranges.csv data/geoip.bin --check 8.8.8.8 2001:4860::8888
+"""
+import argparse
+import os
+import sys
+import time
+
+from app.core.geoip import GeoDatabase, build_from_csv
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the binary geo database from a CSV of IP ranges")
+    parser.add_argument("csv_path", help="CSV of start,end,country rows")
+    parser.add_argument("output", help="binary database to write")
+    parser.add_argument("--check", nargs="*", default=[], help="addresses to look up in the result")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{args.output}.tmp"
+
+    start = time.perf_counter()
+    try:
+        v4, v6 = build_from_csv(args.csv_path, temp_path)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    os.replace(temp_path, args.output)
+    print(f"wrote {v4} IPv4 and {v6} IPv6 ranges to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KiB) in {time.perf_counter() - start:.1f}s")
+
+    if args.check:
+        database = GeoDatabase(args.output)
+        for ip in args.check:
+            print(f"  {ip:<40} {database.country(ip) or '-'}")
+        database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
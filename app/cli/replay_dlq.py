@@ -0,0 +1,138 @@
+"""
+Replay a dead-letter topic in bulk
+
+Messages are republished unchanged (key, value and the x-original-* /
+x-error* headers) to their original topic, or to --to, with the retry
+counter cleared, so every replayed message gets the full retry policy
+again. Only messages present when the tool starts are replayed: anything
+that fails again and lands back in the DLQ is left for the next run.
+
+Progress is committed per batch under --group, so an interrupted replay
+resumes where it stopped. Messages passed over by --error-type count as
+progress too; replay those under another --group.
+
+Usage:
+    python -m app.cli.replay_dlq orders --dry-run
+    python -m app.cli.replay_dlq orders --error-type TimeoutError --limit 1000
+    python -m app.cli.replay_dlq orders --to orders.reprocess
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from typing import Dict
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
+
+from app.config import settings
+from app.core.kafka_retry import (
+    HEADER_ERROR_TYPE,
+    HEADER_ORIGINAL_TOPIC,
+    ROUTING_HEADERS,
+    RetryPolicy,
+    decode_headers,
+    encode_headers,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the dead-letter topic of a Kafka topic")
+    parser.add_argument("topic", help="source topic whose dead letters to replay")
+    parser.add_argument("--to", help="publish here instead of each message's original topic")
+    parser.add_argument("--group", default="shortify-dlq-replay", help="consumer group tracking replay progress")
+    parser.add_argument("--error-type", action="append", default=[],
+                        help="only replay messages that failed with this exception type (repeatable)")
+    parser.add_argument("--limit", type=int, default=0, help="stop after replaying this many messages")
+    parser.add_argument("--batch", type=int, default=500, help="messages published per batch")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be replayed; commit nothing")
+    return parser.parse_args(argv)
+
+
+async def replay(args) -> Dict[str, int]:
+    dead_letter_topic = RetryPolicy.from_settings().dead_letter_topic(args.topic)
+    consumer = AIOKafkaConsumer(
+        bootstrap_servers=settings.kafka_broker,
+        group_id=args.group,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest"
+    )
+    producer = AIOKafkaProducer(bootstrap_servers=settings.kafka_broker)
+    await consumer.start()
+    if not args.dry_run:
+        await producer.start()
+
+    stats: Counter = Counter()
+    try:
+        await consumer.topics()
+        partitions = consumer.partitions_for_topic(dead_letter_topic) or set()
+        assigned = [TopicPartition(dead_letter_topic, partition) for partition in sorted(partitions)]
+        if not assigned:
+            print(f"error: topic {dead_letter_topic} not found", file=sys.stderr)
+            return stats
+        consumer.assign(assigned)
+        # Snapshot of the end: messages dead-lettered during the replay wait for the next run
+        end_offsets = await consumer.end_offsets(assigned)
+
+        async def remaining() -> bool:
+            for tp in assigned:
+                if await consumer.position(tp) < end_offsets[tp]:
+                    return True
+            return False
+
+        limit_reached = False
+        while not limit_reached and await remaining():
+            batches = await consumer.getmany(timeout_ms=1000, max_records=args.batch)
+            futures = []
+            handled: Dict[TopicPartition, int] = {}
+            for tp, messages in batches.items():
+                for msg in messages:
+                    if msg.offset >= end_offsets[tp]:
+                        break
+                    if args.limit and stats["replayed"] >= args.limit:
+                        limit_reached = True
+                        break
+                    handled[tp] = msg.offset + 1
+                    headers = decode_headers(msg.headers)
+                    error_type = headers.get(HEADER_ERROR_TYPE, "unknown")
+                    if args.error_type and error_type not in args.error_type:
+                        stats["skipped"] += 1
+                        continue
+                    stats["replayed"] += 1
+                    stats[f"error:{error_type}"] += 1
+                    if args.dry_run:
+                        continue
+                    for header in ROUTING_HEADERS:
+                        headers.pop(header, None)
+                    headers["x-replayed-at"] = f"{time.time():.3f}"
+                    destination = args.to or headers.get(HEADER_ORIGINAL_TOPIC) or args.topic
+                    futures.append(await producer.send(
+                        destination, msg.value, key=msg.key, headers=encode_headers(headers)
+                    ))
+            if futures:
+                # Everything acknowledged before the batch is committed
+                await asyncio.gather(*futures)
+            if handled and not args.dry_run:
+                await consumer.commit(handled)
+    finally:
+        await consumer.stop()
+        if not args.dry_run:
+            await producer.stop()
+    return stats
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    start = time.perf_counter()
+    stats = asyncio.run(replay(args))
+    verb = "would replay" if args.dry_run else "replayed"
+    print(f"{verb} {stats['replayed']} messages, skipped {stats['skipped']} "
+          f"in {time.perf_counter() - start:.1f}s")
+    for key, count in sorted(stats.items()):
+        if key.startswith("error:"):
+            print(f"  {key[6:]:<40} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
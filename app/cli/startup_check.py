@@ -0,0 +1,86 @@
+"""
+Startup gate for CI
+
+Fails (exit status 1) when importing the app in a fresh interpreter
+
+    - takes longer than --budget-ms (best of --runs), or
+    - imports a module that is only needed once the service runs
+      (aiokafka by default, see --forbid), or
+    - creates a SQLAlchemy engine.
+
+Usage:
+    python -m app.cli.startup_check --budget-ms 1500
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from app.cli.startup_report import _import_once
+
+
+# Counts create_engine calls made while importing the module, then reports
+# which of the forbidden modules ended up loaded
+_PROBE = """
+import json, sys
+calls = []
+try:
+    import sqlalchemy
+    _create_engine = sqlalchemy.create_engine
+    def create_engine(*args, **kwargs):
+        calls.append(repr(args[0]) if args else "")
+        return _create_engine(*args, **kwargs)
+    sqlalchemy.create_engine = create_engine
+except ImportError:
+    pass
+import {module}
+print(json.dumps({{
+    "engines": calls,
+    "forbidden": [name for name in {forbidden!r} if name in sys.modules],
+}}))
+"""
+
+
+def _probe(module: str, forbidden) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, forbidden=list(forbidden))],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when importing the app is slow or does runtime work")
+    parser.add_argument("--module", default="app.main", help="module to import")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to time (best is checked)")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="longest allowed import")
+    parser.add_argument("--forbid", nargs="*", default=["aiokafka"], help="modules the import must not load")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    failures = []
+
+    best_wall = min(_import_once(args.module)[0] for _ in range(max(1, args.runs)))
+    if best_wall > args.budget_ms:
+        failures.append(f"import {args.module} took {best_wall:.1f} ms, budget {args.budget_ms:.1f} ms")
+
+    probe = _probe(args.module, args.forbid)
+    for name in probe["forbidden"]:
+        failures.append(f"import {args.module} loaded {name}")
+    for engine in probe["engines"]:
+        failures.append(f"import {args.module} called sqlalchemy.create_engine({engine})")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        return 1
+    print(f"OK: import {args.module} in {best_wall:.1f} ms, no runtime-only work")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
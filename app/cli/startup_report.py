@@ -0,0 +1,102 @@
+"""
+Startup (import-time) report for the application
+
+Imports the app in fresh interpreters with `python -X importtime` and
+summarizes where the time goes: slowest modules by self and cumulative
+time, and self time grouped by top-level package.
+
+Usage:
+    python -m app.cli.startup_report
+    python -m app.cli.startup_report --runs 5 --top 30 --budget-ms 1500
+
+With --budget-ms the command exits non-zero when the best run exceeds the
+budget, so it can gate CI against startup regressions.
+"""
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _import_once(module: str) -> Tuple[float, List[Tuple[int, int, int, str]]]:
+    """
+    Import `module` in a fresh interpreter
+
+    Returns:
+        Wall time of the import in ms, and (self us, cumulative us, depth, name)
+        for every module imported
+    """
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - start) * 1000)"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return float(completed.stdout.strip().splitlines()[-1]), rows
+
+
+def _by_package(rows: List[Tuple[int, int, int, str]]) -> Dict[str, int]:
+    totals: Dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in rows:
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Report application import/startup time")
+    parser.add_argument("--module", default="app.main", help="module to import")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to try (best is reported)")
+    parser.add_argument("--top", type=int, default=20, help="modules to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when the import takes longer")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    runs = [_import_once(args.module) for _ in range(max(1, args.runs))]
+    wall_times = [wall for wall, _ in runs]
+    best_wall, rows = min(runs, key=lambda run: run[0])
+
+    print(f"import {args.module}: best {best_wall:.1f} ms, "
+          f"worst {max(wall_times):.1f} ms over {len(runs)} run(s), {len(rows)} modules")
+
+    print(f"\nslowest by cumulative time (top {args.top})")
+    for self_us, cumulative_us, depth, name in sorted(rows, key=lambda row: -row[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:>9.1f} ms  {'  ' * min(depth, 6)}{name}")
+
+    print(f"\nslowest by self time (top {args.top})")
+    for self_us, _, _, name in sorted(rows, key=lambda row: -row[0])[:args.top]:
+        print(f"  {self_us / 1000:>9.1f} ms  {name}")
+
+    print("\nself time by top-level package")
+    for package, self_us in sorted(_by_package(rows).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:>9.1f} ms  {package}")
+
+    if args.budget_ms is not None:
+        if best_wall > args.budget_ms:
+            print(f"\nFAIL: startup {best_wall:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+            return 1
+        print(f"\nOK: startup {best_wall:.1f} ms within budget {args.budget_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,27 @@
 from app.config.db_config import MySQLSettingsR, MySQLSettingsW
+from app.config.analytics_config import AnalyticsSettings
 from app.config.api_config import APISettings
+from app.config.cache_config import CacheSettings
+from app.config.export_config import ExportSettings
+from app.config.kafka_config import KafkaSettings
+from app.config.observability_config import ObservabilitySettings
+from functools import lru_cache
 from app.constants import Environments
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    database_w: MySQLSettingsW = MySQLSettingsW()
-    database_r: MySQLSettingsR = MySQLSettingsR()
-    api: APISettings = APISettings()
+    # Factories, so the nested settings read their env files when Settings()
+    # is built rather than when this module is imported
+    database_w: MySQLSettingsW = Field(default_factory=MySQLSettingsW)
+    database_r: MySQLSettingsR = Field(default_factory=MySQLSettingsR)
+    api: APISettings = Field(default_factory=APISettings)
+    kafka: KafkaSettings = Field(default_factory=KafkaSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    export: ExportSettings = Field(default_factory=ExportSettings)
+    analytics: AnalyticsSettings = Field(default_factory=AnalyticsSettings)
+    observability: ObservabilitySettings = Field(default_factory=ObservabilitySettings)
     env: str = Environments.local
     kafka_broker: str = "localhost:9092"
     # KAFKA_CONFIG: dict = {
@@ -35,4 +49,9 @@ class Settings(BaseSettings):
         }
 
 
-settings = Settings()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
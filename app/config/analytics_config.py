@@ -0,0 +1,63 @@
+from typing import Dict, List
+from pydantic_settings import BaseSettings
+
+
+class AnalyticsSettings(BaseSettings):
+    """Click analytics settings
+
+    Args:
+        BaseSettings (BaseSettings): Base Class
+    """
+
+    # Redirects publish click events (needs KAFKA_ENABLED)
+    enabled: bool = False
+    clicks_topic: str = "shortify.clicks"
+    clicks_group: str = "shortify-analytics"
+    # Click events buffered in-process before new ones are dropped
+    publish_buffer: int = 20000
+    publish_batch: int = 500
+    publish_interval: float = 0.2
+    consume_max_records: int = 2000
+
+    # Built with `python -m app.cli.build_geoip`; empty disables geo lookups
+    geoip_path: str = "data/geoip.bin"
+    # Distinct user agents / referrers memoized by the click classifier
+    classifier_cache_size: int = 20000
+    # Referrer hosts counted as internal traffic
+    internal_domains: List[str] = []
+    # Unique-visitor sketches: 2^p registers, ~1.04/sqrt(2^p) standard error
+    hll_precision: int = 12
+    # Longest date range a unique-visitor query may merge
+    visitors_max_days: int = 366
+
+    # Trending links: every process reads all of the click topic, without a group
+    trending_enabled: bool = True
+    trending_slice_seconds: int = 60
+    trending_window_minutes: int = 60
+    # Links tracked per slice; more means smaller over-counts
+    trending_capacity: int = 2000
+    trending_max_top: int = 100
+    # Trending links loaded into the redirect cache, and how often
+    trending_warm_count: int = 200
+    trending_warm_interval: float = 30.0
+
+    # Minute buckets are rolled up into hours after this many hours, hours
+    # into days after this many days
+    rollup_minutes_hours: int = 48
+    rollup_hours_days: int = 30
+    rollup_enabled: bool = True
+    rollup_interval: float = 300.0
+    rollup_batch_size: int = 20000
+    # Batches per step and pass, so one pass cannot run unbounded
+    rollup_max_batches: int = 50
+    # Days of click history kept, by subscription_mode; FREE applies to
+    # users without an active subscription
+    retention_days: Dict[str, int] = {"FREE": 90, "TRIAL": 90, "PREMIUM": 730, "ENTERPRISE": 1825}
+    # Most points a click series returns before a coarser resolution is used
+    series_max_points: int = 500
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "ANALYTICS_"
+        validate_by_name = True
+        extra = "ignore"
@@ -1,11 +1,23 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class APISettings(BaseSettings):
     PROJECT_NAME: str = "shortify"
     PROJECT_VERSION: str = "1.0.0"
     origins: str = "*"
-    
+    # Seconds allowed for the lifespan startup (DBs, Kafka, cache warm-up)
+    # and for draining requests / flushing producers on shutdown
+    startup_timeout: float = 30.0
+    shutdown_timeout: float = 15.0
+    # Seconds between SIGTERM (readiness turns 503) and the listener closing,
+    # so load balancers stop routing first; 0 closes it at once
+    drain_delay: float = 5.0
+    # Bearer token of operator-only endpoints (admin, analytics, exports);
+    # empty refuses every request to them
+    admin_token: str = ""
+    # Addresses / CIDR ranges of reverse proxies whose X-Forwarded-For is
+    # believed; from anyone else the header is ignored
+    trusted_proxies: List[str] = []
 
     class Config:
         env_file = ".env"
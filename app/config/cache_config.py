@@ -0,0 +1,36 @@
+from pydantic_settings import BaseSettings
+
+
+class CacheSettings(BaseSettings):
+    """In-process cache settings
+
+    Args:
+        BaseSettings (BaseSettings): Base Class
+    """
+
+    redirect_maxsize: int = 100000
+    redirect_ttl: float = 300.0
+    # Unknown short links are remembered briefly so scans don't hit the DB
+    redirect_negative_ttl: float = 5.0
+    warmup_limit: int = 10000
+
+    # Redirect cache snapshot mapped on boot; an empty path disables it
+    snapshot_path: str = "cache/redirect-cache.snap"
+    snapshot_interval: float = 60.0
+    # Older snapshots are ignored. Either way an entry is served from a
+    # snapshot for at most redirect_ttl after it was written, the staleness
+    # the live cache allows
+    snapshot_max_age: float = 900.0
+
+    # Redirect table shared by the uvicorn workers of one node
+    shared_table_enabled: bool = False
+    shared_table_name: str = "shortify-redirects"
+    shared_table_slots: int = 65536
+    # Links longer than the slot (minus a 36 byte header) stay process-local
+    shared_table_slot_size: int = 256
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "CACHE_"
+        validate_by_name = True
+        extra = "ignore"
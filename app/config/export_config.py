@@ -0,0 +1,37 @@
+from typing import Dict
+from pydantic import model_validator
+from pydantic_settings import BaseSettings
+
+
+class ExportSettings(BaseSettings):
+    """Bulk export settings
+
+    Args:
+        BaseSettings (BaseSettings): Base Class
+    """
+
+    # Concurrent exports allowed per user, by subscription_mode; plans not
+    # listed (and users without an active subscription) may not export
+    plan_concurrency: Dict[str, int] = {"ENTERPRISE": 3, "PREMIUM": 1}
+    # Exports read through their own small pool (database_export), so
+    # long downloads never take connections from the request path
+    pool_size: int = 3
+    # Concurrent exports per process, across all users. Each one holds a
+    # pool connection for the whole download, so this can't exceed pool_size
+    max_concurrent: int = 3
+    chunk_size: int = 64 * 1024
+    gzip_level: int = 6
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "EXPORT_"
+        validate_by_name = True
+        extra = "ignore"
+
+    @model_validator(mode="after")
+    def _check_pool_size(self):
+        if self.max_concurrent > self.pool_size:
+            raise ValueError(
+                f"EXPORT_MAX_CONCURRENT ({self.max_concurrent}) exceeds EXPORT_POOL_SIZE ({self.pool_size})"
+            )
+        return self
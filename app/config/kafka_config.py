@@ -0,0 +1,76 @@
+from typing import Dict
+from pydantic_settings import BaseSettings
+
+
+class KafkaSettings(BaseSettings):
+    """Kafka tuning knobs (producer, consumers and the event outbox)
+
+    Args:
+        BaseSettings (BaseSettings): Base Class
+    """
+
+    # Off by default so the API can run without a broker
+    enabled: bool = False
+    # Topic -> consumer group started by the KafkaManager
+    topic_group_map: Dict[str, str] = {}
+
+    outbox_batch_size: int = 200
+    outbox_poll_interval: float = 0.5
+    outbox_max_attempts: int = 10
+    # Lease on a claimed batch; must exceed the time it takes to publish it
+    outbox_claim_seconds: float = 30.0
+
+    # Cache invalidation bus; every process reads all of it, without a group
+    invalidation_topic: str = "shortify.cache-invalidation"
+    invalidation_max_records: int = 1000
+    # Keys carried per event, and evicted per event loop slice
+    invalidation_chunk_size: int = 500
+
+    # Consumers of topic_group_map: failed messages are retried on
+    # <topic><retry_topic_suffix>-<n> after retry_backoff * 2^(n-1) seconds
+    # (at most retry_max_backoff, which must stay below the consumer's
+    # max.poll.interval.ms), then sent to <topic><dead_letter_suffix>
+    retry_attempts: int = 3
+    retry_backoff: float = 5.0
+    retry_max_backoff: float = 120.0
+    retry_topic_suffix: str = ".retry"
+    dead_letter_suffix: str = ".dlq"
+    # Tries at forwarding a failed message to its retry or dead-letter topic
+    # before its slot is given back; its offset then stays uncommitted, so
+    # it is read again after the next rebalance or restart
+    forward_attempts: int = 3
+
+    # Flow control of the same consumers: every lag_sample_interval seconds
+    # lag is sampled and the in-flight handler limit (between min_ and
+    # max_concurrency) halved while smoothed handler latency is above
+    # latency_target, or raised while lag is above lag_scale_up
+    lag_sample_interval: float = 5.0
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+    latency_target: float = 0.5
+    lag_scale_up: int = 100
+    # Fetching pauses while a database pool has this fraction of its
+    # maximum size checked out and no idle connection; pause_interval is
+    # also the poll timeout while messages are in flight
+    pool_saturation: float = 0.9
+    pause_interval: float = 0.2
+    # A partition stops fetching while more than this many offsets lie
+    # between its oldest unfinished message and its newest one (finished
+    # messages above a stuck one are held in memory); 0 disables
+    max_done_span: int = 10_000
+    # /health-check reports unhealthy above this partition lag; 0 never does
+    lag_unhealthy: int = 0
+
+    # Skip messages redelivered after a crash or rebalance (per-partition
+    # checkpoints in kafka_consumer_checkpoints) and outbox events
+    # republished within the last dedup_window event ids; dedup_error_rate
+    # only sizes the Bloom filter in front of the exact id set
+    dedup_enabled: bool = True
+    dedup_window: int = 100_000
+    dedup_error_rate: float = 0.001
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "KAFKA_"
+        validate_by_name = True
+        extra = "ignore"
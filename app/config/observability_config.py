@@ -0,0 +1,43 @@
+from typing import Any, Dict
+from pydantic_settings import BaseSettings
+
+
+class ObservabilitySettings(BaseSettings):
+    """Logging, metrics and profiling settings
+
+    Args:
+        BaseSettings (BaseSettings): Base Class
+    """
+
+    log_level: str = "INFO"
+    log_queue: bool = True
+    log_json: bool = False
+    # Logger name -> filter options, see app.core.logging_config.setup_logging
+    log_filters: Dict[str, Dict[str, Any]] = {
+        "app.core.kafka_manager": {"rate_limit": 100, "burst": 200},
+        "app.core.dispatcher": {"rate_limit": 100, "burst": 200},
+        "app.utils.base_exception": {"dedupe_window": 10},
+    }
+
+    metrics_enabled: bool = True
+
+    server_timing_enabled: bool = True
+    # Requests sending `profile_header: <profile_token>` are profiled; an
+    # empty token disables header-triggered profiling
+    profile_header: str = "X-Profile"
+    profile_token: str = ""
+    profile_sample_rate: float = 0.0
+    profile_interval: float = 0.005
+    profile_dir: str = "profiles"
+
+    query_stats_enabled: bool = True
+    query_stats_max_fingerprints: int = 1000
+    slow_query_threshold_ms: float = 250.0
+    # /admin/* routes; they also require API_ADMIN_TOKEN
+    admin_endpoints_enabled: bool = False
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "OBS_"
+        validate_by_name = True
+        extra = "ignore"
@@ -0,0 +1,32 @@
+"""
+Operator authentication
+
+There are no user accounts yet. Endpoints that expose analytics, exports
+or internals take the user from the URL, so they are for operators, who
+send `Authorization: Bearer <API_ADMIN_TOKEN>`. With no token configured
+every such request is refused.
+"""
+import hmac
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import Header
+
+from app.config import settings
+from app.messages.global_messages import ADMIN_UNAUTHORIZED
+from app.utils.base_exception import AppException
+
+
+async def require_admin(authorization: Optional[str] = Header(default=None)):
+    """Route dependency; raises 401 unless the admin bearer token is sent"""
+    token = settings.api.admin_token
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if (
+        not token
+        or scheme.lower() != "bearer"
+        or not hmac.compare_digest(credentials.strip().encode("utf-8"), token.encode("utf-8"))
+    ):
+        raise AppException(
+            message=ADMIN_UNAUTHORIZED,
+            status_code=HTTPStatus.UNAUTHORIZED
+        )
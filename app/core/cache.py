@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.core.metrics import REGISTRY
+
+
+# Stored for keys known not to exist (negative caching)
+NOT_FOUND = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry expiry
+
+    Meant for the event loop thread only, so it takes no locks.
+
+    Args:
+        maxsize: Entries kept before the least recently used is evicted
+        ttl: Default seconds an entry stays valid
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Live entry for `key`; unlike get() this neither reorders nor counts"""
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def delete(self, key: Hashable) -> bool:
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def items(self) -> Iterator[Tuple[Hashable, Any, float]]:
+        """(key, value, seconds left) for live entries, most recently used last"""
+        now = time.monotonic()
+        for key, (expires_at, value) in list(self._data.items()):
+            if expires_at > now:
+                yield key, value, expires_at - now
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# short_link -> (destination, expiry epoch seconds or None)
+redirect_cache = TTLCache(maxsize=settings.cache.redirect_maxsize, ttl=settings.cache.redirect_ttl)
+
+_caches = {"redirect": redirect_cache}
+
+REGISTRY.gauge(
+    "cache_entries", "Entries held by the in-process caches", ("cache",),
+    callback=lambda: (((name,), len(cache)) for name, cache in _caches.items())
+)
+REGISTRY.gauge(
+    "cache_lookups", "Cache lookups since start by result", ("cache", "result"),
+    callback=lambda: (
+        sample
+        for name, cache in _caches.items()
+        for sample in (((name, "hit"), cache.hits), ((name, "miss"), cache.misses))
+    )
+)
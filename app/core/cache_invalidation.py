@@ -0,0 +1,73 @@
+"""
+Cross-node cache invalidation over Kafka
+
+Writers stage the short links they changed with `invalidation_events`
+(normally through the outbox, in the same transaction as the change).
+Every process reads all partitions of the topic without a consumer group
+(nothing to commit, no group left behind on restart) and evicts
+the keys from all of its local caches: the in-process TTL caches, the boot
+snapshot and, on the owning worker, the shared-memory table.
+"""
+import asyncio
+from typing import Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.core.cache import _caches
+from app.core.cache_snapshot import redirect_snapshot
+from app.core.logging_config import get_logger
+from app.core.metrics import REGISTRY
+from app.core.shared_table import shared_redirects
+
+logger = get_logger(__name__)
+
+
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    "cache_invalidations_total", "Keys evicted from local caches by invalidation events"
+)
+
+
+def invalidation_events(short_links: Iterable[str]) -> List[Tuple[str, Optional[str], dict]]:
+    """
+    (topic, key, value) messages invalidating `short_links`
+
+    Keys are packed into as few events as possible, so a mass update
+    publishes a handful of messages instead of one per row.
+    """
+    keys = list(dict.fromkeys(short_links))
+    size = settings.kafka.invalidation_chunk_size
+    return [
+        (settings.kafka.invalidation_topic, None, {"keys": keys[start:start + size]})
+        for start in range(0, len(keys), size)
+    ]
+
+
+def evict_local(keys: Iterable[str]) -> int:
+    """Drop `keys` from every cache held by this process"""
+    evicted = 0
+    for key in keys:
+        for cache in _caches.values():
+            cache.delete(key)
+        redirect_snapshot.discard(key)
+        if shared_redirects is not None:
+            shared_redirects.delete(key)
+        evicted += 1
+    CACHE_INVALIDATIONS.inc(evicted)
+    return evicted
+
+
+async def handle_invalidations(payloads: List[dict]):
+    """Batch handler: coalesce the keys of every polled event, then evict"""
+    keys = set()
+    for payload in payloads:
+        keys.update(payload.get("keys") or ())
+    if not keys:
+        return
+
+    # Evict in slices so a mass invalidation doesn't stall request handling
+    keys = list(keys)
+    size = settings.kafka.invalidation_chunk_size
+    for start in range(0, len(keys), size):
+        evict_local(keys[start:start + size])
+        await asyncio.sleep(0)
+    logger.debug("Evicted %s keys from %s invalidation events", len(keys), len(payloads))
+
@@ -0,0 +1,271 @@
+"""
+Binary snapshots of the redirect cache
+
+A snapshot lets a freshly started process serve hot links before its first
+database query. Layout (little endian):
+
+    header   magic, version, count, blob size, written_at (epoch seconds)
+    hashes   count x uint64, sorted ascending
+    records  count x (blob offset uint64, code length uint32,
+                      destination length uint32, expires_at float64)
+    blob     short codes and destinations, UTF-8, back to back
+
+Record i belongs to hashes[i]. Lookups binary search the hashes straight
+out of the memory map, so loading costs one mmap call regardless of size.
+expires_at is NaN for links without an expiry.
+"""
+import asyncio
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+from typing import Iterable, Optional, Tuple
+
+from app.core.cache import NOT_FOUND, TTLCache
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+MAGIC = b"SHRTSNAP"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQd")
+_RECORD = struct.Struct("<QIId")
+
+
+def code_hash(code: bytes) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)"""
+    return int.from_bytes(blake2b(code, digest_size=8).digest(), "little")
+
+
+def write_snapshot(path: str, entries: Iterable[Tuple[str, Tuple[str, Optional[float]]]]) -> int:
+    """
+    Write (short_link, (destination, expires_at)) pairs to `path`
+
+    The file is written next to the target and renamed over it, so readers
+    never see a partial snapshot and existing maps stay valid.
+
+    Returns:
+        Number of entries written
+    """
+    rows = []
+    for code, (destination, expires_at) in entries:
+        code_bytes = code.encode("utf-8")
+        rows.append((code_hash(code_bytes), code_bytes, destination.encode("utf-8"), expires_at))
+    rows.sort(key=lambda row: row[0])
+
+    hashes = array("Q", (row[0] for row in rows))
+    records = bytearray(_RECORD.size * len(rows))
+    blob = bytearray()
+    for index, (_, code_bytes, destination_bytes, expires_at) in enumerate(rows):
+        _RECORD.pack_into(
+            records, index * _RECORD.size,
+            len(blob), len(code_bytes), len(destination_bytes),
+            math.nan if expires_at is None else expires_at
+        )
+        blob += code_bytes
+        blob += destination_bytes
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, len(rows), len(blob), time.time()))
+        file.write(hashes.tobytes())
+        file.write(records)
+        file.write(blob)
+    os.replace(temp_path, path)
+    return len(rows)
+
+
+class CacheSnapshot:
+    """
+    Read-only view over a memory-mapped snapshot
+
+    The whole snapshot is treated as stale once it is older than `max_age`
+    seconds; `get` then returns None for everything.
+    """
+
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, version, self.count, blob_size, self.written_at = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} redirect snapshot")
+
+        hashes_start = _HEADER.size
+        self._records_start = hashes_start + 8 * self.count
+        self._blob_start = self._records_start + _RECORD.size * self.count
+        if self._blob_start + blob_size > len(self._map):
+            self.close()
+            raise ValueError(f"{path} is truncated")
+        self._view = memoryview(self._map)
+        self._hashes = self._view[hashes_start:self._records_start].cast("Q")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def seconds_left(self) -> float:
+        """Seconds until the snapshot as a whole goes stale"""
+        return self.written_at + self.max_age - time.time()
+
+    def get(self, code: str) -> Optional[Tuple[str, Optional[float]]]:
+        """(destination, expires_at) for `code`, or None if absent or stale"""
+        if self._map is None or self.seconds_left() <= 0:
+            return None
+
+        code_bytes = code.encode("utf-8")
+        key = code_hash(code_bytes)
+        index = bisect_left(self._hashes, key)
+        while index < self.count and self._hashes[index] == key:
+            offset, code_length, destination_length, expires_at = _RECORD.unpack_from(
+                self._map, self._records_start + index * _RECORD.size
+            )
+            start = self._blob_start + offset
+            if self._map[start:start + code_length] == code_bytes:
+                destination = self._map[start + code_length:start + code_length + destination_length]
+                return destination.decode("utf-8"), None if math.isnan(expires_at) else expires_at
+            index += 1
+        return None
+
+    def close(self):
+        if self._map is not None:
+            # Views must be released before the map can be closed
+            for view in (getattr(self, "_hashes", None), getattr(self, "_view", None)):
+                if view is not None:
+                    view.release()
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class SnapshotStore:
+    """Holds the snapshot loaded at boot, if any"""
+
+    def __init__(self):
+        self.snapshot: Optional[CacheSnapshot] = None
+        # Codes invalidated since the snapshot was written
+        self._discarded = set()
+
+    def load(self, path: str, max_age: float) -> int:
+        """
+        Map the snapshot at `path`; missing, corrupt or stale files are ignored
+
+        Returns:
+            Number of entries available
+        """
+        self.close()
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            snapshot = CacheSnapshot(path, max_age)
+        except (OSError, ValueError, struct.error):
+            logger.warning("Ignoring unreadable redirect cache snapshot %s", path, exc_info=True)
+            return 0
+        if snapshot.seconds_left() <= 0:
+            logger.info("Redirect cache snapshot %s is stale, ignoring it", path)
+            snapshot.close()
+            return 0
+        self.snapshot = snapshot
+        logger.info("Mapped redirect cache snapshot with %s links", len(snapshot))
+        return len(snapshot)
+
+    def get(self, code: str) -> Optional[Tuple[str, Optional[float]]]:
+        if self.snapshot is None or code in self._discarded:
+            return None
+        return self.snapshot.get(code)
+
+    def discard(self, code: str):
+        if self.snapshot is not None:
+            self._discarded.add(code)
+
+    def seconds_left(self) -> float:
+        return self.snapshot.seconds_left() if self.snapshot is not None else 0.0
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+        self._discarded.clear()
+
+
+class SnapshotWriter:
+    """
+    Periodically writes the live entries of a TTLCache to disk
+
+    With a shared redirect table only its owner writes, and the snapshot
+    includes the table's entries.
+    """
+
+    def __init__(self, cache: TTLCache, path: str, interval: float, shared=None):
+        self.cache = cache
+        self.path = path
+        self.interval = interval
+        self.shared = shared
+        self.task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def write(self) -> int:
+        if self.shared is not None and not self.shared.is_owner:
+            return 0
+        # Copy on the loop thread (the caches are not thread safe), pack off it
+        now = time.time()
+        sources = [self.cache.items()]
+        if self.shared is not None:
+            sources.append(self.shared.items())
+        entries = dict(
+            (key, value)
+            for source in sources
+            for key, value, _ in source
+            if value is not NOT_FOUND and (value[1] is None or value[1] > now)
+        )
+        entries = list(entries.items())
+        written = await asyncio.to_thread(write_snapshot, self.path, entries)
+        logger.debug("Wrote redirect cache snapshot with %s links", written)
+        return written
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.write()
+            except Exception:
+                logger.warning("Writing redirect cache snapshot failed", exc_info=True)
+
+    async def start(self):
+        if self.task:
+            return
+        self._stopping.clear()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self, final_write: bool = True):
+        """Stop the loop and write one last snapshot for the next process"""
+        if self.task:
+            self._stopping.set()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if final_write:
+            try:
+                await self.write()
+            except Exception:
+                logger.warning("Writing redirect cache snapshot failed", exc_info=True)
+
+
+redirect_snapshot = SnapshotStore()
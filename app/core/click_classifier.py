@@ -0,0 +1,180 @@
+"""
+Referrer and user-agent classification for click events
+
+Rule sets are compiled once at import. The same few thousand user agents
+and referrers account for almost all clicks, so results are memoized in
+bounded LRU caches keyed by the raw string, and the batch API parses each
+distinct string in a batch only once.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.config import settings
+
+
+class UserAgentInfo(NamedTuple):
+    browser: str
+    os: str
+    device: str
+    is_bot: bool
+
+
+class ReferrerInfo(NamedTuple):
+    domain: str
+    source: str
+
+
+UNKNOWN = "unknown"
+DIRECT = ReferrerInfo("direct", "direct")
+_UNKNOWN_AGENT = UserAgentInfo(UNKNOWN, UNKNOWN, UNKNOWN, False)
+
+# Order matters: several browsers also claim to be Chrome/Safari
+_BROWSER_RULES: Tuple[Tuple[str, "re.Pattern"], ...] = tuple(
+    (name, re.compile(pattern)) for name, pattern in (
+        ("Edge", r"Edg(?:e|A|iOS)?/"),
+        ("Opera", r"OPR/|Opera"),
+        ("Samsung Internet", r"SamsungBrowser/"),
+        ("Yandex", r"YaBrowser/"),
+        ("Firefox", r"Firefox/|FxiOS/"),
+        ("Chrome", r"Chrome/|CriOS/"),
+        ("Safari", r"Version/[\d.]+.*Safari/"),
+        ("Internet Explorer", r"MSIE |Trident/"),
+    )
+)
+
+_OS_RULES: Tuple[Tuple[str, "re.Pattern"], ...] = tuple(
+    (name, re.compile(pattern)) for name, pattern in (
+        ("iOS", r"iPhone|iPad|iPod"),
+        ("Android", r"Android"),
+        ("Windows", r"Windows"),
+        ("macOS", r"Mac OS X|Macintosh"),
+        ("ChromeOS", r"CrOS"),
+        ("Linux", r"Linux"),
+    )
+)
+
+_BOT_PATTERN = re.compile(
+    r"bot\b|bot/|crawl|spider|slurp|facebookexternalhit|embedly|preview|"
+    r"curl/|wget/|python-requests|python-urllib|httpclient|go-http-client|"
+    r"headless|phantomjs|lighthouse|monitor|pingdom|uptime",
+    re.IGNORECASE
+)
+_TABLET_PATTERN = re.compile(r"iPad|Tablet|Android(?!.*Mobile)")
+_MOBILE_PATTERN = re.compile(r"Mobi|iPhone|iPod|Android.*Mobile")
+
+# Registrable-domain fragments -> traffic source
+_REFERRER_SOURCES: Dict[str, str] = {
+    "google": "search", "bing": "search", "duckduckgo": "search", "yahoo": "search",
+    "baidu": "search", "yandex": "search", "ecosia": "search",
+    "facebook": "social", "fb": "social", "instagram": "social", "twitter": "social",
+    "x": "social", "t": "social", "linkedin": "social", "lnkd": "social",
+    "reddit": "social", "pinterest": "social", "tiktok": "social", "youtube": "social",
+    "whatsapp": "social", "telegram": "social",
+    "mail": "email", "outlook": "email", "gmail": "email",
+}
+
+# Hosts (and their subdomains) matched before the registrable domain, for
+# services whose webmail shares a domain with their search or social site
+_REFERRER_HOSTS: Dict[str, str] = {
+    "mail.google.com": "email", "inbox.google.com": "email",
+    "mail.yahoo.com": "email", "mail.yahoo.co.jp": "email",
+    "outlook.live.com": "email", "outlook.office.com": "email", "outlook.office365.com": "email",
+    "mail.aol.com": "email", "mail.proton.me": "email", "mail.yandex.ru": "email",
+    "mail.zoho.com": "email", "icloud.com": "email",
+}
+# Leftmost labels that mark any host as webmail
+_MAIL_LABELS = frozenset(("mail", "webmail"))
+
+_SECOND_LEVEL = frozenset(("co", "com", "net", "org", "ac", "gov", "edu"))
+
+
+def _classify_user_agent(user_agent: str) -> UserAgentInfo:
+    is_bot = _BOT_PATTERN.search(user_agent) is not None
+    browser = next((name for name, rule in _BROWSER_RULES if rule.search(user_agent)), UNKNOWN)
+    os_name = next((name for name, rule in _OS_RULES if rule.search(user_agent)), UNKNOWN)
+    if is_bot:
+        device = "bot"
+    elif _TABLET_PATTERN.search(user_agent):
+        device = "tablet"
+    elif _MOBILE_PATTERN.search(user_agent):
+        device = "mobile"
+    else:
+        device = "desktop"
+    return UserAgentInfo(browser, os_name, device, is_bot)
+
+
+def _classify_referrer(referrer: str) -> ReferrerInfo:
+    try:
+        host = (urlsplit(referrer if "//" in referrer else f"//{referrer}").hostname or "").lower()
+    except ValueError:
+        return ReferrerInfo(UNKNOWN, "other")
+    if not host:
+        return DIRECT
+    if host.startswith("www."):
+        host = host[4:]
+
+    if host in settings.analytics.internal_domains:
+        return ReferrerInfo(host, "internal")
+    return ReferrerInfo(host, _host_source(host) or _REFERRER_SOURCES.get(_site_label(host), "other"))
+
+
+def _host_source(host: str) -> Optional[str]:
+    """Source of `host` or of its closest listed parent in _REFERRER_HOSTS"""
+    labels = host.split(".")
+    for index in range(len(labels) - 1):
+        source = _REFERRER_HOSTS.get(".".join(labels[index:]))
+        if source is not None:
+            return source
+    if len(labels) > 2 and labels[0] in _MAIL_LABELS:
+        return "email"
+    return None
+
+
+def _site_label(host: str) -> str:
+    """Label left of the public suffix: google for www.google.co.in"""
+    labels = host.split(".")
+    if len(labels) < 2:
+        return labels[0]
+    if len(labels) > 2 and labels[-2] in _SECOND_LEVEL and len(labels[-1]) == 2:
+        return labels[-3]
+    return labels[-2]
+
+
+_user_agent_cache = lru_cache(maxsize=settings.analytics.classifier_cache_size)(_classify_user_agent)
+_referrer_cache = lru_cache(maxsize=settings.analytics.classifier_cache_size)(_classify_referrer)
+
+
+def classify_user_agent(user_agent: Optional[str]) -> UserAgentInfo:
+    if not user_agent:
+        return _UNKNOWN_AGENT
+    return _user_agent_cache(user_agent)
+
+
+def classify_referrer(referrer: Optional[str]) -> ReferrerInfo:
+    if not referrer:
+        return DIRECT
+    return _referrer_cache(referrer)
+
+
+def classify_batch(
+        user_agents: Iterable[Optional[str]],
+        referrers: Iterable[Optional[str]]
+) -> Tuple[List[UserAgentInfo], List[ReferrerInfo]]:
+    """
+    Classify a whole batch; each distinct string is parsed (or looked up
+    in the LRU) once, however often it repeats in the batch
+    """
+    user_agents = list(user_agents)
+    referrers = list(referrers)
+    agent_results = {value: classify_user_agent(value) for value in set(user_agents)}
+    referrer_results = {value: classify_referrer(value) for value in set(referrers)}
+    return (
+        [agent_results[value] for value in user_agents],
+        [referrer_results[value] for value in referrers],
+    )
+
+
+def cache_info() -> Dict[str, object]:
+    return {"user_agent": _user_agent_cache.cache_info(), "referrer": _referrer_cache.cache_info()}
@@ -0,0 +1,110 @@
+"""
+Click events from the redirect path to Kafka
+
+Redirects must not wait on the broker, so `record()` only appends to a
+bounded in-process buffer; a background task publishes it in batches
+through KafkaManager.send_messages. When the buffer is full new clicks are
+dropped (and counted) rather than slowing redirects down.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from app.core.logging_config import get_logger
+from app.core.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+
+CLICKS_RECORDED = REGISTRY.counter("clicks_recorded_total", "Click events buffered for publishing")
+CLICKS_DROPPED = REGISTRY.counter(
+    "clicks_dropped_total", "Click events lost because the buffer was full or publishing failed"
+)
+
+
+class ClickPublisher:
+    def __init__(self):
+        self.kafka_manager = None
+        self.topic: Optional[str] = None
+        self.maxlen = 0
+        self.batch_size = 0
+        self.interval = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self._buffer: deque = deque()
+        self._full = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None
+
+    def record(self, short_link: str, ip: Optional[str], user_agent: Optional[str], referrer: Optional[str]):
+        """Buffer one click; a no-op unless the publisher was started"""
+        if self.task is None:
+            return
+        if len(self._buffer) >= self.maxlen:
+            CLICKS_DROPPED.inc()
+            return
+        self._buffer.append({
+            "short_link": short_link,
+            "ts": time.time(),
+            "ip": ip,
+            "user_agent": user_agent,
+            "referrer": referrer,
+        })
+        CLICKS_RECORDED.inc()
+        if len(self._buffer) >= self.batch_size:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """Publish everything buffered so far; returns events delivered"""
+        delivered = 0
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            results = await self.kafka_manager.send_messages(
+                [(self.topic, event["short_link"], event) for event in batch]
+            )
+            failed = sum(1 for error in results if error is not None)
+            if failed:
+                CLICKS_DROPPED.inc(failed)
+                logger.warning("Dropped %s click events the broker did not accept", failed)
+            delivered += len(batch) - failed
+        return delivered
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.warning("Publishing click events failed", exc_info=True)
+
+    async def start(self, kafka_manager, topic: str, maxlen: int, batch_size: int, interval: float):
+        if self.task:
+            return
+        self.kafka_manager = kafka_manager
+        self.topic = topic
+        self.maxlen = maxlen
+        self.batch_size = batch_size
+        self.interval = interval
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        if not self.task:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except (asyncio.TimeoutError, Exception):
+            logger.warning("Dropped %s unpublished click events on shutdown", len(self._buffer))
+            CLICKS_DROPPED.inc(len(self._buffer))
+            self._buffer.clear()
+
+
+click_publisher = ClickPublisher()
@@ -0,0 +1,169 @@
+import time
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Tuple, Union
+
+import databases
+from sqlalchemy.sql import ClauseElement
+
+from app.core.logging_config import get_logger
+from app.core.metrics import DB_QUERY_DURATION, DB_QUERY_ERRORS, DB_POOL_CONNECTIONS
+from app.core.query_stats import QUERY_STATS, QueryStats, fingerprint, redact_values
+from app.core.request_timing import record_phase
+
+logger = get_logger(__name__)
+
+
+class InstrumentedDatabase(databases.Database):
+    """
+    `databases.Database` that times every statement it runs
+
+    Besides the latency histogram, statements are aggregated per fingerprint
+    in `query_stats` and the ones slower than `slow_query_threshold` seconds
+    are logged with their parameters redacted.
+
+    Args:
+        url: Database URL
+        name: Label used for this connection in metrics (database_r, database_w)
+        query_stats: Aggregator for per-statement stats, None to disable
+        slow_query_threshold: Seconds above which a statement is logged
+    """
+
+    def __init__(
+            self,
+            url: str,
+            name: str,
+            query_stats: Optional[QueryStats] = QUERY_STATS,
+            slow_query_threshold: Optional[float] = None,
+            **options: Any
+    ):
+        super().__init__(url, **options)
+        self.name = name
+        self.query_stats = query_stats
+        self.slow_query_threshold = slow_query_threshold
+
+    def _record(
+            self,
+            operation: str,
+            query: Union[ClauseElement, str],
+            values: Any,
+            elapsed: float,
+            failed: bool
+    ):
+        DB_QUERY_DURATION.labels(self.name, operation).observe(elapsed)
+        record_phase("db", elapsed)
+        if failed:
+            DB_QUERY_ERRORS.labels(self.name, operation).inc()
+
+        slow = self.slow_query_threshold is not None and elapsed >= self.slow_query_threshold
+        if self.query_stats is None and not slow:
+            return
+
+        statement = query if isinstance(query, str) else str(query)
+        if self.query_stats is not None:
+            self.query_stats.record(self.name, statement, elapsed, failed)
+        if slow:
+            # Logged by fingerprint so literals inlined in the SQL are redacted too
+            logger.warning(
+                "Slow query on %s (%s) took %.1f ms: %s params=%s",
+                self.name, operation, elapsed * 1000,
+                fingerprint(statement), redact_values(values)
+            )
+
+    async def _timed(self, operation: str, query, values, call):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await call
+            failed = False
+            return result
+        finally:
+            self._record(operation, query, values, time.perf_counter() - start, failed)
+
+    async def fetch_all(self, query: Union[ClauseElement, str], values: Optional[dict] = None) -> List[Any]:
+        return await self._timed("fetch_all", query, values, super().fetch_all(query, values))
+
+    async def fetch_one(self, query: Union[ClauseElement, str], values: Optional[dict] = None) -> Optional[Any]:
+        return await self._timed("fetch_one", query, values, super().fetch_one(query, values))
+
+    async def fetch_val(
+            self,
+            query: Union[ClauseElement, str],
+            values: Optional[dict] = None,
+            column: Any = 0
+    ) -> Any:
+        return await self._timed("fetch_val", query, values, super().fetch_val(query, values, column=column))
+
+    async def execute(self, query: Union[ClauseElement, str], values: Optional[dict] = None) -> Any:
+        return await self._timed("execute", query, values, super().execute(query, values))
+
+    async def execute_many(self, query: Union[ClauseElement, str], values: list) -> None:
+        return await self._timed("execute_many", query, values, super().execute_many(query, values))
+
+    async def iterate(
+            self,
+            query: Union[ClauseElement, str],
+            values: Optional[dict] = None
+    ) -> AsyncGenerator[Any, None]:
+        # Timed from the first fetch to exhaustion (or early close)
+        start = time.perf_counter()
+        failed = True
+        try:
+            async for record in super().iterate(query, values):
+                yield record
+            failed = False
+        except GeneratorExit:
+            failed = False
+            raise
+        finally:
+            self._record("iterate", query, values, time.perf_counter() - start, failed)
+
+    def pool_stats(self) -> Optional[Dict[str, int]]:
+        """
+        Size / idle / in-use connections (and the maximum size, when the
+        driver exposes it) of the backend pool, if connected
+        """
+        pool = getattr(getattr(self, "_backend", None), "_pool", None)
+        if pool is None:
+            return None
+        if hasattr(pool, "get_size"):  # asyncpg
+            size, idle = pool.get_size(), pool.get_idle_size()
+            maximum = pool.get_max_size() if hasattr(pool, "get_max_size") else None
+        elif hasattr(pool, "freesize"):  # aiopg / aiomysql
+            size, idle = pool.size, pool.freesize
+            maximum = getattr(pool, "maxsize", None)
+        else:
+            return None
+        stats = {"size": size, "idle": idle, "in_use": size - idle}
+        if maximum:
+            stats["max"] = maximum
+        return stats
+
+
+def register_pool_gauges(databases_: Iterable[InstrumentedDatabase], engines: Iterable[Tuple[str, Any]] = ()):
+    """
+    Expose async pool sizes and sync SQLAlchemy engine pools as gauges
+
+    Args:
+        databases_: Async databases to report
+        engines: (name, getter) pairs; the getter returns the engine or None
+            when it was never created, so scraping does not create it
+    """
+    databases_ = list(databases_)
+    engines = list(engines)
+
+    def collect():
+        for database in databases_:
+            stats = database.pool_stats()
+            if stats:
+                for state, value in stats.items():
+                    yield (database.name, state), value
+        for name, get_engine in engines:
+            engine = get_engine()
+            pool = getattr(engine, "pool", None)
+            if pool is None or not hasattr(pool, "checkedout"):
+                continue
+            yield (name, "size"), pool.size()
+            yield (name, "in_use"), pool.checkedout()
+            yield (name, "idle"), pool.checkedin()
+            yield (name, "overflow"), pool.overflow()
+
+    DB_POOL_CONNECTIONS.add_callback(collect)
@@ -1,9 +1,54 @@
-import databases
-from sqlalchemy import create_engine
+from typing import Dict
+
+from sqlalchemy.engine import Engine
 
 from app.config import settings
+from app.core.db_instrumentation import InstrumentedDatabase, register_pool_gauges
+from app.core.query_stats import QUERY_STATS
+
+QUERY_STATS.max_fingerprints = settings.observability.query_stats_max_fingerprints
+_instrumentation = {
+    "query_stats": QUERY_STATS if settings.observability.query_stats_enabled else None,
+    "slow_query_threshold": settings.observability.slow_query_threshold_ms / 1000,
+}
+
+database_r = InstrumentedDatabase(settings.database_r.uri, name="database_r", **_instrumentation)
+database_w = InstrumentedDatabase(settings.database_w.uri, name="database_w", **_instrumentation)
+# Reader pool reserved for bulk exports, sized to their concurrency limit
+database_export = InstrumentedDatabase(
+    settings.database_r.uri, name="database_export",
+    min_size=1, max_size=settings.export.pool_size, **_instrumentation
+)
+
+# Sync engines are only needed by tooling, so they are created on first use
+# instead of at import (create_engine loads the dialect and DBAPI)
+_engines: Dict[str, Engine] = {}
+
+
+def get_engine_r() -> Engine:
+    if "engine_r" not in _engines:
+        from sqlalchemy import create_engine
+        _engines["engine_r"] = create_engine(settings.database_r.uri)
+    return _engines["engine_r"]
+
+
+def get_engine_w() -> Engine:
+    if "engine_w" not in _engines:
+        from sqlalchemy import create_engine
+        _engines["engine_w"] = create_engine(settings.database_w.uri)
+    return _engines["engine_w"]
+
+
+def __getattr__(name: str):
+    # Keeps `from app.core.db_session import engine_r` working, lazily
+    if name == "engine_r":
+        return get_engine_r()
+    if name == "engine_w":
+        return get_engine_w()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-engine_r = create_engine(settings.database_r.uri)
-engine_w = create_engine(settings.database_w.uri)
-database_r = databases.Database(settings.database_r.uri)
-database_w = databases.Database(settings.database_w.uri)
+register_pool_gauges(
+    (database_r, database_w, database_export),
+    engines=(("engine_r", lambda: _engines.get("engine_r")), ("engine_w", lambda: _engines.get("engine_w")))
+)
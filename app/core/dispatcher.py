@@ -16,14 +16,14 @@ logger = get_logger(__name__)
 # }
 topic_handler_map = topic_exchange_map = {}
 async def dispatch_event(topic_name: str, payload: dict, kafka_manager=None):
-    logger.info(f"Dispatching event for topic: {topic_name} with payload: {payload}")
+    logger.debug("Dispatching event for topic: %s with payload: %s", topic_name, payload)
     handler_class = topic_handler_map.get(topic_name)
     if handler_class:
         handler = handler_class()
         if hasattr(handler, 'handle_webhook_event'):
             # Call the method to handle the webhook event
             status, message = await handler.handle_webhook_event(payload)
-            logger.info(f"Event handled successfully: {message}")
+            logger.info("Event handled successfully: %s", message)
             if status and message:    
                 await kafka_manager.send_message(
                     topic=topic_exchange_map.get(topic_name),
@@ -0,0 +1,220 @@
+"""
+Offline IP -> country lookups
+
+Ranges are kept in a compact binary file, built from CSV by
+`python -m app.cli.build_geoip`, and memory-mapped. Layout (little endian):
+
+    header     magic, version, IPv4 range count, IPv6 range count,
+               country count
+    countries  country count x 2 ASCII bytes (index 0 is "unknown")
+    v4 starts  uint32[n4]      v4 ends    uint32[n4]
+    v4 country uint16[n4]      (padded to 8 bytes)
+    v6 starts  16 bytes[n6]    v6 ends    16 bytes[n6]
+    v6 country uint16[n6]
+
+Ranges are sorted by start and do not overlap, so a lookup is one binary
+search over the start column plus a check against the matching end.
+"""
+import csv
+import ipaddress
+import mmap
+import socket
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+MAGIC = b"SHRTGEO1"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIII")
+_PACK_V6 = struct.Struct(">QQ")
+
+
+def _pad8(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class _FixedWidth(Sequence):
+    """Sequence view of fixed-width byte strings, so bisect can search it"""
+
+    def __init__(self, view: memoryview, width: int):
+        self._view = view
+        self._width = width
+        self._length = len(view) // width
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> bytes:
+        start = index * self._width
+        return bytes(self._view[start:start + self._width])
+
+
+def _parse_ip(value: str) -> Tuple[int, int]:
+    """(version, integer) for an address given as text or as an integer"""
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return (4 if number < 2 ** 32 else 6), number
+    address = ipaddress.ip_address(value)
+    return address.version, int(address)
+
+
+def build_database(rows: Iterable[Tuple[str, str, str]], path: str) -> Tuple[int, int]:
+    """
+    Write a binary range database from (start, end, country) rows
+
+    Overlapping ranges are rejected, since a lookup could then return
+    either country.
+
+    Returns:
+        (IPv4 ranges, IPv6 ranges) written
+    """
+    if sys.byteorder != "little":
+        raise RuntimeError("geo databases are built and read on little-endian hosts only")
+
+    countries = {"": 0}
+    ranges = {4: [], 6: []}
+    for start, end, country in rows:
+        start_version, start_number = _parse_ip(start)
+        end_version, end_number = _parse_ip(end)
+        if start_version != end_version or end_number < start_number:
+            raise ValueError(f"Invalid range {start} - {end}")
+        code = (country or "").strip().upper()[:2]
+        index = countries.setdefault(code, len(countries))
+        ranges[start_version].append((start_number, end_number, index))
+
+    for version in (4, 6):
+        ranges[version].sort()
+        for previous, current in zip(ranges[version], ranges[version][1:]):
+            if current[0] <= previous[1]:
+                raise ValueError(f"Overlapping IPv{version} ranges starting at {previous[0]} and {current[0]}")
+
+    v4, v6 = ranges[4], ranges[6]
+    codes = sorted(countries, key=countries.get)
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, len(v4), len(v6), len(codes)))
+        country_blob = b"".join(code.encode("ascii").ljust(2, b"\0") for code in codes)
+        file.write(country_blob.ljust(_pad8(len(country_blob)), b"\0"))
+
+        file.write(array("I", (row[0] for row in v4)).tobytes())
+        file.write(array("I", (row[1] for row in v4)).tobytes())
+        v4_countries = array("H", (row[2] for row in v4)).tobytes()
+        file.write(v4_countries.ljust(_pad8(len(v4_countries)), b"\0"))
+
+        for column in (0, 1):
+            file.write(b"".join(_PACK_V6.pack(row[column] >> 64, row[column] & (2 ** 64 - 1)) for row in v6))
+        file.write(array("H", (row[2] for row in v6)).tobytes())
+    return len(v4), len(v6)
+
+
+def build_from_csv(csv_path: str, path: str) -> Tuple[int, int]:
+    """CSV rows of start, end, country; a header row and # comments are skipped"""
+    def rows():
+        with open(csv_path, newline="") as file:
+            for row in csv.reader(file):
+                if not row or row[0].startswith("#") or len(row) < 3:
+                    continue
+                if not row[0].strip()[:1].isdigit() and ":" not in row[0]:
+                    continue  # header
+                yield row[0], row[1], row[2]
+    return build_database(rows(), path)
+
+
+class GeoDatabase:
+    """Memory-mapped range database; lookups are a binary search"""
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise RuntimeError("geo databases are built and read on little-endian hosts only")
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n4, n6, n_countries = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} geo database")
+
+        offset = _HEADER.size
+        self.countries: List[Optional[str]] = [
+            self._map[offset + 2 * index:offset + 2 * index + 2].rstrip(b"\0").decode("ascii") or None
+            for index in range(n_countries)
+        ]
+        offset += _pad8(2 * n_countries)
+
+        self._view = memoryview(self._map)
+        self._v4_starts = self._view[offset:offset + 4 * n4].cast("I")
+        offset += 4 * n4
+        self._v4_ends = self._view[offset:offset + 4 * n4].cast("I")
+        offset += 4 * n4
+        self._v4_countries = self._view[offset:offset + 2 * n4].cast("H")
+        offset += _pad8(2 * n4)
+
+        self._v6_starts = _FixedWidth(self._view[offset:offset + 16 * n6], 16)
+        offset += 16 * n6
+        self._v6_ends = _FixedWidth(self._view[offset:offset + 16 * n6], 16)
+        offset += 16 * n6
+        self._v6_countries = self._view[offset:offset + 2 * n6].cast("H")
+        self.ranges = n4 + n6
+
+    def country(self, ip: str) -> Optional[str]:
+        """ISO country code for `ip`, or None when unknown or unparsable"""
+        try:
+            packed = socket.inet_pton(socket.AF_INET, ip)
+        except OSError:
+            try:
+                packed = socket.inet_pton(socket.AF_INET6, ip)
+            except (OSError, TypeError):
+                return None
+            if packed[:12] == b"\0" * 10 + b"\xff\xff":
+                # IPv4-mapped IPv6 address
+                packed = packed[12:]
+            else:
+                index = bisect_right(self._v6_starts, packed) - 1
+                if index < 0 or self._v6_ends[index] < packed:
+                    return None
+                return self.countries[self._v6_countries[index]]
+        except TypeError:
+            return None
+
+        number = int.from_bytes(packed, "big")
+        index = bisect_right(self._v4_starts, number) - 1
+        if index < 0 or self._v4_ends[index] < number:
+            return None
+        return self.countries[self._v4_countries[index]]
+
+    def countries_for(self, ips: Iterable[str]) -> List[Optional[str]]:
+        """country() for a batch, looking each distinct address up once"""
+        ips = list(ips)
+        resolved = {ip: self.country(ip) for ip in set(ips)}
+        return [resolved[ip] for ip in ips]
+
+    def close(self):
+        if self._map is not None:
+            for view in (self._v4_starts, self._v4_ends, self._v4_countries, self._v6_countries):
+                view.release()
+            self._v6_starts._view.release()
+            self._v6_ends._view.release()
+            self._view.release()
+            self._map.close()
+            self._map = None
+
+
+def open_database(path: str) -> Optional[GeoDatabase]:
+    """The database at `path`, or None (with a warning) if it can't be used"""
+    if not path:
+        return None
+    try:
+        database = GeoDatabase(path)
+    except (OSError, ValueError, RuntimeError, struct.error):
+        logger.warning("Geo lookups disabled: cannot load %s", path, exc_info=True)
+        return None
+    logger.info("Loaded geo database with %s ranges", database.ranges)
+    return database
@@ -0,0 +1,212 @@
+"""
+HyperLogLog sketches for distinct counts
+
+A sketch with precision p keeps 2^p one-byte registers and estimates the
+number of distinct items added with a standard error of about
+1.04 / sqrt(2^p) (1.6% at the default p = 12), whatever the number of
+items. Sketches with the same precision merge by taking the register-wise
+maximum, so merging is exact, order independent and idempotent: adding
+the same item or merging the same sketch twice changes nothing.
+
+Sketches seeing few items stay sparse (only non-zero registers are kept)
+and switch to the dense register array once that is smaller. Serialized
+layout (little endian):
+
+    header  format (0 sparse, 1 dense), precision
+    sparse  uint32[n] of register index << 8 | register value, sorted
+    dense   2^p register bytes
+"""
+import math
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, Iterable, Optional, Union
+
+_HEADER = struct.Struct("<BB")
+_SPARSE = 0
+_DENSE = 1
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+
+def _hash(item: Union[str, bytes]) -> int:
+    if isinstance(item, str):
+        item = item.encode("utf-8")
+    return int.from_bytes(blake2b(item, digest_size=8).digest(), "little")
+
+
+def _alpha(registers: int) -> float:
+    if registers == 16:
+        return 0.673
+    if registers == 32:
+        return 0.697
+    if registers == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / registers)
+
+
+@lru_cache(maxsize=None)
+def _high_bits(registers: int) -> int:
+    return int.from_bytes(b"\x80" * registers, "little")
+
+
+class HyperLogLog:
+    """
+    Args:
+        precision: log2 of the register count, between 4 and 16
+    """
+
+    __slots__ = ("precision", "registers", "_sparse", "_dense", "_rest_bits", "_rest_mask")
+
+    def __init__(self, precision: int = 12):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.registers = 1 << precision
+        self._rest_bits = 64 - precision
+        self._rest_mask = (1 << self._rest_bits) - 1
+        self._sparse: Optional[Dict[int, int]] = {}
+        self._dense: Optional[bytearray] = None
+
+    def _to_dense(self):
+        dense = bytearray(self.registers)
+        for index, value in self._sparse.items():
+            dense[index] = value
+        self._dense = dense
+        self._sparse = None
+
+    def _set(self, index: int, value: int):
+        if self._dense is not None:
+            if value > self._dense[index]:
+                self._dense[index] = value
+            return
+        if value > self._sparse.get(index, 0):
+            self._sparse[index] = value
+            # 4 bytes per sparse entry on disk against 1 per dense register
+            if 4 * len(self._sparse) >= self.registers:
+                self._to_dense()
+
+    def add(self, item: Union[str, bytes]):
+        hashed = _hash(item)
+        rest = hashed & self._rest_mask
+        self._set(hashed >> self._rest_bits, self._rest_bits - rest.bit_length() + 1)
+
+    def update(self, items: Iterable[Union[str, bytes]]):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold `other` into this sketch (in place) and return self"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precisions")
+        if other._dense is None:
+            for index, value in other._sparse.items():
+                self._set(index, value)
+            return self
+        if self._dense is None:
+            self._to_dense()
+        # Register-wise max on the arrays read as big integers: register
+        # values stay below 0x80, so (a | 0x80) - b keeps the lane's high
+        # bit exactly when a >= b and never borrows from the next lane
+        high = _high_bits(self.registers)
+        mine = int.from_bytes(self._dense, "little")
+        theirs = int.from_bytes(other._dense, "little")
+        keep_mine = ((((mine | high) - theirs) & high) >> 7) * 0xFF
+        merged = theirs ^ ((mine ^ theirs) & keep_mine)
+        self._dense[:] = merged.to_bytes(self.registers, "little")
+        return self
+
+    def fold(self, precision: int) -> "HyperLogLog":
+        """
+        Copy reduced to a lower `precision`, as if every item had been added
+        to a sketch of that precision; lets sketches of different
+        precisions be merged
+        """
+        if precision > self.precision or precision < MIN_PRECISION:
+            raise ValueError(f"Cannot fold a precision {self.precision} sketch to {precision}")
+        folded = HyperLogLog(precision)
+        shift = self.precision - precision
+        if self._dense is not None:
+            items = ((index, value) for index, value in enumerate(self._dense) if value)
+        else:
+            items = self._sparse.items()
+        for index, value in items:
+            # The dropped index bits become the leading bits of the rank
+            dropped = index & ((1 << shift) - 1)
+            rank = shift - dropped.bit_length() + 1 if dropped else shift + value
+            folded._set(index >> shift, rank)
+        return folded
+
+    def count(self) -> int:
+        """Estimated number of distinct items added"""
+        registers = self.registers
+        if self._dense is not None:
+            dense = bytes(self._dense)
+            zeros = dense.count(0)
+            total = float(zeros)
+            for value in range(1, self._rest_bits + 2):
+                occurrences = dense.count(value)
+                if occurrences:
+                    total += occurrences * 2.0 ** -value
+        else:
+            zeros = registers - len(self._sparse)
+            total = zeros + sum(2.0 ** -value for value in self._sparse.values())
+
+        estimate = _alpha(registers) * registers * registers / total
+        if estimate <= 2.5 * registers and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = registers * math.log(registers / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        if self._dense is not None:
+            return _HEADER.pack(_DENSE, self.precision) + bytes(self._dense)
+        entries = array("I", sorted(index << 8 | value for index, value in self._sparse.items()))
+        if sys.byteorder != "little":
+            entries.byteswap()
+        return _HEADER.pack(_SPARSE, self.precision) + entries.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        kind, precision = _HEADER.unpack_from(data, 0)
+        sketch = cls(precision)
+        body = memoryview(data)[_HEADER.size:]
+        if kind == _DENSE:
+            if len(body) != sketch.registers:
+                raise ValueError("Truncated HyperLogLog sketch")
+            sketch._dense = bytearray(body)
+            sketch._sparse = None
+        elif kind == _SPARSE:
+            entries = array("I")
+            entries.frombytes(body)
+            if sys.byteorder != "little":
+                entries.byteswap()
+            sketch._sparse = {entry >> 8: entry & 0xFF for entry in entries}
+            if 4 * len(sketch._sparse) >= sketch.registers:
+                sketch._to_dense()
+        else:
+            raise ValueError(f"Unknown HyperLogLog format {kind}")
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches: Iterable[bytes], precision: int = 12) -> "HyperLogLog":
+        """
+        Union of serialized sketches; an empty input gives an empty sketch.
+        Mixed precisions are folded to the lowest one.
+        """
+        result: Optional[HyperLogLog] = None
+        for data in sketches:
+            sketch = cls.from_bytes(data)
+            if result is None:
+                result = sketch
+                continue
+            if sketch.precision < result.precision:
+                result = result.fold(sketch.precision)
+            elif sketch.precision > result.precision:
+                sketch = sketch.fold(result.precision)
+            result.merge(sketch)
+        return result if result is not None else cls(precision)
+
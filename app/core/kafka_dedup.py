@@ -0,0 +1,311 @@
+"""
+Deduplication of redelivered and republished Kafka messages
+
+Offsets are committed once per batch, so after a crash or a rebalance a
+partition is read again from its last commit, including messages that were
+already handled. Two compact structures catch those:
+
+    offset watermarks  with every batch commit, each partition's checkpoint
+                       (lowest unfinished offset, plus the offsets above it
+                       that already finished) is written to
+                       kafka_consumer_checkpoints. When a partition is
+                       assigned its checkpoint is loaded and messages below
+                       the watermark or in the finished set are skipped,
+                       until the consumer is past the checkpoint.
+    event ids          messages published through the outbox carry an
+                       x-event-id header that survives republishing; the
+                       last `capacity` ids handled are kept in insertion
+                       order, fronted by a rotating Bloom filter so the
+                       common case (an id never seen) costs k hash probes.
+
+Both checks are O(1) per message. A Bloom filter can report a false
+positive (at most `error_rate`), so a hit is only trusted once the exact
+set of recent ids confirms it: a false positive costs a lookup, never a
+skipped message.
+
+Batch handlers that write to the database can make the skip exact: by
+awaiting `save_checkpoint(db)` inside their own transaction, the
+checkpoint is committed atomically with their writes.
+"""
+import math
+from collections import OrderedDict
+from contextvars import ContextVar
+from hashlib import blake2b
+from typing import Dict, FrozenSet, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+import databases
+
+from app.core.db_session import database_w
+from app.core.logging_config import get_logger
+from app.utils.shared.datetime_utils import DateTimeUtil
+
+logger = get_logger(__name__)
+
+
+HEADER_EVENT_ID = "x-event-id"
+
+LOAD_CHECKPOINTS_QUERY = """
+    SELECT topic, partition, position, done
+    FROM kafka_consumer_checkpoints
+    WHERE group_id = :group_id
+      AND (topic, partition) IN (
+          SELECT * FROM unnest(CAST(:topics AS VARCHAR[]), CAST(:partitions AS INTEGER[]))
+      )
+"""
+
+# Never moves a checkpoint backwards, e.g. when a stale owner of a
+# partition commits after a rebalance
+SAVE_CHECKPOINTS_QUERY = """
+    INSERT INTO kafka_consumer_checkpoints (group_id, topic, partition, position, done, updated_on)
+    SELECT :group_id, topic, partition, position, done, :updated_on
+    FROM unnest(
+        CAST(:topics AS VARCHAR[]),
+        CAST(:partitions AS INTEGER[]),
+        CAST(:positions AS BIGINT[]),
+        CAST(:done AS BYTEA[])
+    ) AS batch (topic, partition, position, done)
+    ON CONFLICT (group_id, topic, partition)
+    DO UPDATE SET position = EXCLUDED.position, done = EXCLUDED.done, updated_on = EXCLUDED.updated_on
+    WHERE kafka_consumer_checkpoints.position <= EXCLUDED.position
+"""
+
+
+class Checkpoint(NamedTuple):
+    # Lowest offset not handled yet
+    position: int
+    # Offsets above `position` that were handled
+    done: FrozenSet[int] = frozenset()
+
+    def encode_done(self) -> bytes:
+        """`done` as a bitmap: bit i stands for offset position + 1 + i"""
+        if not self.done:
+            return b""
+        bits = 0
+        for offset in self.done:
+            bits |= 1 << (offset - self.position - 1)
+        return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+    @classmethod
+    def decode(cls, position: int, done: Optional[bytes]) -> "Checkpoint":
+        bits = int.from_bytes(done or b"", "little")
+        offsets = []
+        index = 0
+        while bits:
+            if bits & 1:
+                offsets.append(position + 1 + index)
+            bits >>= 1
+            index += 1
+        return cls(position, frozenset(offsets))
+
+
+class BloomFilter:
+    """
+    Args:
+        capacity: Items it is sized for
+        error_rate: False positive rate once `capacity` items were added
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, item: bytes) -> Iterable[int]:
+        digest = blake2b(item, digest_size=16).digest()
+        # Double hashing (Kirsch and Mitzenmacher) from one digest
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return ((first + i * second) % size for i in range(self.hashes))
+
+    def __contains__(self, item: bytes) -> bool:
+        bits = self.bits
+        return all(bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item))
+
+    def add(self, item: bytes):
+        bits = self.bits
+        for index in self._indexes(item):
+            bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+
+class RotatingBloomFilter:
+    """
+    Remembers at least the last `capacity` items in two generations: when
+    the current one is full the previous one is dropped and a fresh one
+    started
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous: Optional[BloomFilter] = None
+
+    def __contains__(self, item: bytes) -> bool:
+        return item in self.current or (self.previous is not None and item in self.previous)
+
+    def add(self, item: bytes):
+        if self.current.count >= self.capacity:
+            self.previous, self.current = self.current, BloomFilter(self.capacity, self.error_rate)
+        self.current.add(item)
+
+
+class DedupWindow:
+    """
+    Skip decisions for one consumer
+
+    Args:
+        capacity: Recent event ids remembered exactly, and the size of each
+            generation of the filter in front of them
+        error_rate: False positive rate of that filter
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.event_ids = RotatingBloomFilter(capacity, error_rate)
+        # Confirms filter hits; oldest first
+        self._recent_ids: "OrderedDict[str, None]" = OrderedDict()
+        # partition -> (checkpoint, highest offset it can skip)
+        self._restored: Dict[Hashable, Tuple[Checkpoint, int]] = {}
+
+    def restore(self, tp: Hashable, checkpoint: Checkpoint):
+        self._restored[tp] = (checkpoint, max(checkpoint.done, default=checkpoint.position - 1))
+
+    def forget(self, partitions: Iterable[Hashable]):
+        for tp in partitions:
+            self._restored.pop(tp, None)
+
+    def seen_offset(self, tp: Hashable, offset: int) -> bool:
+        """Whether the checkpoint says `offset` was handled; call in fetch order"""
+        restored = self._restored.get(tp)
+        if restored is None:
+            return False
+        checkpoint, horizon = restored
+        if offset > horizon:
+            # Past the checkpoint: nothing further to skip on this partition
+            del self._restored[tp]
+            return False
+        return offset < checkpoint.position or offset in checkpoint.done
+
+    def seen_event(self, event_id: Optional[str]) -> bool:
+        return (
+            event_id is not None
+            and event_id.encode("utf-8") in self.event_ids
+            and event_id in self._recent_ids
+        )
+
+    def record_event(self, event_id: Optional[str]):
+        if event_id is None:
+            return
+        self.event_ids.add(event_id.encode("utf-8"))
+        recent = self._recent_ids
+        recent[event_id] = None
+        recent.move_to_end(event_id)
+        if len(recent) > self.capacity:
+            recent.popitem(last=False)
+
+
+class CheckpointStore:
+    """kafka_consumer_checkpoints rows of one consumer group"""
+
+    def __init__(self, group: str, db: databases.Database = database_w):
+        self.group = group
+        self.db = db
+
+    async def load(self, partitions: Iterable) -> Dict[Tuple[str, int], Checkpoint]:
+        """(topic, partition) -> checkpoint, for partitions that have one"""
+        partitions = list(partitions)
+        if not partitions:
+            return {}
+        rows = await self.db.fetch_all(query=LOAD_CHECKPOINTS_QUERY, values={
+            "group_id": self.group,
+            "topics": [tp.topic for tp in partitions],
+            "partitions": [tp.partition for tp in partitions],
+        })
+        return {
+            (row["topic"], row["partition"]): Checkpoint.decode(row["position"], row["done"] and bytes(row["done"]))
+            for row in rows
+        }
+
+    async def save(self, checkpoints: Dict, db: Optional[databases.Database] = None):
+        """
+        Args:
+            checkpoints: TopicPartition -> Checkpoint
+            db: Connection to write through, e.g. one in a transaction
+        """
+        if not checkpoints:
+            return
+        partitions = list(checkpoints)
+        await (db or self.db).execute(query=SAVE_CHECKPOINTS_QUERY, values={
+            "group_id": self.group,
+            "topics": [tp.topic for tp in partitions],
+            "partitions": [tp.partition for tp in partitions],
+            "positions": [checkpoints[tp].position for tp in partitions],
+            "done": [checkpoints[tp].encode_done() for tp in partitions],
+            "updated_on": DateTimeUtil.get_current_timestamp().replace(tzinfo=None),
+        })
+
+    async def restore(self, window: DedupWindow, partitions: Iterable):
+        """Load the checkpoints of newly assigned partitions into `window`"""
+        partitions = list(partitions)
+        try:
+            checkpoints = await self.load(partitions)
+        except Exception as e:
+            # Only duplicates are at stake; never block the assignment on it
+            logger.warning("Could not load consumer checkpoints for group %s: %s", self.group, e)
+            return
+        for tp in partitions:
+            checkpoint = checkpoints.get((tp.topic, tp.partition))
+            if checkpoint is not None:
+                window.restore(tp, checkpoint)
+
+
+class PendingCheckpoint:
+    """Checkpoint of the batch a batch handler is processing"""
+
+    def __init__(self, store: CheckpointStore, checkpoints: Dict):
+        self.store = store
+        self.checkpoints = checkpoints
+        self.saved = False
+
+
+_pending_checkpoint: ContextVar[Optional[PendingCheckpoint]] = ContextVar("pending_checkpoint", default=None)
+
+
+def begin_batch(pending: PendingCheckpoint):
+    return _pending_checkpoint.set(pending)
+
+
+def end_batch(token):
+    _pending_checkpoint.reset(token)
+
+
+async def save_checkpoint(db: databases.Database) -> bool:
+    """
+    Write the checkpoint of the batch being handled through `db`
+
+    Await it inside the same `db.transaction()` as the handler's writes so
+    a redelivered batch is skipped exactly. Otherwise the consumer saves it
+    after the handler returns.
+
+    Returns:
+        False outside a deduplicated batch handler
+    """
+    pending = _pending_checkpoint.get()
+    if pending is None or pending.saved:
+        return False
+    await pending.store.save(pending.checkpoints, db)
+    pending.saved = True
+    return True
+
+
+def event_id(headers: List[Tuple[str, bytes]]) -> Optional[str]:
+    for key, value in headers or ():
+        if key == HEADER_EVENT_ID and value is not None:
+            try:
+                return value.decode("utf-8")
+            except UnicodeDecodeError:
+                return None
+    return None
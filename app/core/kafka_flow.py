@@ -0,0 +1,263 @@
+"""
+Flow control for KafkaManager consumers
+
+Three pieces, kept free of aiokafka so health checks can import them:
+
+    LagTracker      per-partition lag (end offset - committed offset),
+                    sampled periodically and exported as a gauge
+    AdaptiveLimit   in-flight handler limit; halved while handler latency
+                    is above target, raised while the consumer is behind
+                    and the limit is what holds it back, lowered once it
+                    has caught up
+    OffsetTracker   handlers finish out of order, so each partition
+                    commits up to its oldest unfinished offset only; a
+                    partition is paused while its span of started offsets
+                    is too wide (see `span`)
+
+Fetching itself is paused while the database pools are saturated (see
+`pools_saturated`): more concurrency would only queue for connections.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.metrics import KAFKA_CONSUMER_LAG
+
+
+class PartitionLag(NamedTuple):
+    group: str
+    topic: str
+    partition: int
+    end_offset: int
+    committed: int
+    lag: int
+
+
+class LagTracker:
+    """Latest lag sample of every partition assigned to a sampled consumer"""
+
+    def __init__(self):
+        self._lags: Dict[Tuple[str, str, int], PartitionLag] = {}
+        # consumer -> keys it reported last time, dropped when reassigned
+        self._owned: Dict[int, Set[Tuple[str, str, int]]] = {}
+        self.sampled_at: Optional[float] = None
+        KAFKA_CONSUMER_LAG.add_callback(self._collect)
+
+    async def sample(self, group: str, consumer) -> int:
+        """
+        Refresh the partitions assigned to `consumer`
+
+        Returns:
+            Total lag over those partitions
+        """
+        partitions = list(consumer.assignment())
+        fresh: Dict[Tuple[str, str, int], PartitionLag] = {}
+        if partitions:
+            end_offsets = await consumer.end_offsets(partitions)
+            committed = {tp: await consumer.committed(tp) for tp in partitions}
+            # Nothing committed yet: the group starts from the beginning
+            unstarted = [tp for tp, offset in committed.items() if offset is None]
+            if unstarted:
+                for tp, offset in (await consumer.beginning_offsets(unstarted)).items():
+                    committed[tp] = offset
+            for tp in partitions:
+                end = end_offsets.get(tp, 0)
+                done = committed[tp]
+                fresh[(group, tp.topic, tp.partition)] = PartitionLag(
+                    group, tp.topic, tp.partition, end, done, max(0, end - done)
+                )
+
+        for key in self._owned.get(id(consumer), set()) - fresh.keys():
+            self._lags.pop(key, None)
+        self._owned[id(consumer)] = set(fresh)
+        self._lags.update(fresh)
+        self.sampled_at = time.time()
+        return sum(entry.lag for entry in fresh.values())
+
+    def forget(self, consumer):
+        for key in self._owned.pop(id(consumer), ()):
+            self._lags.pop(key, None)
+
+    def snapshot(self) -> List[PartitionLag]:
+        return sorted(self._lags.values())
+
+    def by_topic(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for entry in self._lags.values():
+            totals[entry.topic] = totals.get(entry.topic, 0) + entry.lag
+        return totals
+
+    def max_lag(self) -> int:
+        return max((entry.lag for entry in self._lags.values()), default=0)
+
+    def _collect(self):
+        for entry in list(self._lags.values()):
+            yield (entry.group, entry.topic, entry.partition), entry.lag
+
+
+class AdaptiveLimit:
+    """
+    Resizable concurrency limit (additive increase, multiplicative decrease)
+
+    Args:
+        minimum, maximum: Bounds of the limit; it starts at `minimum`
+        latency_target: Handler latency (smoothed, seconds) above which the
+            limit is halved
+        lag_threshold: Lag above which the limit may grow
+        smoothing: Weight of the newest latency in the moving average
+    """
+
+    def __init__(self, minimum: int, maximum: int, latency_target: float, lag_threshold: int,
+                 smoothing: float = 0.2):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_target = latency_target
+        self.lag_threshold = lag_threshold
+        self.smoothing = smoothing
+        self.limit = self.minimum
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        # Set when a message had to wait for a slot since the last adjust
+        self._saturated = False
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        self._saturated = True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def observe(self, seconds: float):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.smoothing * (seconds - self.latency)
+
+    def adjust(self, lag: int) -> int:
+        """Resize from the latest lag sample; returns the new limit"""
+        if self.latency is not None and self.latency > self.latency_target:
+            # The handlers (or what they call) are struggling: back off hard
+            limit = max(self.minimum, self.limit // 2)
+        elif lag > self.lag_threshold and self._saturated:
+            limit = min(self.maximum, self.limit + max(1, self.limit // 4))
+        elif lag == 0:
+            limit = max(self.minimum, self.limit - 1)
+        else:
+            limit = self.limit
+        self._saturated = False
+        self.limit = limit
+        self._wake()
+        return limit
+
+
+class OffsetTracker:
+    """Commit positions of partitions whose messages complete out of order"""
+
+    def __init__(self):
+        # partition -> offsets started, oldest first
+        self._pending: Dict[Hashable, Deque[int]] = {}
+        self._done: Dict[Hashable, Set[int]] = {}
+        # partition -> position everything before which has completed
+        self._completed: Dict[Hashable, int] = {}
+        self._committed: Dict[Hashable, int] = {}
+        # Partitions with completions since the last checkpoint
+        self._dirty: Set[Hashable] = set()
+
+    def start(self, tp: Hashable, offset: int):
+        self._pending.setdefault(tp, deque()).append(offset)
+
+    def finish(self, tp: Hashable, offset: int):
+        pending = self._pending.get(tp)
+        if not pending:
+            return
+        done = self._done.setdefault(tp, set())
+        done.add(offset)
+        self._dirty.add(tp)
+        while pending and pending[0] in done:
+            done.discard(pending[0])
+            self._completed[tp] = pending.popleft() + 1
+
+    def in_flight(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    def span(self, tp: Hashable) -> int:
+        """
+        Offsets from the oldest unfinished message to the newest started one;
+        bounds what is held in memory for the partition while that oldest
+        message is stuck
+        """
+        pending = self._pending.get(tp)
+        return pending[-1] - pending[0] + 1 if pending else 0
+
+    def committable(self) -> Dict[Hashable, int]:
+        """Positions that moved since they were last marked committed"""
+        return {
+            tp: position for tp, position in self._completed.items()
+            if position > self._committed.get(tp, -1)
+        }
+
+    def mark_committed(self, positions: Dict[Hashable, int]):
+        self._committed.update(positions)
+
+    def checkpoints(self) -> Dict[Hashable, Tuple[int, Set[int]]]:
+        """
+        (lowest unfinished offset, offsets above it already finished) of
+        each partition with completions since the last call
+        """
+        result = {}
+        for tp in self._dirty:
+            pending = self._pending.get(tp)
+            position = pending[0] if pending else self._completed.get(tp)
+            if position is not None:
+                result[tp] = (position, set(self._done.get(tp, ())))
+        self._dirty.clear()
+        return result
+
+    def drop(self, partitions: Iterable[Hashable]):
+        """Forget revoked partitions; their unfinished messages are redelivered"""
+        for tp in partitions:
+            for state in (self._pending, self._done, self._completed, self._committed):
+                state.pop(tp, None)
+            self._dirty.discard(tp)
+
+
+def pools_saturated(databases_, threshold: float) -> bool:
+    """
+    True when any pool has (almost) all of its connections checked out
+
+    Args:
+        databases_: InstrumentedDatabase instances
+        threshold: Fraction of the pool's maximum size in use
+    """
+    for database in databases_:
+        stats = database.pool_stats()
+        if not stats:
+            continue
+        capacity = stats.get("max") or stats["size"]
+        if capacity and not stats["idle"] and stats["in_use"] >= threshold * capacity:
+            return True
+    return False
+
+
+consumer_lag = LagTracker()
@@ -1,77 +1,633 @@
 import asyncio
 import json
-from aiokafka import AIOKafkaConsumer, TopicPartition, AIOKafkaProducer
+import time
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition, AIOKafkaProducer
 from aiokafka.structs import OffsetAndMetadata
-from typing import Optional
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from app.config import settings
 from app.core.dispatcher import dispatch_event  # your message dispatch logic
+from app.core.kafka_dedup import (
+    HEADER_EVENT_ID,
+    Checkpoint,
+    CheckpointStore,
+    DedupWindow,
+    PendingCheckpoint,
+    begin_batch,
+    end_batch,
+    event_id,
+)
+from app.core.kafka_flow import AdaptiveLimit, OffsetTracker, consumer_lag, pools_saturated
+from app.core.kafka_retry import RetryPolicy, decode_headers, due_at, failure_headers
 from app.core.logging_config import get_logger
+from app.core.metrics import (
+    KAFKA_MESSAGES_PRODUCED,
+    KAFKA_PRODUCE_ERRORS,
+    KAFKA_MESSAGES_CONSUMED,
+    KAFKA_CONSUME_ERRORS,
+    KAFKA_MESSAGES_RETRIED,
+    KAFKA_MESSAGES_DEAD_LETTERED,
+    KAFKA_CONSUMER_CONCURRENCY,
+    KAFKA_FETCH_PAUSES,
+    KAFKA_MESSAGES_DEDUPLICATED,
+)
+from app.core.request_timing import record_phase, timed_phase
 
 logger = get_logger(__name__)
 
+# Seconds in-flight messages get to finish on shutdown or revocation
+_DRAIN_TIMEOUT = 5.0
+
+
+class _ConsumerFlow:
+    """Concurrency and commit state of one topic_group_map consumer"""
+
+    def __init__(self, consumer: AIOKafkaConsumer, group: str, topic: str, limit: AdaptiveLimit,
+                 window: Optional[DedupWindow] = None):
+        self.consumer = consumer
+        self.group = group
+        self.topic = topic
+        self.limit = limit
+        self.offsets = OffsetTracker()
+        # Set when duplicates are skipped (KAFKA_DEDUP_ENABLED)
+        self.window = window
+        self.checkpoints = CheckpointStore(group) if window is not None else None
+        # In-flight task -> its partition
+        self.tasks: Dict[asyncio.Task, TopicPartition] = {}
+        # Message key -> latest task for it, which the next one waits for
+        self.key_tails: Dict[bytes, asyncio.Task] = {}
+        self.paused = False
+        # Partitions paused until their oldest unfinished message completes
+        self.held: Set[TopicPartition] = set()
+
+
+class _RestoreCheckpoints(ConsumerRebalanceListener):
+    """Loads the dedup checkpoints of assigned partitions before they are fetched"""
+
+    def __init__(self, store: Optional[CheckpointStore], window: Optional[DedupWindow]):
+        self.store = store
+        self.window = window
+
+    async def on_partitions_revoked(self, revoked):
+        if self.window is not None:
+            self.window.forget(revoked)
+
+    async def on_partitions_assigned(self, assigned):
+        if self.window is not None:
+            await self.store.restore(self.window, assigned)
+
+
+class _DrainOnRevoke(_RestoreCheckpoints):
+    """Also finishes and commits a revoked partition's messages before it moves"""
+
+    def __init__(self, manager: "KafkaManager", flow: _ConsumerFlow):
+        super().__init__(flow.checkpoints, flow.window)
+        self.manager = manager
+        self.flow = flow
+
+    async def on_partitions_revoked(self, revoked):
+        revoked = set(revoked)
+        await self.manager._drain(self.flow, revoked)
+        self.flow.offsets.drop(revoked)
+        await super().on_partitions_revoked(revoked)
+
+
 class KafkaManager:
-    def __init__(self, topic_group_map: dict, kafka_config: dict):
+    def __init__(self, topic_group_map: dict, kafka_config: dict, retry_policy: Optional[RetryPolicy] = None,
+                 pools: Optional[Iterable] = None):
+        """
+        Args:
+            pools: Databases whose saturation pauses fetching; both
+                application pools by default
+        """
         self.topic_group_map = topic_group_map
         self.kafka_config = kafka_config
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        if pools is None:
+            from app.core.db_session import database_r, database_w
+            pools = (database_r, database_w)
+        self.pools = list(pools)
         self.consumers = []
         self.tasks = []
+        self._flows: List[_ConsumerFlow] = []
+        self._batch_consumers: List[Tuple[str, AIOKafkaConsumer]] = []
+        self._sampler: Optional[asyncio.Task] = None
+        KAFKA_CONSUMER_CONCURRENCY.add_callback(self._collect_concurrency)
         self.loop = asyncio.get_event_loop()
         self.running = False
+        # Set once the matching consumer has joined its group
+        self.started_events: List[asyncio.Event] = []
 
         # Producer
         self.producer: Optional[AIOKafkaProducer] = None
 
-    async def _consume_topic(self, topic: str, group_id: str):
+    async def _route_failure(self, topic: str, msg, attempt: int, error: Exception, retryable: bool) -> bool:
+        """
+        Republish a failed message to its next retry topic or the DLQ
+
+        Returns:
+            False if it could not be forwarded (it must then be read again)
+        """
+        destination, due = self.retry_policy.route(topic, attempt, retryable)
+        retries = attempt + 1 if due is not None else attempt
+        try:
+            await self.forward(destination, msg.key, msg.value, failure_headers(msg, topic, retries, error, due))
+        except Exception as e:
+            logger.error("Could not forward failed message from %s to %s: %s", msg.topic, destination, e)
+            return False
+        if due is not None:
+            KAFKA_MESSAGES_RETRIED.labels(topic).inc()
+            logger.warning(
+                "Message from %s at offset %s failed (%s), retry %s in %.0fs",
+                msg.topic, msg.offset, error, retries, due - time.time()
+            )
+        else:
+            KAFKA_MESSAGES_DEAD_LETTERED.labels(topic).inc()
+            logger.error(
+                "Message from %s at offset %s failed (%s) after %s retries, sent to %s",
+                msg.topic, msg.offset, error, retries, destination
+            )
+        return True
+
+    async def _forward_failure(self, topic: str, msg, attempt: int, error: Exception, retryable: bool) -> bool:
+        """_route_failure, tried up to KAFKA_FORWARD_ATTEMPTS times"""
+        for tries in range(1, settings.kafka.forward_attempts + 1):
+            if await self._route_failure(topic, msg, attempt, error, retryable):
+                return True
+            if tries < settings.kafka.forward_attempts:
+                await asyncio.sleep(self.retry_policy.delay(tries))
+        return False
+
+    async def _wait_due(self, msg):
+        # Retry topics have one delay each, so their messages fall due in order
+        delay = due_at(decode_headers(msg.headers)) - time.time()
+        if delay > 0:
+            await asyncio.sleep(min(delay, self.retry_policy.max_backoff))
+
+    async def _process(self, flow: "_ConsumerFlow", tp: TopicPartition, msg, topic: str, attempt: int,
+                       previous: Optional[asyncio.Task]):
+        """Handle one message inside its concurrency slot, then mark its offset done"""
+        try:
+            if previous is not None:
+                # Same key: keep the order the partition gave them
+                await asyncio.wait({previous})
+            if attempt:
+                await self._wait_due(msg)
+            event = event_id(msg.headers) if flow.window is not None else None
+            if event is not None and flow.window.seen_event(event):
+                # Republished copy of an event handled moments ago
+                KAFKA_MESSAGES_DEDUPLICATED.labels(topic, "event").inc()
+                logger.debug("Skipping duplicate %s %s at offset %s", HEADER_EVENT_ID, event, msg.offset)
+                flow.offsets.finish(tp, msg.offset)
+                return
+            error = None
+            retryable = True
+            start = time.perf_counter()
+            try:
+                payload = json.loads(msg.value.decode("utf-8"))
+            except ValueError as e:
+                # Undecodable: retrying cannot help
+                error, retryable = e, False
+            else:
+                try:
+                    logger.debug("Received from %s at offset %s: %s", flow.topic, msg.offset, payload)
+                    await dispatch_event(topic, payload, kafka_manager=self)
+                    KAFKA_MESSAGES_CONSUMED.labels(topic).inc()
+                    if event is not None:
+                        flow.window.record_event(event)
+                except Exception as e:
+                    error = e
+            flow.limit.observe(time.perf_counter() - start)
+
+            if error is not None:
+                KAFKA_CONSUME_ERRORS.labels(topic).inc()
+                logger.error("Error processing message from %s: %s", flow.topic, error)
+                if not await self._forward_failure(topic, msg, attempt, error, retryable):
+                    # Committing past it would lose it: the partition's commit
+                    # position stays here until the message is read again
+                    logger.error(
+                        "Giving up forwarding message from %s partition %s at offset %s; its commit is held "
+                        "until the partition is reassigned or the consumer restarts",
+                        msg.topic, msg.partition, msg.offset
+                    )
+                    return
+            flow.offsets.finish(tp, msg.offset)
+        finally:
+            flow.limit.release()
+
+    def _spawn(self, flow: "_ConsumerFlow", tp: TopicPartition, msg, topic: str, attempt: int):
+        previous = flow.key_tails.get(msg.key) if msg.key is not None else None
+        task = asyncio.create_task(self._process(flow, tp, msg, topic, attempt, previous))
+        flow.tasks[task] = tp
+        if msg.key is not None:
+            flow.key_tails[msg.key] = task
+
+        def done(finished: asyncio.Task, key=msg.key):
+            flow.tasks.pop(finished, None)
+            if key is not None and flow.key_tails.get(key) is finished:
+                del flow.key_tails[key]
+
+        task.add_done_callback(done)
+
+    async def _commit(self, flow: "_ConsumerFlow"):
+        positions = flow.offsets.committable()
+        assignment = flow.consumer.assignment()
+        revoked = [tp for tp in positions if tp not in assignment]
+        if revoked:
+            flow.offsets.drop(revoked)
+            for tp in revoked:
+                del positions[tp]
+        if flow.checkpoints is not None:
+            # Before the offsets: a checkpoint ahead of the commit is harmless
+            checkpoints = {
+                tp: Checkpoint(position, frozenset(done))
+                for tp, (position, done) in flow.offsets.checkpoints().items()
+                if tp in assignment
+            }
+            try:
+                await flow.checkpoints.save(checkpoints)
+            except Exception as e:
+                logger.warning("Could not save consumer checkpoints for %s: %s", flow.topic, e)
+        if not positions:
+            return
+        try:
+            await flow.consumer.commit({tp: OffsetAndMetadata(position, "") for tp, position in positions.items()})
+            flow.offsets.mark_committed(positions)
+            logger.debug("Committed %s for topic %s", positions, flow.topic)
+        except Exception as e:
+            # Retried with the next batch; redelivered after a rebalance at worst
+            logger.error("Commit failed for %s at %s: %s", flow.topic, positions, e)
+
+    async def _drain(self, flow: "_ConsumerFlow", partitions=None, timeout: float = _DRAIN_TIMEOUT):
+        """
+        Let the in-flight messages of `partitions` (all by default) finish,
+        cancel the stragglers and commit what completed
+        """
+        tasks = [task for task, tp in flow.tasks.items() if partitions is None or tp in partitions]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self._commit(flow)
+
+    def _throttle(self, flow: "_ConsumerFlow") -> bool:
+        """
+        Pause fetching while a database pool is saturated, and partitions
+        held back by a stuck message; True while everything is paused
+        """
+        assignment = flow.consumer.assignment()
+        if pools_saturated(self.pools, settings.kafka.pool_saturation):
+            if not flow.paused:
+                KAFKA_FETCH_PAUSES.labels(flow.topic).inc()
+                logger.warning("Database pools saturated, pausing fetches from %s", flow.topic)
+                flow.paused = True
+            # Again every round: a rebalance may have assigned new partitions
+            flow.consumer.pause(*assignment)
+        elif flow.paused:
+            flow.consumer.resume(*(assignment - flow.held))
+            flow.paused = False
+            logger.info("Resumed fetches from %s", flow.topic)
+        self._hold_back(flow, assignment)
+        return flow.paused
+
+    def _hold_back(self, flow: "_ConsumerFlow", assignment):
+        """
+        Pause partitions whose oldest unfinished message holds back more than
+        KAFKA_MAX_DONE_SPAN offsets, until the span has halved
+        """
+        limit = settings.kafka.max_done_span
+        flow.held &= assignment
+        if limit <= 0:
+            return
+        for tp in assignment:
+            span = flow.offsets.span(tp)
+            if tp in flow.held:
+                if span <= limit // 2:
+                    flow.held.discard(tp)
+                    if not flow.paused:
+                        flow.consumer.resume(tp)
+                    logger.info("Resumed fetches from %s partition %s", tp.topic, tp.partition)
+            elif span > limit:
+                flow.held.add(tp)
+                flow.consumer.pause(tp)
+                KAFKA_FETCH_PAUSES.labels(flow.topic).inc()
+                logger.warning(
+                    "Pausing %s partition %s: %s offsets started past its oldest unfinished message",
+                    tp.topic, tp.partition, span
+                )
+
+    async def _consume_topic(self, topic: str, group_id: str, started: Optional[asyncio.Event] = None,
+                             attempt: int = 0):
+        """
+        Args:
+            topic: Source topic; its handler is looked up by this name
+            attempt: 0 for the topic itself, N for its Nth retry topic
+        """
+        subscribed = self.retry_policy.retry_topic(topic, attempt) if attempt else topic
+        # Retry consumers get their own group: joining the main one would
+        # rebalance it whenever one of them starts or stops
+        group_id = self.retry_policy.retry_group(group_id, attempt) if attempt else group_id
         consumer = AIOKafkaConsumer(
-            topic,
             loop=self.loop,
             bootstrap_servers=self.kafka_config["bootstrap.servers"],
             group_id=group_id,
             enable_auto_commit=False,  # Manual commit
             auto_offset_reset="earliest"
         )
+        flow = _ConsumerFlow(consumer, group_id, subscribed, AdaptiveLimit(
+            settings.kafka.min_concurrency,
+            settings.kafka.max_concurrency,
+            settings.kafka.latency_target,
+            settings.kafka.lag_scale_up
+        ), window=self._dedup_window() if settings.kafka.dedup_enabled else None)
         await consumer.start()
+        consumer.subscribe([subscribed], listener=_DrainOnRevoke(self, flow))
         self.consumers.append(consumer)
-        logger.info(f"Started consuming topic: {topic} with group: {group_id}")
+        self._flows.append(flow)
+        self._start_lag_sampler()
+        if started is not None:
+            started.set()
+        logger.info(f"Started consuming topic: {subscribed} with group: {group_id}")
 
         try:
-            async for msg in consumer:
-                logger.info(msg.offset)
+            while True:
+                paused = self._throttle(flow)
+                # Poll briefly while paused or busy, so completions get committed
+                timeout = settings.kafka.pause_interval if paused or flow.tasks else 1.0
+                batches = await consumer.getmany(timeout_ms=int(timeout * 1000), max_records=flow.limit.maximum)
+                for tp, messages in batches.items():
+                    for msg in messages:
+                        if flow.window is not None and flow.window.seen_offset(tp, msg.offset):
+                            # Handled before the last restart or rebalance
+                            flow.offsets.start(tp, msg.offset)
+                            flow.offsets.finish(tp, msg.offset)
+                            KAFKA_MESSAGES_DEDUPLICATED.labels(topic, "offset").inc()
+                            continue
+                        await flow.limit.acquire()
+                        if tp not in consumer.assignment():
+                            # Revoked while waiting for a slot
+                            flow.limit.release()
+                            break
+                        flow.offsets.start(tp, msg.offset)
+                        self._spawn(flow, tp, msg, topic, attempt)
+                # One commit per batch, up to the oldest unfinished offset
+                await self._commit(flow)
+        except asyncio.CancelledError:
+            logger.error(f"Consumer task cancelled for topic: {subscribed}")
+        finally:
+            await self._drain(flow)
+            self._flows.remove(flow)
+            consumer_lag.forget(consumer)
+            await consumer.stop()
+            logger.info(f"Stopped consumer for topic: {subscribed}")
+
+    async def _sample_lag(self):
+        while True:
+            await asyncio.sleep(settings.kafka.lag_sample_interval)
+            for group, consumer, limit in list(self._lag_sources()):
                 try:
-                    payload = json.loads(msg.value.decode("utf-8"))
-                    logger.info(f"Received from {topic}: {payload}")
-                    await dispatch_event(topic, payload, kafka_manager=self)
+                    lag = await consumer_lag.sample(group, consumer)
+                except Exception as e:
+                    logger.warning("Lag sampling failed for group %s: %s", group, e)
+                    continue
+                if limit is not None:
+                    before = limit.limit
+                    if limit.adjust(lag) != before:
+                        logger.info(
+                            "Consumer concurrency for group %s: %s -> %s (lag %s, latency %.3fs)",
+                            group, before, limit.limit, lag, limit.latency or 0.0
+                        )
 
-                    # Manual commit equivalent to .commit(msg)
-                    tp = TopicPartition(msg.topic, msg.partition)
-                    await consumer.commit({tp: OffsetAndMetadata(msg.offset + 1, "")})
-                    logger.info(f"Committed offset {msg.offset + 1} for topic {topic}")
+    def _lag_sources(self):
+        for flow in self._flows:
+            yield flow.group, flow.consumer, flow.limit
+        for group, consumer in self._batch_consumers:
+            yield group, consumer, None
 
-                except Exception as e:
-                    logger.error(f"Error processing message from {topic}: {e}")
-        except asyncio.CancelledError:
-            logger.error(f"Consumer task cancelled for topic: {topic}")
+    def _start_lag_sampler(self):
+        if self._sampler is None or self._sampler.done():
+            self._sampler = asyncio.create_task(self._sample_lag())
+
+    @staticmethod
+    def _dedup_window() -> DedupWindow:
+        return DedupWindow(settings.kafka.dedup_window, settings.kafka.dedup_error_rate)
+
+    def _collect_concurrency(self):
+        for flow in list(self._flows):
+            yield (flow.topic, "limit"), flow.limit.limit
+            yield (flow.topic, "in_flight"), flow.limit.in_flight
+
+    async def _check_topics(self):
+        """Fail fast when a retry or dead-letter topic failures go to is missing"""
+        expected = set()
+        for topic in self.topic_group_map:
+            expected.add(self.retry_policy.dead_letter_topic(topic))
+            expected.update(
+                self.retry_policy.retry_topic(topic, attempt)
+                for attempt in range(1, self.retry_policy.attempts + 1)
+            )
+        if not expected:
+            return
+        consumer = AIOKafkaConsumer(loop=self.loop, bootstrap_servers=self.kafka_config["bootstrap.servers"])
+        await consumer.start()
+        try:
+            missing = sorted(expected - await consumer.topics())
         finally:
             await consumer.stop()
-            logger.info(f"Stopped consumer for topic: {topic}")
+        if missing:
+            raise RuntimeError(f"Kafka topics not found: {', '.join(missing)}")
 
-    async def start_consumers(self):
+    async def start_consumers(self, wait: bool = False):
+        """
+        Args:
+            wait: Return only once every consumer has started; raises the
+                error of the first consumer that failed to start instead
+        """
         if self.running:
             logger.info("Consumers already running.")
             return
 
+        await self._check_topics()
         self.running = True
         for topic, group_id in self.topic_group_map.items():
-            task = asyncio.create_task(self._consume_topic(topic, group_id))
-            self.tasks.append(task)
+            # The topic itself plus one consumer per retry topic
+            for attempt in range(self.retry_policy.attempts + 1):
+                started = asyncio.Event()
+                task = asyncio.create_task(self._consume_topic(topic, group_id, started, attempt))
+                self.started_events.append(started)
+                self.tasks.append(task)
         logger.info(f"Started {len(self.tasks)} consumer tasks.")
 
+        if wait:
+            await asyncio.gather(*(
+                self._wait_started(task, started)
+                for task, started in zip(self.tasks, self.started_events)
+            ))
+
+    @staticmethod
+    async def _wait_started(task: asyncio.Task, started: asyncio.Event):
+        waiter = asyncio.ensure_future(started.wait())
+        try:
+            await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        if not started.is_set():
+            # The consumer task ended before joining its group
+            exception = task.exception() if not task.cancelled() else None
+            raise exception or RuntimeError("Kafka consumer stopped before starting")
+
+    async def _consume_batches(
+            self,
+            topic: str,
+            group_id: Optional[str],
+            handler: Callable[[List[dict]], Awaitable[None]],
+            max_records: int,
+            started: asyncio.Event,
+            auto_commit: bool,
+            offset_reset: str,
+            dedup: bool
+    ):
+        # Without a group every partition is assigned and nothing is committed
+        commits = group_id is not None and not auto_commit
+        consumer = AIOKafkaConsumer(
+            loop=self.loop,
+            bootstrap_servers=self.kafka_config["bootstrap.servers"],
+            group_id=group_id,
+            enable_auto_commit=auto_commit and group_id is not None,
+            auto_offset_reset=offset_reset
+        )
+        window = self._dedup_window() if dedup else None
+        store = CheckpointStore(group_id) if dedup else None
+        await consumer.start()
+        self.consumers.append(consumer)
+        if group_id is None:
+            consumer.subscribe([topic])
+        else:
+            consumer.subscribe([topic], listener=_RestoreCheckpoints(store, window))
+            # Lag is measured against committed offsets, so only for groups
+            self._batch_consumers.append((group_id, consumer))
+            self._start_lag_sampler()
+        started.set()
+        logger.info(f"Started batch consumer for topic: {topic} with group: {group_id}")
+
+        try:
+            while True:
+                batches = await consumer.getmany(timeout_ms=1000, max_records=max_records)
+                payloads = []
+                skipped = 0
+                for tp, messages in batches.items():
+                    for msg in messages:
+                        if window is not None and window.seen_offset(tp, msg.offset):
+                            skipped += 1
+                            continue
+                        try:
+                            payloads.append(json.loads(msg.value.decode("utf-8")))
+                        except ValueError:
+                            KAFKA_CONSUME_ERRORS.labels(topic).inc()
+                            logger.warning("Skipping undecodable message on %s at offset %s", topic, msg.offset)
+                if skipped:
+                    KAFKA_MESSAGES_DEDUPLICATED.labels(topic, "offset").inc(skipped)
+                if not payloads:
+                    if batches and commits:
+                        await consumer.commit()
+                    continue
+                pending = token = None
+                if store is not None:
+                    pending = PendingCheckpoint(store, {
+                        tp: Checkpoint(messages[-1].offset + 1) for tp, messages in batches.items()
+                    })
+                    token = begin_batch(pending)
+                try:
+                    await handler(payloads)
+                    KAFKA_MESSAGES_CONSUMED.labels(topic).inc(len(payloads))
+                except Exception as e:
+                    KAFKA_CONSUME_ERRORS.labels(topic).inc(len(payloads))
+                    logger.error("Error processing batch from %s: %s", topic, e)
+                    if commits:
+                        # Rewind so the batch is retried instead of skipped
+                        for tp, messages in batches.items():
+                            consumer.seek(tp, messages[0].offset)
+                        await asyncio.sleep(1)
+                    continue
+                finally:
+                    if token is not None:
+                        end_batch(token)
+                if pending is not None and not pending.saved:
+                    await self._save_checkpoint(pending)
+                if commits:
+                    try:
+                        await consumer.commit()
+                    except Exception as e:
+                        # The batch is handled: rewinding would handle it twice
+                        logger.error("Commit failed for batch from %s: %s", topic, e)
+        except asyncio.CancelledError:
+            logger.info(f"Batch consumer task cancelled for topic: {topic}")
+        finally:
+            if group_id is not None:
+                self._batch_consumers.remove((group_id, consumer))
+            consumer_lag.forget(consumer)
+            await consumer.stop()
+            logger.info(f"Stopped batch consumer for topic: {topic}")
+
+    @staticmethod
+    async def _save_checkpoint(pending: PendingCheckpoint):
+        try:
+            await pending.store.save(pending.checkpoints)
+        except Exception as e:
+            # The batch is handled: failing it now would handle it twice
+            logger.warning("Could not save consumer checkpoints for group %s: %s", pending.store.group, e)
+
+    async def start_batch_consumer(
+            self,
+            topic: str,
+            group_id: Optional[str],
+            handler: Callable[[List[dict]], Awaitable[None]],
+            max_records: int = 500,
+            wait: bool = False,
+            auto_commit: bool = True,
+            offset_reset: str = "latest",
+            dedup: bool = False
+    ):
+        """
+        Consume `topic` in batches: `handler` gets every payload polled at once
+
+        With auto_commit offsets are committed in the background, which
+        suits idempotent handlers such as cache eviction. Without it they
+        are committed only after `handler` succeeds, and a failed batch is
+        retried. The task is stopped with the other consumers.
+
+        With dedup a checkpoint of every batch is kept in
+        kafka_consumer_checkpoints and redelivered messages are skipped;
+        `handler` can save it in its own transaction with
+        `kafka_dedup.save_checkpoint(db)` to make that exact.
+
+        With group_id None the consumer joins no group: it reads every
+        partition from `offset_reset` on each start and commits nothing,
+        which suits per-process broadcast topics.
+        """
+        if group_id is None and dedup:
+            raise ValueError("dedup needs a consumer group to checkpoint")
+        started = asyncio.Event()
+        task = asyncio.create_task(self._consume_batches(
+            topic, group_id, handler, max_records, started, auto_commit, offset_reset, dedup
+        ))
+        self.tasks.append(task)
+        self.started_events.append(started)
+        if wait:
+            await self._wait_started(task, started)
+
     async def stop_consumers(self):
         logger.info("Stopping Kafka consumers...")
         self.running = False
+        if self._sampler is not None:
+            self._sampler.cancel()
+            await asyncio.gather(self._sampler, return_exceptions=True)
+            self._sampler = None
         for task in self.tasks:
             task.cancel()
         await asyncio.gather(*self.tasks, return_exceptions=True)
         self.tasks.clear()
+        self.started_events.clear()
         self.consumers.clear()
         logger.info("All Kafka consumers stopped.")
 
@@ -87,8 +643,17 @@ class KafkaManager:
         await self.producer.start()
         logger.info("Kafka producer started.")
 
-    async def stop_producer(self):
+    async def stop_producer(self, flush_timeout: Optional[float] = None):
+        """
+        Args:
+            flush_timeout: Seconds to wait for buffered messages to be
+                delivered before stopping; None waits as long as it takes
+        """
         if self.producer:
+            try:
+                await asyncio.wait_for(self.producer.flush(), timeout=flush_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Kafka producer flush timed out after %ss", flush_timeout)
             await self.producer.stop()
             self.producer = None
             logger.info("Kafka producer stopped.")
@@ -98,12 +663,75 @@ class KafkaManager:
             raise RuntimeError("Producer not started. Call start_producer first.")
 
         try:
-            await self.producer.send_and_wait(
-                topic,
-                json.dumps(value).encode("utf-8"),
-                key=key.encode("utf-8") if key else None,
-            )
-            logger.info(f"Message sent to {topic}: {value}")
+            with timed_phase("kafka"):
+                await self.producer.send_and_wait(
+                    topic,
+                    json.dumps(value).encode("utf-8"),
+                    key=key.encode("utf-8") if key else None,
+                )
+            KAFKA_MESSAGES_PRODUCED.labels(topic).inc()
+            logger.debug("Message sent to %s: %s", topic, value)
         except Exception as e:
-            logger.error(f"Failed to send message to {topic}: {e}")
+            KAFKA_PRODUCE_ERRORS.labels(topic).inc()
+            logger.error("Failed to send message to %s: %s", topic, e)
+
+    async def forward(self, topic: str, key: Optional[bytes], value: bytes, headers: List[Tuple[str, bytes]]):
+        """Publish an already encoded message as-is (retries, dead letters, replays)"""
+        if not self.producer:
+            raise RuntimeError("Producer not started. Call start_producer first.")
+        try:
+            await self.producer.send_and_wait(topic, value, key=key, headers=headers)
+        except Exception:
+            KAFKA_PRODUCE_ERRORS.labels(topic).inc()
+            raise
+        KAFKA_MESSAGES_PRODUCED.labels(topic).inc()
+
+    async def send_messages(
+            self,
+            messages: List[Tuple[str, Optional[str], dict]],
+            headers: Optional[List[List[Tuple[str, bytes]]]] = None
+    ) -> List[Optional[Exception]]:
+        """
+        Publish a batch of (topic, key, value) messages and wait for all acks
+
+        Messages are handed to the producer back to back so they share
+        request batches, instead of one round trip per message.
+
+        Args:
+            headers: Headers of each message, in the order of `messages`
+
+        Returns:
+            One entry per message: None when delivered, else the exception
+        """
+        if not self.producer:
+            raise RuntimeError("Producer not started. Call start_producer first.")
+
+        start = time.perf_counter()
+        futures = []
+        for index, (topic, key, value) in enumerate(messages):
+            try:
+                futures.append(await self.producer.send(
+                    topic,
+                    json.dumps(value).encode("utf-8"),
+                    key=key.encode("utf-8") if key else None,
+                    headers=headers[index] if headers else None,
+                ))
+            except Exception as e:
+                futures.append(e)
+
+        results = []
+        for (topic, _, _), future in zip(messages, futures):
+            if not isinstance(future, Exception):
+                try:
+                    await future
+                    future = None
+                except Exception as e:
+                    future = e
+            if future is None:
+                KAFKA_MESSAGES_PRODUCED.labels(topic).inc()
+            else:
+                KAFKA_PRODUCE_ERRORS.labels(topic).inc()
+            results.append(future)
+        record_phase("kafka", time.perf_counter() - start)
+        return results
 
@@ -0,0 +1,140 @@
+"""
+Retry and dead-letter routing for KafkaManager consumers
+
+A message whose handler raises is not retried in place, which would block
+its partition. It is republished to the next retry topic instead,
+`<topic><retry suffix>-<attempt>`, and its offset is committed. Each retry
+topic has its own consumer and a fixed delay, so its messages fall due in
+the order they were written; the consumer simply waits for the head of
+the topic. The delay doubles with every attempt, up to `max_backoff`.
+Retry consumers join their own group, `<group><retry suffix>-<attempt>`,
+so they never rebalance the topic's main consumer.
+After `attempts` retries, or straight away for a message that cannot be
+decoded, the message goes to `<topic><dead letter suffix>`, where
+`python -m app.cli.replay_dlq` can replay it.
+
+Value and key are forwarded untouched; the routing state travels in
+headers:
+
+    x-original-topic, x-original-partition, x-original-offset
+    x-attempt      retries so far
+    x-due-at       epoch seconds before which a retry must not run
+    x-error-type, x-error, x-failed-at
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+HEADER_ORIGINAL_TOPIC = "x-original-topic"
+HEADER_ORIGINAL_PARTITION = "x-original-partition"
+HEADER_ORIGINAL_OFFSET = "x-original-offset"
+HEADER_ATTEMPT = "x-attempt"
+HEADER_DUE_AT = "x-due-at"
+HEADER_ERROR_TYPE = "x-error-type"
+HEADER_ERROR = "x-error"
+HEADER_FAILED_AT = "x-failed-at"
+
+# Routing headers dropped when a dead letter is replayed from scratch
+ROUTING_HEADERS = (HEADER_ATTEMPT, HEADER_DUE_AT)
+
+_MAX_ERROR_LENGTH = 1000
+
+
+class RetryPolicy:
+    """
+    Args:
+        attempts: Retries before a message is dead-lettered; 0 dead-letters
+            on the first failure
+        backoff: Delay before the first retry, in seconds
+        max_backoff: Upper bound for the doubled delays
+    """
+
+    def __init__(self, attempts: int, backoff: float, max_backoff: float,
+                 retry_suffix: str = ".retry", dead_letter_suffix: str = ".dlq"):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_suffix = retry_suffix
+        self.dead_letter_suffix = dead_letter_suffix
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        return cls(
+            settings.kafka.retry_attempts,
+            settings.kafka.retry_backoff,
+            settings.kafka.retry_max_backoff,
+            settings.kafka.retry_topic_suffix,
+            settings.kafka.dead_letter_suffix
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Seconds retry `attempt` (1-based) waits after the failure"""
+        return min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+
+    def retry_topic(self, topic: str, attempt: int) -> str:
+        return f"{topic}{self.retry_suffix}-{attempt}"
+
+    def retry_group(self, group: str, attempt: int) -> str:
+        return f"{group}{self.retry_suffix}-{attempt}"
+
+    def dead_letter_topic(self, topic: str) -> str:
+        return f"{topic}{self.dead_letter_suffix}"
+
+    def route(self, topic: str, attempt: int, retryable: bool = True) -> Tuple[str, Optional[float]]:
+        """
+        Where a message that failed on `attempt` (0 = the main topic) goes
+
+        Returns:
+            (destination topic, due_at epoch seconds or None for the DLQ)
+        """
+        next_attempt = attempt + 1
+        if retryable and next_attempt <= self.attempts:
+            return self.retry_topic(topic, next_attempt), time.time() + self.delay(next_attempt)
+        return self.dead_letter_topic(topic), None
+
+
+def decode_headers(headers) -> Dict[str, str]:
+    """aiokafka (key, bytes) header pairs as a str dict; undecodable values are skipped"""
+    decoded = {}
+    for key, value in headers or ():
+        try:
+            decoded[key] = value.decode("utf-8") if value is not None else ""
+        except UnicodeDecodeError:
+            continue
+    return decoded
+
+
+def encode_headers(headers: Dict[str, str]) -> List[Tuple[str, bytes]]:
+    return [(key, value.encode("utf-8")) for key, value in headers.items()]
+
+
+def due_at(headers: Dict[str, str]) -> float:
+    try:
+        return float(headers.get(HEADER_DUE_AT, 0))
+    except ValueError:
+        return 0.0
+
+
+def failure_headers(msg, topic: str, attempt: int, error: BaseException,
+                    due: Optional[float]) -> List[Tuple[str, bytes]]:
+    """
+    Headers for forwarding `msg` after a failure; the original position is
+    kept from the first failure
+
+    Args:
+        attempt: Retries the message will have had once forwarded
+    """
+    headers = decode_headers(msg.headers)
+    headers.setdefault(HEADER_ORIGINAL_TOPIC, topic)
+    headers.setdefault(HEADER_ORIGINAL_PARTITION, str(msg.partition))
+    headers.setdefault(HEADER_ORIGINAL_OFFSET, str(msg.offset))
+    headers[HEADER_ATTEMPT] = str(attempt)
+    headers[HEADER_ERROR_TYPE] = type(error).__name__
+    headers[HEADER_ERROR] = str(error)[:_MAX_ERROR_LENGTH]
+    headers[HEADER_FAILED_AT] = f"{time.time():.3f}"
+    if due is not None:
+        headers[HEADER_DUE_AT] = f"{due:.3f}"
+    else:
+        headers.pop(HEADER_DUE_AT, None)
+    return encode_headers(headers)
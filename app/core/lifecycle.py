@@ -0,0 +1,102 @@
+import asyncio
+import signal
+import threading
+from typing import Callable, Dict, Optional
+
+
+class Readiness:
+    """Whether the service may receive traffic, and why not"""
+
+    def __init__(self):
+        self.ready = False
+        self.reason: Optional[str] = "starting"
+
+    def mark_ready(self):
+        self.ready = True
+        self.reason = None
+
+    def mark_not_ready(self, reason: str):
+        self.ready = False
+        self.reason = reason
+
+
+class RequestTracker:
+    """Counts in-flight HTTP requests so shutdown can wait for them"""
+
+    def __init__(self):
+        self.active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def started(self):
+        self.active += 1
+        self._idle.clear()
+
+    def finished(self):
+        self.active -= 1
+        if self.active <= 0:
+            self.active = 0
+            self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """
+        Returns:
+            True when all requests finished within `timeout` seconds
+        """
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class DrainOnSignal:
+    """
+    Report not-ready as soon as SIGTERM arrives, and pass the signal on to
+    the server (which closes its listener) only `delay` seconds later
+
+    Without the delay the server stops accepting connections at once, so
+    the readiness probe never gets to return 503 before the process is
+    gone. The server's own handler is chained, not replaced; a second
+    SIGTERM is passed on immediately.
+    """
+
+    def __init__(self, readiness_: Readiness, delay: float, signals=(signal.SIGTERM,)):
+        self.readiness = readiness_
+        self.delay = delay
+        self.signals = signals
+        self._previous: Dict[int, Callable] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._draining = False
+
+    def install(self):
+        # Signal handlers can only be set from the main thread
+        if self.delay <= 0 or threading.current_thread() is not threading.main_thread():
+            return
+        self._loop = asyncio.get_running_loop()
+        for sig in self.signals:
+            previous = signal.getsignal(sig)
+            if callable(previous):
+                # Only chain a handler the server installed; with the
+                # default disposition there is nobody to hand over to
+                self._previous[sig] = previous
+                signal.signal(sig, self._handle)
+
+    def uninstall(self):
+        for sig, previous in self._previous.items():
+            if signal.getsignal(sig) == self._handle:
+                signal.signal(sig, previous)
+        self._previous.clear()
+
+    def _handle(self, signum, frame):
+        previous = self._previous[signum]
+        if self._draining or not self.readiness.ready:
+            previous(signum, frame)
+            return
+        self._draining = True
+        self.readiness.mark_not_ready("draining")
+        self._loop.call_soon_threadsafe(self._loop.call_later, self.delay, previous, signum, None)
+
+
+readiness = Readiness()
+request_tracker = RequestTracker()
@@ -0,0 +1,146 @@
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Union
+
+
+def _level_number(level: Union[int, str]) -> int:
+    if isinstance(level, int):
+        return level
+    return logging.getLevelName(level.upper())
+
+
+def _annotate_suppressed(record: logging.LogRecord, count: int):
+    """
+    Tell the reader how many similar records were dropped before this one
+
+    Works on the unformatted record so no string is built here.
+    """
+    if isinstance(record.args, tuple) and record.args:
+        record.msg = f"{record.msg} (%d similar suppressed)"
+        record.args = record.args + (count,)
+    elif not record.args:
+        record.msg = f"{record.msg} ({count} similar suppressed)"
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through roughly `rate` of the records below `exempt_level`
+
+    Args:
+        rate: Fraction of records to keep (0.0 - 1.0)
+        exempt_level: Records at or above this level are never sampled out
+    """
+
+    def __init__(self, rate: float = 1.0, exempt_level: Union[int, str] = logging.WARNING):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, float(rate)))
+        self.exempt_level = _level_number(exempt_level)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.exempt_level or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket over the records below `exempt_level`
+
+    Args:
+        rate: Records per second refilled into the bucket
+        burst: Bucket size, i.e. how many records may pass back to back
+        exempt_level: Records at or above this level always pass
+    """
+
+    def __init__(
+            self,
+            rate: float = 100.0,
+            burst: int = 200,
+            exempt_level: Union[int, str] = logging.WARNING
+    ):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(max(1, burst))
+        self.exempt_level = _level_number(exempt_level)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.exempt_level:
+            return True
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens < 1.0:
+            self.suppressed += 1
+            return False
+
+        self.tokens -= 1.0
+        if self.suppressed:
+            _annotate_suppressed(record, self.suppressed)
+            self.suppressed = 0
+        return True
+
+
+class DuplicateFilter(logging.Filter):
+    """
+    Drop repeats of the same message within `window` seconds
+
+    Records are keyed on the unformatted message and its arguments, so a
+    suppressed record never gets its string built. Errors are never
+    suppressed: each one may carry a different traceback.
+
+    Args:
+        window: Seconds during which a repeated message is suppressed
+        max_keys: Bound on the number of distinct messages remembered
+        exempt_level: Records at or above this level always pass
+    """
+
+    def __init__(
+            self,
+            window: float = 10.0,
+            max_keys: int = 1024,
+            exempt_level: Union[int, str] = logging.ERROR
+    ):
+        super().__init__()
+        self.window = float(window)
+        self.max_keys = max_keys
+        self.exempt_level = _level_number(exempt_level)
+        # key -> [first seen (monotonic), suppressed count]
+        self.seen: "OrderedDict[tuple, list]" = OrderedDict()
+
+    def _key(self, record: logging.LogRecord) -> tuple:
+        try:
+            key = (record.name, record.levelno, record.msg, record.args)
+            hash(key)
+            return key
+        except TypeError:
+            # Unhashable args (dict, list); fall back to the rendered message
+            return (record.name, record.levelno, record.getMessage())
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.exempt_level:
+            return True
+
+        key = self._key(record)
+        now = time.monotonic()
+        entry = self.seen.get(key)
+
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            return False
+
+        if entry is not None:
+            del self.seen[key]
+            if entry[1]:
+                _annotate_suppressed(record, entry[1])
+
+        self.seen[key] = [now, 0]
+        if len(self.seen) > self.max_keys:
+            self.seen.popitem(last=False)
+        return True
@@ -1,13 +1,70 @@
+import atexit
+import copy
+import json
 import logging
 import logging.config
-from typing import Dict, Any
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
 
 
-def get_logging_config() -> Dict[str, Any]:
+_queue_listener: Optional[QueueListener] = None
+
+# Options accepted per logger in `setup_logging(log_filters=...)`
+#   sample_rate: keep this fraction of sub-WARNING records
+#   rate_limit / burst: token bucket (records per second / bucket size)
+#   dedupe_window: suppress repeats of the same message for N seconds
+_FILTER_FACTORIES = {
+    "sample": ("app.core.log_filters.SamplingFilter", {"sample_rate": "rate"}),
+    "rate_limit": ("app.core.log_filters.RateLimitFilter", {"rate_limit": "rate", "burst": "burst"}),
+    "dedupe": ("app.core.log_filters.DuplicateFilter", {"dedupe_window": "window"}),
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """Compact single-line JSON formatter"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler for a listener in the same process
+
+    The stock `prepare` formats the record on the calling thread and drops
+    exc_info/exc_text, so the listener's formatter never sees the
+    exception. Records here only cross threads: merge the arguments into
+    the message and hand everything else over untouched.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def get_logging_config(json_format: bool = False) -> Dict[str, Any]:
     """
     Returns the logging configuration dictionary
+
+    Args:
+        json_format: Use the compact JSON formatter for every handler
     """
-    return {
+    config = {
         "version": 1,
         "disable_existing_loggers": False,
         "formatters": {
@@ -18,6 +75,10 @@ def get_logging_config() -> Dict[str, Any]:
             "detailed": {
                 "format": "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
                 "datefmt": "%Y-%m-%d %H:%M:%S"
+            },
+            "json": {
+                "()": "app.core.logging_config.JsonFormatter",
+                "datefmt": "%Y-%m-%dT%H:%M:%S"
             }
         },
         "handlers": {
@@ -67,13 +128,95 @@ def get_logging_config() -> Dict[str, Any]:
         }
     }
 
+    if json_format:
+        for handler in config["handlers"].values():
+            handler["formatter"] = "json"
+
+    return config
+
+
+def _apply_log_filters(config: Dict[str, Any], log_filters: Dict[str, Dict[str, Any]]):
+    """
+    Attach sampling / rate-limit / dedupe filters to the given loggers
+
+    Filters sit on the logger itself, so a dropped record is never
+    formatted nor handed to any handler.
+    """
+    config.setdefault("filters", {})
+    for logger_name, options in log_filters.items():
+        logger_config = config["loggers"].setdefault(logger_name, {"propagate": True})
+        attached = logger_config.setdefault("filters", [])
+
+        for kind, (factory, arguments) in _FILTER_FACTORIES.items():
+            kwargs = {
+                argument: options[option]
+                for option, argument in arguments.items()
+                if option in options
+            }
+            if not kwargs:
+                continue
+            if "exempt_level" in options and kind != "dedupe":
+                kwargs["exempt_level"] = options["exempt_level"]
+
+            filter_id = f"{logger_name or 'root'}.{kind}"
+            config["filters"][filter_id] = {"()": factory, **kwargs}
+            attached.append(filter_id)
+
+
+def _start_queue_listener():
+    """
+    Move the root logger's handlers behind an in-memory queue
+
+    The root logger only keeps a QueueHandler, so logging from the event loop
+    is a queue put. A QueueListener thread owns the console and file handlers
+    and does the formatting, file I/O and rotation.
+    """
+    global _queue_listener
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    root.addHandler(LocalQueueHandler(log_queue))
+
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
 
-def setup_logging(log_level: str = "INFO"):
+
+def stop_logging():
+    """
+    Stop the queue listener (if any), flushing records still in the queue
+    """
+    global _queue_listener
+
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        for handler in _queue_listener.handlers:
+            handler.close()
+        _queue_listener = None
+
+
+atexit.register(stop_logging)
+
+
+def setup_logging(
+        log_level: str = "INFO",
+        use_queue: bool = False,
+        json_format: bool = False,
+        log_filters: Optional[Dict[str, Dict[str, Any]]] = None
+):
     """
     Setup logging configuration
     
     Args:
         log_level: The minimum log level to use (DEBUG, INFO, WARNING, ERROR)
+        use_queue: Hand records to a background QueueListener instead of
+            writing to the console/files on the calling thread
+        json_format: Emit compact JSON lines instead of plain text
+        log_filters: Per-logger filter options, e.g.
+            {"app.core.kafka_manager": {"sample_rate": 0.1, "rate_limit": 50}}
     """
     import os
     from pathlib import Path
@@ -83,16 +226,33 @@ def setup_logging(log_level: str = "INFO"):
     log_dir.mkdir(exist_ok=True)
     
     # Get the configuration and optionally override log level
-    config = get_logging_config()
+    config = get_logging_config(json_format=json_format)
     
     # Override log level if specified
     if log_level.upper() in ["DEBUG", "INFO", "WARNING", "ERROR"]:
         config["loggers"][""]["level"] = log_level.upper()
         config["handlers"]["console"]["level"] = log_level.upper()
+
+    if log_filters:
+        _apply_log_filters(config, log_filters)
+
+    if use_queue:
+        # Loggers that duplicate the root handlers propagate to the root
+        # QueueHandler instead of writing synchronously themselves
+        root_handlers = config["loggers"][""]["handlers"]
+        for name, logger_config in config["loggers"].items():
+            if name and logger_config.get("handlers") == root_handlers:
+                logger_config["handlers"] = []
+                logger_config["propagate"] = True
+
+    # Re-configuring: flush and release the handlers of a previous listener
+    stop_logging()
     
     # Apply logging configuration
     try:
         logging.config.dictConfig(config)
+        if use_queue:
+            _start_queue_listener()
         print(f"Logging configured successfully with level: {log_level}")
     except Exception as e:
         print(f"Failed to configure logging: {e}")
@@ -0,0 +1,284 @@
+from bisect import bisect_left
+from math import inf
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Per-bucket (non cumulative) counts, last slot is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(_Metric):
+    """
+    Gauge, optionally backed by a callback evaluated at scrape time
+
+    The callback returns (label values, value) pairs, which keeps pool sizes
+    and similar state off the request path entirely.
+    """
+    metric_type = "gauge"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            callback: Optional[Callable[[], Iterable[Tuple[tuple, float]]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._callbacks = [callback] if callback else []
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def add_callback(self, callback: Callable[[], Iterable[Tuple[tuple, float]]]):
+        self._callbacks.append(callback)
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    def _samples(self):
+        values = {key: child.value for key, child in list(self._children.items())}
+        for callback in self._callbacks:
+            try:
+                for key, value in callback():
+                    values[tuple(str(v) for v in key)] = value
+            except Exception:
+                # A broken collector must never break the scrape
+                continue
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.bounds = tuple(sorted(float(b) for b in buckets if b != inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip(self.bounds + (inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format
+
+    Updates are plain attribute arithmetic on per-label children, so no
+    locks are taken on the hot path: they happen on the event loop thread
+    and a child is created once per label set with an atomic setdefault.
+    Cumulative bucket counts are only computed when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+
+# Database
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "db_query_duration_seconds", "Query latency through the databases connections", ("database", "operation")
+)
+DB_QUERY_ERRORS = REGISTRY.counter(
+    "db_query_errors_total", "Queries that raised", ("database", "operation")
+)
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    "db_pool_connections", "Connection pool size by state", ("database", "state")
+)
+
+# Kafka
+KAFKA_MESSAGES_PRODUCED = REGISTRY.counter(
+    "kafka_messages_produced_total", "Messages acknowledged by the broker", ("topic",)
+)
+KAFKA_PRODUCE_ERRORS = REGISTRY.counter(
+    "kafka_produce_errors_total", "Messages that failed to publish", ("topic",)
+)
+KAFKA_MESSAGES_CONSUMED = REGISTRY.counter(
+    "kafka_messages_consumed_total", "Messages handled by the consumers", ("topic",)
+)
+KAFKA_CONSUME_ERRORS = REGISTRY.counter(
+    "kafka_consume_errors_total", "Messages whose handler raised", ("topic",)
+)
+KAFKA_MESSAGES_RETRIED = REGISTRY.counter(
+    "kafka_messages_retried_total", "Failed messages sent to a retry topic", ("topic",)
+)
+KAFKA_MESSAGES_DEAD_LETTERED = REGISTRY.counter(
+    "kafka_messages_dead_lettered_total", "Failed messages sent to the dead-letter topic", ("topic",)
+)
+KAFKA_CONSUMER_LAG = REGISTRY.gauge(
+    "kafka_consumer_lag", "Messages between the end of a partition and its committed offset",
+    ("group", "topic", "partition")
+)
+KAFKA_CONSUMER_CONCURRENCY = REGISTRY.gauge(
+    "kafka_consumer_concurrency", "In-flight handler limit and usage per consumer", ("topic", "state")
+)
+KAFKA_FETCH_PAUSES = REGISTRY.counter(
+    "kafka_fetch_pauses_total", "Times a consumer paused fetching on saturated database pools or a stuck partition", ("topic",)
+)
+KAFKA_MESSAGES_DEDUPLICATED = REGISTRY.counter(
+    "kafka_messages_deduplicated_total", "Messages skipped as already handled", ("topic", "reason")
+)
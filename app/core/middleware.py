@@ -0,0 +1,165 @@
+import asyncio
+import os
+import random
+import re
+import time
+from datetime import datetime
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.lifecycle import request_tracker
+from app.core.logging_config import get_logger
+from app.core.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION
+from app.core.profiler import SamplingProfiler
+from app.core.request_timing import (
+    begin_request,
+    current_phases,
+    end_request,
+    server_timing_header,
+)
+
+logger = get_logger(__name__)
+
+
+def _route_template(scope: Scope) -> str:
+    # The router stores the matched route in the scope; label by its path
+    # template (/v1/links/{code}) so label cardinality stays bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class InFlightMiddleware:
+    """
+    Tracks in-flight HTTP requests so shutdown can drain them
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_tracker.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_tracker.finished()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency and status counts
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"]
+            route = _route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, status_code).inc()
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header with per-phase timings (db, kafka, serialize)
+    and captures a sampling profile for selected requests
+
+    A request is profiled when it carries `profile_header` with the
+    configured token, or by random sampling at `profile_sample_rate`.
+    Only one profile runs at a time; profiles are written as collapsed
+    stacks under `profile_dir`.
+    """
+
+    _profiling = False
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            profile_dir: str = "profiles",
+            profile_header: str = "x-profile",
+            profile_token: str = "",
+            profile_sample_rate: float = 0.0,
+            profile_interval: float = 0.005
+    ):
+        self.app = app
+        self.profile_dir = profile_dir
+        self.profile_header = profile_header.lower().encode("latin-1")
+        self.profile_token = profile_token.encode("latin-1")
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_interval = profile_interval
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if ServerTimingMiddleware._profiling:
+            return False
+        if self.profile_token:
+            for name, value in scope["headers"]:
+                if name == self.profile_header and value == self.profile_token:
+                    return True
+        return self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate
+
+    def _profile_path(self, scope: Scope) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return os.path.join(self.profile_dir, f"{stamp}-{scope['method']}-{slug[:64]}.collapsed")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler: Optional[SamplingProfiler] = None
+        profile_path = None
+        if self._wants_profile(scope):
+            ServerTimingMiddleware._profiling = True
+            profile_path = self._profile_path(scope)
+            profiler = SamplingProfiler(interval=self.profile_interval)
+            profiler.start()
+
+        start = time.perf_counter()
+        token = begin_request()
+        phases = current_phases()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", server_timing_header(phases, time.perf_counter() - start)
+                )
+                if profile_path:
+                    headers.append("X-Profile-File", os.path.basename(profile_path))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_request(token)
+            if profiler is not None:
+                profiler.stop()
+                ServerTimingMiddleware._profiling = False
+                try:
+                    await asyncio.to_thread(profiler.write_collapsed, profile_path)
+                    logger.info("Wrote profile (%d samples) to %s", profiler.samples, profile_path)
+                except OSError as e:
+                    logger.error("Failed to write profile %s: %s", profile_path, e)
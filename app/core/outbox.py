@@ -0,0 +1,248 @@
+import asyncio
+import json
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+
+import databases
+
+from app.config import settings
+from app.core.db_session import database_w
+from app.core.kafka_dedup import HEADER_EVENT_ID
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+INSERT_EVENT_QUERY = """
+    INSERT INTO event_outbox (topic, message_key, payload, attempts, created_on)
+    VALUES (:topic, :message_key, CAST(:payload AS JSON), 0, :created_on)
+"""
+
+# Arbitrary key shared by every relay; claiming is short, so relays take turns
+CLAIM_LOCK_KEY = 518_930_271
+
+CLAIM_LOCK_QUERY = "SELECT pg_advisory_xact_lock(:key)"
+
+# Rows are leased (claimed_until) rather than kept locked, so no
+# transaction is open while publishing. A row whose key still has an
+# earlier event leased to another relay waits for it, keeping key order.
+CLAIM_PENDING_QUERY = """
+    UPDATE event_outbox
+    SET claimed_until = :claimed_until
+    WHERE id IN (
+        SELECT pending.id
+        FROM event_outbox AS pending
+        WHERE pending.sent_on IS NULL AND pending.attempts < :max_attempts
+          AND (pending.claimed_until IS NULL OR pending.claimed_until < :now)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM event_outbox AS earlier
+              WHERE earlier.topic = pending.topic AND earlier.message_key = pending.message_key
+                AND earlier.id < pending.id AND earlier.sent_on IS NULL
+                AND earlier.claimed_until >= :now
+          )
+        ORDER BY pending.id
+        LIMIT :limit
+    )
+    RETURNING id, topic, message_key, payload
+"""
+
+MARK_SENT_QUERY = """
+    UPDATE event_outbox SET sent_on = :sent_on, claimed_until = NULL WHERE id = ANY(:ids)
+"""
+
+MARK_FAILED_QUERY = """
+    UPDATE event_outbox
+    SET attempts = attempts + 1, last_error = :last_error, claimed_until = NULL
+    WHERE id = :id
+"""
+
+RELEASE_QUERY = """
+    UPDATE event_outbox SET claimed_until = NULL WHERE id = ANY(:ids)
+"""
+
+
+async def enqueue_event(
+        db: databases.Database,
+        topic: str,
+        key: Optional[str],
+        value: dict
+) -> None:
+    """
+    Stage a Kafka event in the outbox
+
+    Must be awaited inside the same `db.transaction()` as the business
+    write, so the event is committed (or rolled back) together with it.
+    The OutboxRelay publishes it afterwards. Services go through
+    BaseOperations._enqueue_event, which passes their db_w.
+
+    Args:
+        db: The writer database the business row goes to
+        topic: Kafka topic to publish to
+        key: Message key (partitioning / ordering key)
+        value: JSON serialisable payload
+    """
+    await db.execute(
+        query=INSERT_EVENT_QUERY,
+        values={
+            "topic": topic,
+            "message_key": key,
+            "payload": json.dumps(value),
+            "created_on": datetime.utcnow(),
+        }
+    )
+
+
+class OutboxRelay:
+    """Tails `event_outbox` in batches and publishes through KafkaManager"""
+
+    def __init__(
+            self,
+            kafka_manager,
+            db: databases.Database = database_w,
+            batch_size: Optional[int] = None,
+            poll_interval: Optional[float] = None,
+            max_attempts: Optional[int] = None
+    ):
+        self.kafka_manager = kafka_manager
+        self.db = db
+        self.batch_size = batch_size or settings.kafka.outbox_batch_size
+        self.poll_interval = poll_interval or settings.kafka.outbox_poll_interval
+        self.max_attempts = max_attempts or settings.kafka.outbox_max_attempts
+        self.claim_seconds = settings.kafka.outbox_claim_seconds
+        self.task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def notify(self):
+        """Wake the relay early, e.g. right after a local transaction committed"""
+        self._wakeup.set()
+
+    async def _claim(self) -> List:
+        now = datetime.utcnow()
+        async with self.db.transaction():
+            await self.db.execute(query=CLAIM_LOCK_QUERY, values={"key": CLAIM_LOCK_KEY})
+            rows = await self.db.fetch_all(query=CLAIM_PENDING_QUERY, values={
+                "limit": self.batch_size,
+                "max_attempts": self.max_attempts,
+                "now": now,
+                "claimed_until": now + timedelta(seconds=self.claim_seconds),
+            })
+        return sorted(rows, key=lambda row: row["id"])
+
+    async def _publish(self, rows: List) -> Tuple[List[int], List[Tuple[int, Exception]], List[int]]:
+        """
+        Publish claimed rows, one event per key at a time: the next event of
+        a key is only sent once the previous one was acknowledged, and not
+        at all once one failed. Events of different keys share each round.
+
+        Returns:
+            (sent ids, (id, error) of failed rows, ids held back behind a failure)
+        """
+        queues: Dict[object, Deque] = {}
+        for row in rows:
+            # Events without a key have no order to keep
+            ordering_key = (row["topic"], row["message_key"]) if row["message_key"] is not None else row["id"]
+            queues.setdefault(ordering_key, deque()).append(row)
+
+        sent_ids, failed, held = [], [], []
+        while queues:
+            heads = [(ordering_key, queue.popleft()) for ordering_key, queue in queues.items()]
+            batch, headers = [], []
+            for _, row in heads:
+                payload = row["payload"]
+                if isinstance(payload, str):
+                    payload = json.loads(payload)
+                batch.append((row["topic"], row["message_key"], payload))
+                # Stable across republishing, so consumers can drop the copies
+                headers.append([(HEADER_EVENT_ID, f"outbox-{row['id']}".encode("utf-8"))])
+
+            results = await self.kafka_manager.send_messages(batch, headers=headers)
+
+            for (ordering_key, row), error in zip(heads, results):
+                if error is None:
+                    sent_ids.append(row["id"])
+                    if not queues[ordering_key]:
+                        del queues[ordering_key]
+                    continue
+                failed.append((row["id"], error))
+                held.extend(later["id"] for later in queues.pop(ordering_key))
+        return sent_ids, failed, held
+
+    async def relay_batch(self) -> int:
+        """
+        Publish one batch of pending events
+
+        Rows are claimed for `claim_seconds` in a short transaction, then
+        published with no transaction open, so several relays can run side
+        by side. Every delivered row is marked sent; once an event of a key
+        fails, the later events of that key wait for the next round.
+
+        Returns:
+            Number of rows picked up
+        """
+        rows = await self._claim()
+        if not rows:
+            return 0
+
+        sent_ids, failed, held = await self._publish(rows)
+
+        if sent_ids:
+            await self.db.execute(
+                query=MARK_SENT_QUERY,
+                values={"ids": sent_ids, "sent_on": datetime.utcnow()}
+            )
+        for row_id, error in failed:
+            await self.db.execute(
+                query=MARK_FAILED_QUERY,
+                values={"id": row_id, "last_error": str(error)[:500]}
+            )
+        if held:
+            await self.db.execute(query=RELEASE_QUERY, values={"ids": held})
+
+        if len(sent_ids) < len(rows):
+            logger.warning(
+                "Outbox relay published %d of %d events", len(sent_ids), len(rows)
+            )
+        return len(rows)
+
+    async def _run(self):
+        logger.info("Outbox relay started.")
+        while not self._stopping.is_set():
+            try:
+                picked = await self.relay_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Outbox relay batch failed: %s", e)
+                picked = 0
+
+            # A full batch means there is probably more waiting; loop straight away
+            if picked >= self.batch_size:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("Outbox relay stopped.")
+
+    async def start(self):
+        if self.task:
+            logger.info("Outbox relay already running.")
+            return
+        self._stopping.clear()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        if not self.task:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self.task, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.task.cancel()
+        self.task = None
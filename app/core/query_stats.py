@@ -0,0 +1,121 @@
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_BIND_PARAMS = re.compile(r"(?<!:):[A-Za-z_]\w*|\$\d+|%\([A-Za-z_]\w*\)s|%s|\?")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LISTS = re.compile(r"(values\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+OTHER_FINGERPRINT = "<other>"
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """
+    Normalize a statement so that calls differing only in literals,
+    bind parameters or IN-list lengths aggregate together
+    """
+    normalized = _COMMENTS.sub(" ", sql)
+    normalized = _STRINGS.sub("?", normalized)
+    normalized = _NUMBERS.sub("?", normalized)
+    normalized = _BIND_PARAMS.sub("?", normalized)
+    normalized = _IN_LISTS.sub("(...)", normalized)
+    normalized = _VALUES_LISTS.sub(r"\1, ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip().lower()
+
+
+def redact_values(values: Any) -> Any:
+    """Replace bound values by their type name so nothing sensitive is logged"""
+    if isinstance(values, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in values.items()}
+    if isinstance(values, (list, tuple)):
+        return [redact_values(value) for value in values[:3]] + (["..."] if len(values) > 3 else [])
+    return None if values is None else f"<{type(values).__name__}>"
+
+
+class StatementStats:
+    __slots__ = ("count", "errors", "total", "max", "samples")
+
+    def __init__(self, sample_size: int):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        # Most recent latencies; percentiles are computed at read time only
+        self.samples = deque(maxlen=sample_size)
+
+    def add(self, elapsed: float, failed: bool):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        if failed:
+            self.errors += 1
+        self.samples.append(elapsed)
+
+    @staticmethod
+    def _percentile(ordered: List[float], fraction: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self._percentile(ordered, 0.50) * 1000, 3),
+            "p99_ms": round(self._percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class QueryStats:
+    """
+    Per-fingerprint aggregates of the statements run through the databases
+
+    Args:
+        max_fingerprints: Distinct statements tracked; beyond that calls are
+            aggregated under "<other>" to keep memory bounded
+        sample_size: Latencies kept per statement for p50/p99
+    """
+
+    def __init__(self, max_fingerprints: int = 1000, sample_size: int = 512):
+        self.max_fingerprints = max_fingerprints
+        self.sample_size = sample_size
+        self._stats: Dict[tuple, StatementStats] = {}
+
+    def record(self, database: str, statement: str, elapsed: float, failed: bool = False) -> str:
+        key = (database, fingerprint(statement))
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= self.max_fingerprints:
+                key = (database, OTHER_FINGERPRINT)
+                stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats.setdefault(key, StatementStats(self.sample_size))
+        stats.add(elapsed, failed)
+        return key[1]
+
+    def top(self, limit: int = 20, order_by: str = "total_ms", database: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = []
+        for (name, statement), stats in list(self._stats.items()):
+            if database and name != database:
+                continue
+            rows.append({"database": name, "fingerprint": statement, **stats.summary()})
+        rows.sort(key=lambda row: row.get(order_by, 0), reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        self._stats.clear()
+
+
+QUERY_STATS = QueryStats()
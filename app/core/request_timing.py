@@ -0,0 +1,56 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, Optional
+
+
+# Phase name -> accumulated seconds for the request being served. The dict
+# is shared (not copied) with tasks spawned by the request, so work done in
+# asyncio.gather() children is still accounted to it.
+_request_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_phases", default=None)
+
+
+def begin_request() -> Token:
+    """Start collecting phase timings for the current request"""
+    return _request_phases.set({})
+
+
+def current_phases() -> Optional[Dict[str, float]]:
+    """Phase timings collected so far for the current request, if any"""
+    return _request_phases.get()
+
+
+def end_request(token: Token) -> Dict[str, float]:
+    """Stop collecting and return the accumulated phase timings"""
+    phases = _request_phases.get() or {}
+    _request_phases.reset(token)
+    return phases
+
+
+def record_phase(name: str, seconds: float):
+    """Add `seconds` to phase `name`; a no-op outside a request"""
+    phases = _request_phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def server_timing_header(phases: Dict[str, float], total: float) -> str:
+    """
+    Render phases as a Server-Timing header value (durations in ms)
+
+    `app` is the remainder of the total not covered by a named phase.
+    """
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    accounted = sum(phases.values())
+    entries.append(f"app;dur={max(0.0, total - accounted) * 1000:.2f}")
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
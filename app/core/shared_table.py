@@ -0,0 +1,437 @@
+"""
+Shared-memory redirect table for uvicorn worker processes
+
+An open-addressing hash table (linear probing) in a named shared memory
+segment maps short_link -> destination for the hot set, so N workers on a
+node share one copy. Exactly one process, the holder of an flock on
+`<tmpdir>/<name>.lock`, writes; the lock is released by the kernel if it
+dies and another worker takes over. Every other worker only reads.
+
+Reads take no lock. Each slot carries a sequence number the writer makes
+odd while it rewrites the slot; a reader that sees an odd or changed
+sequence treats the lookup as a miss and falls back to its own cache.
+
+Readers resolve their own misses and `submit` the entry to the owner as a
+datagram on `<tmpdir>/<name>.sock`, so the table fills from every worker's
+traffic. Entries that are too large, or that find no owner listening, stay
+in the submitting worker's private cache instead.
+
+Layout (little endian):
+
+    header  magic, version, slots, slot size, retired flag
+    slots   seq uint64, hash uint64, valid_until float64,
+            link expiry float64 (NaN = none), code length uint16,
+            destination length uint16, then the UTF-8 bytes
+"""
+import asyncio
+import math
+import os
+import socket
+import struct
+import tempfile
+import time
+from hashlib import blake2b
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from app.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+MAGIC = b"SHRTSHM1"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIII")
+_HEADER_SIZE = 64
+_RETIRED_OFFSET = 20
+_SLOT = struct.Struct("<QQddHH")
+_SEQ = struct.Struct("<Q")
+# Entry submitted to the owner: valid_until, link expiry (NaN = none),
+# code length, destination length, then the UTF-8 bytes
+_SUBMIT = struct.Struct("<ddHH")
+# Datagrams read per wake-up before yielding back to the event loop
+_RECEIVE_BATCH = 256
+
+_EMPTY = 0
+_TOMBSTONE = 1
+# Real hashes always have the top bit set so they never collide with the markers
+_HASH_BIT = 1 << 63
+
+
+def _hash(code: bytes) -> int:
+    return int.from_bytes(blake2b(code, digest_size=8).digest(), "little") | _HASH_BIT
+
+
+def _open(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    # The resource tracker would unlink the segment when this worker exits,
+    # pulling it from under the others
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    return segment
+
+
+class SharedRedirectTable:
+    """
+    Args:
+        name: Shared memory segment name, shared by all workers on the node
+        slots: Table capacity
+        slot_size: Bytes per slot; links that don't fit are not shared
+        max_probe: Slots examined per lookup before giving up
+    """
+
+    def __init__(self, name: str, slots: int, slot_size: int = 256, max_probe: int = 16):
+        self.name = name
+        self.slots = slots
+        self.slot_size = slot_size
+        self.max_probe = max_probe
+        self.capacity = slot_size - _SLOT.size
+        self.is_owner = False
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._buffer = None
+        self._lock_file = None
+        # Owner: socket the readers submit to; readers: socket they send from
+        self._inbox: Optional[socket.socket] = None
+        self._outbox: Optional[socket.socket] = None
+        self.task: Optional[asyncio.Task] = None
+
+    # Ownership / attachment
+
+    def _try_lock(self) -> bool:
+        if fcntl is None:
+            return False
+        if self._lock_file is None:
+            self._lock_file = open(os.path.join(tempfile.gettempdir(), f"{self.name}.lock"), "a+b")
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _socket_path(self) -> str:
+        return os.path.join(tempfile.gettempdir(), f"{self.name}.sock")
+
+    def _valid(self, buffer) -> bool:
+        magic, version, slots, slot_size, retired = _HEADER.unpack_from(buffer, 0)
+        return (
+            magic == MAGIC and version == VERSION and not retired
+            and slots == self.slots and slot_size == self.slot_size
+        )
+
+    def _release_segment(self):
+        if self._segment is not None:
+            self._buffer = None
+            self._segment.close()
+            self._segment = None
+
+    def _become_owner(self):
+        size = _HEADER_SIZE + self.slots * self.slot_size
+        try:
+            segment = _open(self.name)
+            if segment.size < size or not self._valid(segment.buf):
+                # Left over from a different configuration: retire it so
+                # attached readers let go, then start afresh
+                struct.pack_into("<I", segment.buf, _RETIRED_OFFSET, 1)
+                segment.close()
+                segment.unlink()
+                raise FileNotFoundError
+        except FileNotFoundError:
+            segment = _open(self.name, create=True, size=size)
+            segment.buf[:size] = bytes(size)
+            _HEADER.pack_into(segment.buf, 0, MAGIC, VERSION, self.slots, self.slot_size, 0)
+
+        self._release_segment()
+        self._segment = segment
+        self._buffer = segment.buf
+        self.is_owner = True
+        self._open_inbox()
+        logger.info("Owning shared redirect table %s (%s slots)", self.name, self.slots)
+
+    def _open_inbox(self):
+        if not hasattr(socket, "AF_UNIX"):
+            return
+        path = self._socket_path()
+        try:
+            # Left by a previous owner; holding the lock makes it ours
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        inbox = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            inbox.bind(path)
+            os.chmod(path, 0o600)
+            inbox.setblocking(False)
+            asyncio.get_running_loop().add_reader(inbox.fileno(), self._receive)
+        except Exception:
+            inbox.close()
+            logger.warning("Could not open the submission socket %s; readers keep private caches",
+                           path, exc_info=True)
+            return
+        self._inbox = inbox
+
+    def _close_inbox(self):
+        if self._inbox is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._inbox.fileno())
+        except RuntimeError:
+            pass
+        self._inbox.close()
+        self._inbox = None
+        try:
+            os.unlink(self._socket_path())
+        except OSError:
+            pass
+
+    def _receive(self):
+        for _ in range(_RECEIVE_BATCH):
+            try:
+                data = self._inbox.recv(_SUBMIT.size + self.capacity)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                logger.warning("Reading the shared redirect table submissions failed", exc_info=True)
+                return
+            if len(data) < _SUBMIT.size:
+                continue
+            valid_until, link_expiry, code_length, destination_length = _SUBMIT.unpack_from(data)
+            body = data[_SUBMIT.size:]
+            if len(body) != code_length + destination_length:
+                continue
+            try:
+                code = body[:code_length].decode("utf-8")
+                destination = body[code_length:].decode("utf-8")
+            except UnicodeDecodeError:
+                continue
+            ttl = valid_until - time.time()
+            if ttl > 0:
+                self.put(code, destination, None if math.isnan(link_expiry) else link_expiry, ttl)
+
+    def _attach_reader(self):
+        try:
+            segment = _open(self.name)
+        except FileNotFoundError:
+            return
+        if not self._valid(segment.buf):
+            segment.close()
+            return
+        self._release_segment()
+        self._segment = segment
+        self._buffer = segment.buf
+
+    @property
+    def attached(self) -> bool:
+        return self._buffer is not None
+
+    def refresh(self):
+        """Take ownership if the writer went away, (re)attach if needed"""
+        if self.is_owner:
+            return
+        if self._try_lock():
+            self._become_owner()
+        elif self._buffer is None or not self._valid(self._buffer):
+            self._release_segment()
+            self._attach_reader()
+
+    # Table operations
+
+    def get(self, code: str) -> Optional[Tuple[str, Optional[float]]]:
+        """(destination, link expiry) or None on a miss or a concurrent write"""
+        buffer = self._buffer
+        if buffer is None:
+            return None
+
+        code_bytes = code.encode("utf-8")
+        key = _hash(code_bytes)
+        start = key % self.slots
+        now = time.time()
+        for probe in range(self.max_probe):
+            offset = _HEADER_SIZE + ((start + probe) % self.slots) * self.slot_size
+            seq, slot_hash, valid_until, link_expiry, code_length, destination_length = \
+                _SLOT.unpack_from(buffer, offset)
+            if seq & 1:
+                return None
+            if slot_hash == _EMPTY:
+                return None
+            if slot_hash != key:
+                continue
+
+            data = bytes(buffer[offset + _SLOT.size:offset + _SLOT.size + code_length + destination_length])
+            if _SEQ.unpack_from(buffer, offset)[0] != seq:
+                return None
+            if data[:code_length] != code_bytes:
+                continue
+            if valid_until <= now:
+                return None
+            return data[code_length:].decode("utf-8"), None if math.isnan(link_expiry) else link_expiry
+        return None
+
+    def _write_slot(self, offset: int, key: int, valid_until: float, link_expiry: float,
+                    code_bytes: bytes, destination_bytes: bytes):
+        buffer = self._buffer
+        seq = _SEQ.unpack_from(buffer, offset)[0]
+        _SEQ.pack_into(buffer, offset, seq + 1)
+        end = offset + _SLOT.size + len(code_bytes) + len(destination_bytes)
+        buffer[offset + _SLOT.size:end] = code_bytes + destination_bytes
+        _SLOT.pack_into(
+            buffer, offset, seq + 1, key, valid_until, link_expiry,
+            len(code_bytes), len(destination_bytes)
+        )
+        _SEQ.pack_into(buffer, offset, seq + 2)
+
+    def put(self, code: str, destination: str, link_expiry: Optional[float], ttl: float) -> bool:
+        """Owner only; returns False when not owner or the entry doesn't fit"""
+        if not self.is_owner:
+            return False
+        code_bytes = code.encode("utf-8")
+        destination_bytes = destination.encode("utf-8")
+        if len(code_bytes) + len(destination_bytes) > self.capacity:
+            return False
+
+        key = _hash(code_bytes)
+        start = key % self.slots
+        now = time.time()
+        target = None
+        oldest = None
+        for probe in range(self.max_probe):
+            offset = _HEADER_SIZE + ((start + probe) % self.slots) * self.slot_size
+            _, slot_hash, valid_until, _, code_length, _ = _SLOT.unpack_from(self._buffer, offset)
+            if slot_hash == key and bytes(
+                    self._buffer[offset + _SLOT.size:offset + _SLOT.size + code_length]) == code_bytes:
+                target = offset
+                break
+            if target is None and (slot_hash in (_EMPTY, _TOMBSTONE) or valid_until <= now):
+                target = offset
+                if slot_hash == _EMPTY:
+                    break
+            if oldest is None or valid_until < oldest[0]:
+                oldest = (valid_until, offset)
+        if target is None:
+            # Probe window full of live entries: replace the one expiring first
+            target = oldest[1]
+
+        self._write_slot(
+            target, key, now + ttl, math.nan if link_expiry is None else link_expiry,
+            code_bytes, destination_bytes
+        )
+        return True
+
+    def submit(self, code: str, destination: str, link_expiry: Optional[float], ttl: float) -> bool:
+        """
+        Store the entry, or hand it to the owner when this worker only reads
+
+        Returns:
+            False when the entry is not going to the shared table (too
+            large, not attached, no owner listening); keep it privately then
+        """
+        if self.is_owner:
+            return self.put(code, destination, link_expiry, ttl)
+        if self._buffer is None or not hasattr(socket, "AF_UNIX"):
+            return False
+        code_bytes = code.encode("utf-8")
+        destination_bytes = destination.encode("utf-8")
+        if len(code_bytes) + len(destination_bytes) > self.capacity:
+            return False
+
+        if self._outbox is None:
+            self._outbox = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._outbox.setblocking(False)
+        datagram = _SUBMIT.pack(
+            time.time() + ttl, math.nan if link_expiry is None else link_expiry,
+            len(code_bytes), len(destination_bytes)
+        ) + code_bytes + destination_bytes
+        try:
+            self._outbox.sendto(datagram, self._socket_path())
+        except OSError:
+            # No owner yet, or its queue is full
+            return False
+        return True
+
+    def items(self) -> Iterator[Tuple[str, Tuple[str, Optional[float]], float]]:
+        """(short_link, (destination, link expiry), seconds left) of live entries"""
+        buffer = self._buffer
+        if buffer is None:
+            return
+        now = time.time()
+        for index in range(self.slots):
+            offset = _HEADER_SIZE + index * self.slot_size
+            seq, slot_hash, valid_until, link_expiry, code_length, destination_length = \
+                _SLOT.unpack_from(buffer, offset)
+            if seq & 1 or slot_hash in (_EMPTY, _TOMBSTONE) or valid_until <= now:
+                continue
+            data = bytes(buffer[offset + _SLOT.size:offset + _SLOT.size + code_length + destination_length])
+            if _SEQ.unpack_from(buffer, offset)[0] != seq:
+                continue
+            yield (
+                data[:code_length].decode("utf-8"),
+                (data[code_length:].decode("utf-8"), None if math.isnan(link_expiry) else link_expiry),
+                valid_until - now
+            )
+
+    def delete(self, code: str) -> bool:
+        """Owner only; leaves a tombstone so later probes keep going"""
+        if not self.is_owner:
+            return False
+        code_bytes = code.encode("utf-8")
+        key = _hash(code_bytes)
+        start = key % self.slots
+        for probe in range(self.max_probe):
+            offset = _HEADER_SIZE + ((start + probe) % self.slots) * self.slot_size
+            _, slot_hash, _, _, code_length, _ = _SLOT.unpack_from(self._buffer, offset)
+            if slot_hash == _EMPTY:
+                return False
+            if slot_hash == key and bytes(
+                    self._buffer[offset + _SLOT.size:offset + _SLOT.size + code_length]) == code_bytes:
+                self._write_slot(offset, _TOMBSTONE, 0.0, math.nan, b"", b"")
+                return True
+        return False
+
+    # Lifecycle
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.warning("Refreshing shared redirect table failed", exc_info=True)
+
+    async def start(self, interval: float = 5.0):
+        self.refresh()
+        if not self.task:
+            self.task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        # The segment is left in place: the other workers still read it and
+        # the next owner reuses it
+        self._close_inbox()
+        if self._outbox is not None:
+            self._outbox.close()
+            self._outbox = None
+        self._release_segment()
+        self.is_owner = False
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+shared_redirects: Optional[SharedRedirectTable] = (
+    SharedRedirectTable(
+        settings.cache.shared_table_name,
+        settings.cache.shared_table_slots,
+        settings.cache.shared_table_slot_size
+    )
+    if settings.cache.shared_table_enabled else None
+)
@@ -0,0 +1,218 @@
+"""
+Trending links over a sliding window of recent clicks
+
+Every process reads all partitions of the click topic without a consumer
+group (like cache invalidations), so each holds the full picture without
+touching the database. Clicks are counted per time slice in a Space-Saving summary: at
+most `capacity` links per slice, with any link clicked more than
+1/capacity of the slice's clicks guaranteed to be kept. A window is the
+sum of its most recent slices; the merged ranking is rebuilt at most once
+per consumed batch, so queries are a slice of a sorted list.
+"""
+import asyncio
+import heapq
+import time
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.core.click_classifier import classify_user_agent
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class TrendingLink(NamedTuple):
+    short_link: str
+    # Upper bound; at most `error` of these may belong to evicted links
+    clicks: int
+    error: int
+
+
+class SpaceSaving:
+    """
+    Heavy hitters in bounded memory (Metwally et al., Space-Saving)
+
+    Args:
+        capacity: Links tracked; a new link replaces the smallest count and
+            inherits it as its error
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # One (count, link) entry per tracked link; counts only grow, so an
+        # entry is a lower bound and is refreshed when it reaches the top
+        self._heap: List[Tuple[int, str]] = []
+
+    def offer(self, item: str, weight: int = 1):
+        count = self.counts.get(item)
+        if count is not None:
+            self.counts[item] = count + weight
+            return
+        if len(self.counts) < self.capacity:
+            count, error = 0, 0
+        else:
+            count, evicted = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            error = count
+        self.counts[item] = count + weight
+        self.errors[item] = error
+        heapq.heappush(self._heap, (count + weight, item))
+
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, item = self._heap[0]
+            current = self.counts[item]
+            if current == count:
+                heapq.heappop(self._heap)
+                return count, item
+            heapq.heapreplace(self._heap, (current, item))
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+
+class TrendingTracker:
+    """
+    Args:
+        slice_seconds: Width of one time slice
+        window_slices: Slices kept, i.e. the longest window that can be queried
+        capacity: Links tracked per slice
+        max_top: Length of the ranking kept for queries
+    """
+
+    def __init__(self, slice_seconds: int, window_slices: int, capacity: int, max_top: int):
+        self.slice_seconds = slice_seconds
+        self.window_slices = window_slices
+        self.capacity = capacity
+        self.max_top = max_top
+        self._slices: Deque[Tuple[int, SpaceSaving]] = deque()
+        self._version = 0
+        # slices -> (version, ranking)
+        self._rankings: Dict[int, Tuple[int, List[TrendingLink]]] = {}
+
+    def _slice(self, start: int) -> Optional[SpaceSaving]:
+        for slice_start, summary in reversed(self._slices):
+            if slice_start == start:
+                return summary
+            if slice_start < start:
+                break
+        oldest = self._current_start() - (self.window_slices - 1) * self.slice_seconds
+        if start < oldest:
+            return None
+        summary = SpaceSaving(self.capacity)
+        self._slices.append((start, summary))
+        if len(self._slices) > 1 and self._slices[-2][0] > start:
+            # Late event for a slice nobody recorded yet
+            self._slices = deque(sorted(self._slices, key=lambda entry: entry[0]))
+        return summary
+
+    def _current_start(self) -> int:
+        now = int(time.time())
+        return now - now % self.slice_seconds
+
+    def _expire(self):
+        oldest = self._current_start() - (self.window_slices - 1) * self.slice_seconds
+        while self._slices and self._slices[0][0] < oldest:
+            self._slices.popleft()
+
+    def record(self, clicks: Iterable[Tuple[str, float]]):
+        """Count (short_link, timestamp) pairs"""
+        per_slice: Dict[int, Dict[str, int]] = {}
+        slice_seconds = self.slice_seconds
+        for short_link, ts in clicks:
+            ts = int(ts)
+            counts = per_slice.get(ts - ts % slice_seconds)
+            if counts is None:
+                counts = per_slice[ts - ts % slice_seconds] = {}
+            counts[short_link] = counts.get(short_link, 0) + 1
+        self._expire()
+        for start, counts in per_slice.items():
+            summary = self._slice(start)
+            if summary is None:
+                continue
+            for short_link, count in counts.items():
+                summary.offer(short_link, count)
+        self._version += 1
+
+    def _ranking(self, slices: int) -> List[TrendingLink]:
+        cached = self._rankings.get(slices)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        oldest = self._current_start() - (slices - 1) * self.slice_seconds
+        clicks: Counter = Counter()
+        errors: Counter = Counter()
+        for start, summary in self._slices:
+            if start >= oldest:
+                clicks.update(summary.counts)
+                errors.update(summary.errors)
+        ranking = [
+            TrendingLink(short_link, count, errors[short_link])
+            for short_link, count in clicks.most_common(self.max_top)
+        ]
+        self._rankings[slices] = (self._version, ranking)
+        return ranking
+
+    def top(self, seconds: int, limit: int) -> List[TrendingLink]:
+        """Most clicked links over the last `seconds` (rounded up to whole slices)"""
+        self._expire()
+        slices = max(1, min(self.window_slices, -(-seconds // self.slice_seconds)))
+        return self._ranking(slices)[:limit]
+
+    def candidates(self, limit: int) -> List[str]:
+        """Short links worth keeping in the redirect cache, hottest first"""
+        return [link.short_link for link in self.top(self.window_slices * self.slice_seconds, limit)]
+
+
+class CacheWarmer:
+    """Periodically passes the trending links to `warm` (e.g. to preload the redirect cache)"""
+
+    def __init__(self, tracker: TrendingTracker, warm: Callable[[List[str]], Awaitable[int]],
+                 interval: float, count: int):
+        self.tracker = tracker
+        self.warm = warm
+        self.interval = interval
+        self.count = count
+        self.task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            candidates = self.tracker.candidates(self.count)
+            if not candidates:
+                continue
+            try:
+                await self.warm(candidates)
+            except Exception:
+                logger.warning("Warming trending links failed", exc_info=True)
+
+    async def start(self):
+        if not self.task:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+trending_links = TrendingTracker(
+    settings.analytics.trending_slice_seconds,
+    max(1, settings.analytics.trending_window_minutes * 60 // settings.analytics.trending_slice_seconds),
+    settings.analytics.trending_capacity,
+    settings.analytics.trending_max_top
+)
+
+
+async def handle_clicks(payloads: List[dict]):
+    """Batch handler for KafkaManager.start_batch_consumer; bots are not counted"""
+    trending_links.record(
+        (payload["short_link"], payload["ts"])
+        for payload in payloads
+        if payload.get("short_link") and payload.get("ts") is not None
+        and not classify_user_agent(payload.get("user_agent")).is_bot
+    )
@@ -1,24 +1,231 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Optional
 from fastapi import FastAPI
 from app.config import settings
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.utils.base_exception import AppException, exception_handler
-from app.core.db_session import database_r, database_w
+from app.core.cache import redirect_cache
+from app.core.cache_invalidation import handle_invalidations
+from app.core.cache_snapshot import SnapshotWriter, redirect_snapshot
+from app.core.click_stream import click_publisher
+from app.core.db_session import database_export, database_r, database_w
+from app.core.shared_table import shared_redirects
+from app.core.trending import CacheWarmer, handle_clicks, trending_links
 from app.routes import router
-from app.core.kafka_manager import KafkaManager
+from app.core.lifecycle import DrainOnSignal, readiness, request_tracker
+from app.core.middleware import InFlightMiddleware, MetricsMiddleware, ServerTimingMiddleware
 from app.core.logging_config import setup_logging, get_logger
+from app.services.links.operations import Operations as LinksOperations
+
+if TYPE_CHECKING:
+    # aiokafka is heavy to import; it is only loaded when consumers start
+    from app.core.kafka_manager import KafkaManager
+    from app.core.outbox import OutboxRelay
+    from app.services.analytics.rollups import RollupEngine
 
-setup_logging()
 logger = get_logger(__name__)
 
 
-consumer_manager: KafkaManager = None
+consumer_manager: "KafkaManager" = None
+outbox_relay: Optional["OutboxRelay"] = None
+snapshot_writer: Optional[SnapshotWriter] = None
+cache_warmer: Optional[CacheWarmer] = None
+rollup_engine: Optional["RollupEngine"] = None
+
+
+async def _start_reader():
+    await database_r.connect()
+    if redirect_snapshot.snapshot is not None:
+        # The snapshot already covers the hot set
+        return
+    if shared_redirects is not None and not shared_redirects.is_owner and shared_redirects.attached:
+        # The owner warms the shared table for every worker
+        return
+    try:
+        await LinksOperations().warm_cache()
+    except Exception:
+        # A cold cache only costs latency; never block startup on it
+        logger.warning("Redirect cache warm-up failed", exc_info=True)
+
+
+async def _start_analytics():
+    global cache_warmer
+    from app.core.geoip import open_database
+    from app.services.analytics.processor import ClickProcessor
+
+    processor = ClickProcessor(geo=open_database(settings.analytics.geoip_path))
+    await consumer_manager.start_batch_consumer(
+        settings.analytics.clicks_topic,
+        settings.analytics.clicks_group,
+        processor.handle,
+        max_records=settings.analytics.consume_max_records,
+        wait=True,
+        auto_commit=False,
+        offset_reset="earliest",
+        dedup=settings.kafka.dedup_enabled
+    )
+    if settings.analytics.trending_enabled:
+        await consumer_manager.start_batch_consumer(
+            settings.analytics.clicks_topic,
+            None,
+            handle_clicks,
+            max_records=settings.analytics.consume_max_records,
+            wait=True
+        )
+        cache_warmer = CacheWarmer(
+            trending_links,
+            LinksOperations().warm_links,
+            interval=settings.analytics.trending_warm_interval,
+            count=settings.analytics.trending_warm_count
+        )
+        await cache_warmer.start()
+    await click_publisher.start(
+        consumer_manager,
+        settings.analytics.clicks_topic,
+        maxlen=settings.analytics.publish_buffer,
+        batch_size=settings.analytics.publish_batch,
+        interval=settings.analytics.publish_interval
+    )
+
+
+async def _startup():
+    """Bring up every dependency concurrently; the first failure aborts startup"""
+    global consumer_manager, outbox_relay, snapshot_writer, rollup_engine
+
+    if settings.cache.snapshot_path:
+        # Serve hot links from the previous process's snapshot instead of
+        # warming the cache from the database. Entries are trusted no longer
+        # than the cache would have kept them, counted from the write
+        redirect_snapshot.load(
+            settings.cache.snapshot_path,
+            min(settings.cache.snapshot_max_age, settings.cache.redirect_ttl)
+        )
+        snapshot_writer = SnapshotWriter(
+            redirect_cache, settings.cache.snapshot_path, settings.cache.snapshot_interval,
+            shared=shared_redirects
+        )
+
+    if shared_redirects is not None:
+        # Attach (or take ownership) before warm-up so the owner fills it
+        await shared_redirects.start()
+
+    steps = [_start_reader(), database_w.connect(), database_export.connect()]
+    if settings.kafka.enabled:
+        from app.core.kafka_manager import KafkaManager
+        from app.core.outbox import OutboxRelay
+
+        consumer_manager = KafkaManager(settings.kafka.topic_group_map, settings.KAFKA_CONFIG)
+        outbox_relay = OutboxRelay(consumer_manager)
+        steps += [
+            consumer_manager.start_producer(),
+            consumer_manager.start_consumers(wait=True),
+            consumer_manager.start_batch_consumer(
+                settings.kafka.invalidation_topic,
+                None,
+                handle_invalidations,
+                max_records=settings.kafka.invalidation_max_records,
+                wait=True
+            ),
+        ]
+
+    await asyncio.gather(*steps)
+    if outbox_relay:
+        await outbox_relay.start()
+    if consumer_manager and settings.analytics.enabled:
+        # Needs the writer pool and the producer from the steps above
+        await _start_analytics()
+    if settings.analytics.enabled and settings.analytics.rollup_enabled:
+        from app.services.analytics.rollups import RollupEngine
+
+        rollup_engine = RollupEngine()
+        await rollup_engine.start()
+    if snapshot_writer:
+        await snapshot_writer.start()
+
+
+async def _shutdown(started: bool = True):
+    """
+    Drain requests, then stop consumers, flush producers and close pools
+
+    Args:
+        started: False after a failed startup; there are no requests to
+            drain and the cache is not worth a snapshot
+    """
+    if started and not await request_tracker.wait_idle(settings.api.shutdown_timeout / 2):
+        logger.warning("Shutting down with %s requests still in flight", request_tracker.active)
+
+    if cache_warmer:
+        await cache_warmer.stop()
+    if rollup_engine:
+        await rollup_engine.stop(timeout=settings.api.shutdown_timeout / 4)
+    if consumer_manager:
+        await consumer_manager.stop_consumers()
+    await click_publisher.stop(timeout=settings.api.shutdown_timeout / 4)
+    if outbox_relay:
+        await outbox_relay.stop(timeout=settings.api.shutdown_timeout / 4)
+    if consumer_manager:
+        await consumer_manager.stop_producer(flush_timeout=settings.api.shutdown_timeout / 4)
+
+    if snapshot_writer:
+        await snapshot_writer.stop(final_write=started)
+    redirect_snapshot.close()
+    if shared_redirects is not None:
+        await shared_redirects.stop()
+
+    await asyncio.gather(
+        database_r.disconnect(), database_w.disconnect(), database_export.disconnect(), return_exceptions=True
+    )
+
+
+async def _stop(started: bool):
+    try:
+        await asyncio.wait_for(_shutdown(started), timeout=settings.api.shutdown_timeout)
+    except asyncio.TimeoutError:
+        logger.error("Shutdown did not finish within %ss", settings.api.shutdown_timeout)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging (dictConfig, log directory, listener thread) is configured here
+    # rather than at import so importing the app stays cheap
+    setup_logging(
+        settings.observability.log_level,
+        use_queue=settings.observability.log_queue,
+        json_format=settings.observability.log_json,
+        log_filters=settings.observability.log_filters
+    )
+
+    try:
+        await asyncio.wait_for(_startup(), timeout=settings.api.startup_timeout)
+    except BaseException:
+        # Release whatever did start (pools, producer, consumer tasks, the
+        # shared table lock) before the server gives up
+        logger.error("Startup failed", exc_info=True)
+        try:
+            await _stop(started=False)
+        except Exception:
+            logger.warning("Cleanup after the failed startup failed", exc_info=True)
+        raise
+    drain = DrainOnSignal(readiness, settings.api.drain_delay)
+    drain.install()
+    readiness.mark_ready()
+    logger.info("Service ready")
+
+    yield
+
+    drain.uninstall()
+    readiness.mark_not_ready("shutting down")
+    await _stop(started=True)
+
 
 # FastAPI application instance
 app = FastAPI(
     title="Service for Payment Gateway",
     description="Service for Payment Gateway",
-    version=settings.release_version
+    version=settings.release_version,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -29,23 +236,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Exception Handlers
-app.add_exception_handler(StarletteHTTPException, exception_handler)
-app.add_exception_handler(AppException, exception_handler)
-
+if settings.observability.server_timing_enabled:
+    app.add_middleware(
+        ServerTimingMiddleware,
+        profile_dir=settings.observability.profile_dir,
+        profile_header=settings.observability.profile_header,
+        profile_token=settings.observability.profile_token,
+        profile_sample_rate=settings.observability.profile_sample_rate,
+        profile_interval=settings.observability.profile_interval
+    )
 
+if settings.observability.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
-@app.on_event("startup")
-async def startup():
-    await database_r.connect()
-    await database_w.connect()
-
-
-@app.on_event("shutdown")
-async def shutdown():
-    await database_r.disconnect()
-    await database_w.disconnect()
+# Outermost, so requests are counted until the response is fully sent
+app.add_middleware(InFlightMiddleware)
 
+# Exception Handlers
+app.add_exception_handler(StarletteHTTPException, exception_handler)
+app.add_exception_handler(AppException, exception_handler)
 
 # Route Definitions
 app.include_router(router, prefix="/v1")
\ No newline at end of file
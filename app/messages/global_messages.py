@@ -1,2 +1,11 @@
 HEALTH_CHECK_SUCCESS = "Service healthy"
-HEALTH_CHECK_FAILED = "Service not healthy"
\ No newline at end of file
+HEALTH_CHECK_FAILED = "Service not healthy"
+READINESS_SUCCESS = "Service ready"
+READINESS_FAILED = "Service not ready"
+LINK_NOT_FOUND = "Link not found"
+LINK_EXPIRED = "Link expired"
+EXPORT_NOT_ALLOWED = "Exports are not available on your plan"
+EXPORT_LIMIT_REACHED = "Too many exports in progress, try again later"
+INVALID_DATE_RANGE = "Start date must not be after end date"
+DATE_RANGE_TOO_LONG = "Date range is too long"
+ADMIN_UNAUTHORIZED = "Missing or invalid admin credentials"
@@ -1,12 +1,16 @@
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     Boolean,
     DateTime,
+    Date,
     ForeignKey,
     JSON,
-    Text
+    Text,
+    Index,
+    LargeBinary
 )
 from sqlalchemy.orm import relationship, declarative_base
 
@@ -70,7 +74,7 @@ class UserLinks(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("user.user_id"))
     link = Column(String, nullable=False)
-    short_link = Column(String, nullable=False)
+    short_link = Column(String, nullable=False, index=True)
     is_active = Column(Boolean, default=True)
     expiry_timestamp = Column(DateTime)
     created_on = Column(DateTime)
@@ -124,3 +128,84 @@ class Notifications(Base):
     updated_on = Column(DateTime)
 
     template = relationship("NotificationTemplates", back_populates="notifications")
+
+
+class EventOutbox(Base):
+    """Kafka events staged in the same transaction as the business write"""
+    __tablename__ = "event_outbox"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    topic = Column(String, nullable=False)
+    message_key = Column(String)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String)
+    created_on = Column(DateTime)
+    sent_on = Column(DateTime)
+    # Lease of the relay publishing the row
+    claimed_until = Column(DateTime)
+
+    __table_args__ = (
+        Index(
+            "ix_event_outbox_unsent",
+            "id",
+            postgresql_where=sent_on.is_(None)
+        ),
+    )
+
+
+class LinkClickBuckets(Base):
+    """Click counts per link and time bucket (minute, hour or day)"""
+    __tablename__ = "link_click_buckets"
+
+    short_link = Column(String, primary_key=True)
+    resolution = Column(String(8), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    clicks = Column(BigInteger, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_link_click_buckets_resolution_start", "resolution", "bucket_start"),
+        # Retention deletes by age across every resolution
+        Index("ix_link_click_buckets_bucket_start", "bucket_start"),
+    )
+
+
+class LinkClickBreakdown(Base):
+    """Daily click counts per link by dimension (country, ...)"""
+    __tablename__ = "link_click_breakdown"
+
+    short_link = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    dimension = Column(String(16), primary_key=True)
+    value = Column(String, primary_key=True)
+    clicks = Column(BigInteger, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_link_click_breakdown_day", "day"),
+    )
+
+
+class LinkVisitorSketches(Base):
+    """HyperLogLog sketch of visitor IPs per link and day"""
+    __tablename__ = "link_visitor_sketches"
+
+    short_link = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("ix_link_visitor_sketches_day", "day"),
+    )
+
+
+class KafkaConsumerCheckpoints(Base):
+    """Last handled position of a consumer group per partition, for deduplication"""
+    __tablename__ = "kafka_consumer_checkpoints"
+
+    group_id = Column(String, primary_key=True)
+    topic = Column(String, primary_key=True)
+    partition = Column(Integer, primary_key=True)
+    position = Column(BigInteger, nullable=False)
+    # Bitmap of offsets above position already handled
+    done = Column(LargeBinary)
+    updated_on = Column(DateTime)
@@ -1,8 +1,21 @@
 from fastapi import APIRouter
 
+from app.config import settings
+from app.services.admin.routes import router as AdminRouter
+from app.services.analytics.routes import router as AnalyticsRouter
+from app.services.exports.routes import router as ExportsRouter
 from app.services.health_check.routes import router as HealthCheckRouter
+from app.services.links.routes import router as LinksRouter
+from app.services.metrics.routes import router as MetricsRouter
 
 router = APIRouter()
 
 
-router.include_router(HealthCheckRouter, prefix="", tags=["Health-Check"])
\ No newline at end of file
+router.include_router(HealthCheckRouter, prefix="", tags=["Health-Check"])
+router.include_router(MetricsRouter, prefix="", tags=["Metrics"])
+router.include_router(LinksRouter, prefix="", tags=["Links"])
+router.include_router(ExportsRouter, prefix="", tags=["Exports"])
+router.include_router(AnalyticsRouter, prefix="", tags=["Analytics"])
+
+if settings.observability.admin_endpoints_enabled:
+    router.include_router(AdminRouter, prefix="", tags=["Admin"])
\ No newline at end of file
@@ -0,0 +1,34 @@
+from enum import Enum
+from pydantic import BaseModel, Field
+
+
+class QueryOrderBy(str, Enum):
+    TOTAL = "total_ms"
+    COUNT = "count"
+    MEAN = "mean_ms"
+    P99 = "p99_ms"
+    MAX = "max_ms"
+
+
+class StatementStats(BaseModel):
+    database: str
+    fingerprint: str = Field(
+        title="Statement Fingerprint",
+        description="Statement with literals and parameters normalized to ?",
+    )
+    count: int
+    errors: int
+    total_ms: float
+    mean_ms: float
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class TrendingLink(BaseModel):
+    short_link: str
+    clicks: int = Field(
+        title="Clicks",
+        description="Clicks in the window; may over-count by up to `error`",
+    )
+    error: int
@@ -0,0 +1,43 @@
+from datetime import date, datetime
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class UniqueVisitors(BaseModel):
+    short_link: Optional[str] = None
+    user_id: Optional[int] = None
+    start: date
+    end: date
+    unique_visitors: int = Field(
+        title="Unique Visitors",
+        description="Estimated distinct visitor IPs in the range (HyperLogLog, ~1.6% standard error)",
+    )
+    days: int = Field(
+        title="Days With Clicks",
+        description="Daily sketches merged for the estimate",
+    )
+
+
+class ClickResolution(str, Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+
+class ClickPoint(BaseModel):
+    bucket_start: datetime
+    clicks: int
+
+
+class ClickSeries(BaseModel):
+    short_link: str
+    resolution: ClickResolution = Field(
+        title="Resolution",
+        description="Bucket width; the finest one stored for the whole range that fits the point limit",
+    )
+    start: datetime
+    end: datetime
+    total: int
+    points: List[ClickPoint]
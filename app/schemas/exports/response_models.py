@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class ExportDataset(str, Enum):
+    LINKS = "links"
+    CLICKS = "clicks"
@@ -1,6 +1,6 @@
 from enum import Enum
 from http import HTTPStatus
-from typing import Optional, Any
+from typing import Dict, Optional, Any
 from pydantic import BaseModel, Field
 
 
@@ -29,9 +29,23 @@ class DatabaseStatus(StatusMessage):
     pass
 
 
+class KafkaStatus(StatusMessage):
+    """Consumer lag from the latest sample, in messages"""
+    lag: Dict[str, int] = {}
+    max_partition_lag: int = 0
+    sampled_at: Optional[float] = None
+
+
 class Health(BaseModel):
     service: AppStatus
     database: StatusMessage
+    kafka: Optional[KafkaStatus] = None
+
+
+class Readiness(BaseModel):
+    ready: bool
+    reason: Optional[str] = None
+    in_flight: int = 0
 
 
 class Response(BaseModel):
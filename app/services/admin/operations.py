@@ -0,0 +1,72 @@
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import Query
+
+from app.core.query_stats import QUERY_STATS
+from app.core.trending import trending_links
+from app.schemas.admin.response_models import QueryOrderBy, StatementStats, TrendingLink
+from app.services.common.base import BaseOperations
+from app.utils.data_formatters import DataFormatter
+
+
+USER_LINKS_QUERY = """
+    SELECT id, link, short_link, is_active, expiry_timestamp, created_on, updated_on
+    FROM user_links
+    WHERE user_id = :user_id AND deleted_on IS NULL
+    ORDER BY id
+"""
+
+
+class Operations(BaseOperations):
+    # Public Methods
+    async def top_queries(
+            self,
+            limit: int = Query(20, ge=1, le=500),
+            order_by: QueryOrderBy = QueryOrderBy.TOTAL,
+            database: Optional[str] = None
+    ):
+        statements = [
+            StatementStats(**row)
+            for row in QUERY_STATS.top(limit=limit, order_by=order_by.value, database=database)
+        ]
+        return self._successResponse(
+            data=statements,
+            http_status=HTTPStatus.OK,
+            message="Top statements retrieved successfully",
+        )
+
+    async def reset_query_stats(self):
+        QUERY_STATS.reset()
+        return self._successResponse(
+            data=None,
+            http_status=HTTPStatus.OK,
+            message="Statement statistics reset",
+        )
+
+    async def trending(
+            self,
+            minutes: int = Query(15, ge=1, le=1440),
+            limit: int = Query(20, ge=1, le=100)
+    ):
+        links = [
+            TrendingLink(**link._asdict())
+            for link in trending_links.top(minutes * 60, limit)
+        ]
+        return self._successResponse(
+            data=links,
+            http_status=HTTPStatus.OK,
+            message="Trending links retrieved successfully",
+            meta={"window_minutes": min(minutes, trending_links.window_slices * trending_links.slice_seconds // 60)},
+        )
+
+    async def user_links(self, user_id: int):
+        # Streamed rather than paginated: a bulk account can own far more
+        # links than fit comfortably in one response body
+        rows = DataFormatter.iterate_result_dicts(self.db_r, USER_LINKS_QUERY, {"user_id": user_id})
+        return self._streamingResponse(
+            rows,
+            http_status=HTTPStatus.OK,
+            message="User links retrieved successfully",
+            meta={"user_id": user_id},
+        )
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+
+from app.core.auth import require_admin
+from app.services.admin.operations import Operations as AdminOperations
+
+# Every route here needs the admin token; admin_endpoints_enabled only
+# decides whether the router is mounted at all
+router = APIRouter(dependencies=[Depends(require_admin)])
+admin_operations = AdminOperations()
+
+handlers = [
+    {
+        "path": "/admin/queries",
+        "endpoint": admin_operations.top_queries,
+        "methods": ["GET"]
+    },
+    {
+        "path": "/admin/queries",
+        "endpoint": admin_operations.reset_query_stats,
+        "methods": ["DELETE"]
+    },
+    {
+        "path": "/admin/links/trending",
+        "endpoint": admin_operations.trending,
+        "methods": ["GET"]
+    },
+    {
+        "path": "/admin/users/{user_id}/links",
+        "endpoint": admin_operations.user_links,
+        "methods": ["GET"]
+    }
+]
+
+for route in handlers:
+    router.add_api_route(
+        path=route["path"],
+        endpoint=route["endpoint"],
+        methods=route["methods"]
+    )
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from http import HTTPStatus
+from typing import Dict, List, Optional
+
+from fastapi import Path
+
+from app.config import settings
+from app.core.hyperloglog import HyperLogLog
+from app.messages.global_messages import DATE_RANGE_TOO_LONG, INVALID_DATE_RANGE
+from app.schemas.analytics.response_models import ClickPoint, ClickResolution, ClickSeries, UniqueVisitors
+from app.services.analytics.rollups import RESOLUTIONS, series_resolution
+from app.services.common.base import BaseOperations
+from app.utils.base_exception import AppException
+from app.utils.shared.datetime_utils import DateTimeUtil
+
+
+LINK_SKETCHES_QUERY = """
+    SELECT sketch
+    FROM link_visitor_sketches
+    WHERE short_link = :short_link AND day BETWEEN :start AND :end
+"""
+
+USER_SKETCHES_QUERY = """
+    SELECT sketch.sketch
+    FROM link_visitor_sketches AS sketch
+    JOIN user_links ON user_links.short_link = sketch.short_link
+    WHERE user_links.user_id = :user_id AND user_links.deleted_on IS NULL
+      AND sketch.day BETWEEN :start AND :end
+"""
+
+# Finer resolutions are truncated into the reported one, so a range that
+# spans a compaction boundary still adds up
+_SERIES_TEMPLATE = """
+    SELECT date_trunc('{resolution}', bucket_start) AS bucket_start, SUM(clicks) AS clicks
+    FROM link_click_buckets
+    WHERE short_link = :short_link AND resolution = ANY(:resolutions)
+      AND bucket_start >= :start AND bucket_start < :end
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+# reported resolution -> series statement
+SERIES_QUERIES = {resolution: _SERIES_TEMPLATE.format(resolution=resolution) for resolution in RESOLUTIONS}
+
+DEFAULT_RANGE_DAYS = 30
+DEFAULT_SERIES_HOURS = 24
+
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+class Operations(BaseOperations):
+    # Private Methods
+    def _date_range(self, start: Optional[date], end: Optional[date]):
+        end = end or datetime.now(timezone.utc).date()
+        start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+        if start > end:
+            raise AppException(message=INVALID_DATE_RANGE, status_code=HTTPStatus.BAD_REQUEST)
+        if (end - start).days + 1 > settings.analytics.visitors_max_days:
+            raise AppException(message=DATE_RANGE_TOO_LONG, status_code=HTTPStatus.BAD_REQUEST)
+        return start, end
+
+    def _datetime_range(self, start: Optional[datetime], end: Optional[datetime], now: datetime):
+        end = _naive_utc(end) if end else now
+        start = _naive_utc(start) if start else end - timedelta(hours=DEFAULT_SERIES_HOURS)
+        if start >= end:
+            raise AppException(message=INVALID_DATE_RANGE, status_code=HTTPStatus.BAD_REQUEST)
+        if end - start > timedelta(days=max(settings.analytics.retention_days.values(), default=0)):
+            raise AppException(message=DATE_RANGE_TOO_LONG, status_code=HTTPStatus.BAD_REQUEST)
+        return start, end
+
+    async def _unique_visitors(self, query: str, values: Dict) -> UniqueVisitors:
+        rows = await self.db_r.fetch_all(query=query, values=values)
+        sketches: List[bytes] = [bytes(row["sketch"]) for row in rows]
+        # One sketch per link and day, so the work is bounded by the range,
+        # not by the clicks in it; still kept off the event loop
+        merged = await asyncio.to_thread(
+            HyperLogLog.merged, sketches, settings.analytics.hll_precision
+        )
+        return UniqueVisitors(
+            start=values["start"], end=values["end"],
+            unique_visitors=merged.count(), days=len(sketches)
+        )
+
+    # Public Methods
+    async def link_visitors(
+            self,
+            short_link: str = Path(..., min_length=1, max_length=64),
+            start: Optional[date] = None,
+            end: Optional[date] = None
+    ):
+        start, end = self._date_range(start, end)
+        visitors = await self._unique_visitors(
+            LINK_SKETCHES_QUERY, {"short_link": short_link, "start": start, "end": end}
+        )
+        visitors.short_link = short_link
+        return self._successResponse(
+            data=visitors.model_dump(mode="json"),
+            http_status=HTTPStatus.OK,
+            message="Unique visitors retrieved successfully",
+        )
+
+    async def user_visitors(
+            self,
+            user_id: int = Path(..., ge=1),
+            start: Optional[date] = None,
+            end: Optional[date] = None
+    ):
+        start, end = self._date_range(start, end)
+        visitors = await self._unique_visitors(
+            USER_SKETCHES_QUERY, {"user_id": user_id, "start": start, "end": end}
+        )
+        visitors.user_id = user_id
+        return self._successResponse(
+            data=visitors.model_dump(mode="json"),
+            http_status=HTTPStatus.OK,
+            message="Unique visitors retrieved successfully",
+        )
+
+    async def link_clicks(
+            self,
+            short_link: str = Path(..., min_length=1, max_length=64),
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            resolution: Optional[ClickResolution] = None
+    ):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        start, end = self._datetime_range(start, end, now)
+        chosen = series_resolution(start, end, now, resolution.value if resolution else None)
+        rows = await self.db_r.fetch_all(query=SERIES_QUERIES[chosen], values={
+            "short_link": short_link,
+            "resolutions": list(RESOLUTIONS[:RESOLUTIONS.index(chosen) + 1]),
+            "start": DateTimeUtil.truncate_datetimes([start], chosen)[0],
+            "end": end,
+        })
+        points = [ClickPoint(bucket_start=row["bucket_start"], clicks=row["clicks"]) for row in rows]
+        series = ClickSeries(
+            short_link=short_link, resolution=chosen, start=start, end=end,
+            total=sum(point.clicks for point in points), points=points
+        )
+        return self._successResponse(
+            data=series.model_dump(mode="json"),
+            http_status=HTTPStatus.OK,
+            message="Click series retrieved successfully",
+        )
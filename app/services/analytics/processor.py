@@ -0,0 +1,251 @@
+"""
+Click stream consumer: enrichment and per-minute aggregation
+
+Each polled batch of click events is enriched (country from the offline
+geo database; browser, OS, device, bot and referrer from the click
+classifier), aggregated in memory and written with one set-based upsert
+per table, so the database sees a handful of statements per batch rather
+than one per click.
+
+Unique visitors are tracked as one HyperLogLog sketch of client IPs per
+(link, day). The batch's sketches are merged with the stored ones and
+written back; merging is idempotent, so a batch replayed after a failed
+commit does not inflate the counts.
+"""
+import logging
+import math
+import time
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import databases
+
+from app.config import settings
+from app.core.click_classifier import classify_batch
+from app.core.db_session import database_w
+from app.core.geoip import GeoDatabase
+from app.core.hyperloglog import HyperLogLog
+from app.core.kafka_dedup import save_checkpoint
+from app.core.metrics import REGISTRY
+from app.utils.shared.datetime_utils import DateTimeUtil
+
+
+logger = logging.getLogger(__name__)
+
+CLICKS_INVALID = REGISTRY.counter(
+    "clicks_invalid_total", "Click events skipped as malformed, by reason", ("reason",)
+)
+
+UPSERT_BUCKETS_QUERY = """
+    INSERT INTO link_click_buckets (short_link, resolution, bucket_start, clicks)
+    SELECT short_link, :resolution, bucket_start, clicks
+    FROM unnest(
+        CAST(:short_links AS VARCHAR[]),
+        CAST(:bucket_starts AS TIMESTAMP[]),
+        CAST(:clicks AS BIGINT[])
+    ) AS batch (short_link, bucket_start, clicks)
+    ON CONFLICT (short_link, resolution, bucket_start)
+    DO UPDATE SET clicks = link_click_buckets.clicks + EXCLUDED.clicks
+"""
+
+UPSERT_BREAKDOWN_QUERY = """
+    INSERT INTO link_click_breakdown (short_link, day, dimension, value, clicks)
+    SELECT short_link, day, dimension, value, clicks
+    FROM unnest(
+        CAST(:short_links AS VARCHAR[]),
+        CAST(:days AS DATE[]),
+        CAST(:dimensions AS VARCHAR[]),
+        CAST(:values AS VARCHAR[]),
+        CAST(:clicks AS BIGINT[])
+    ) AS batch (short_link, day, dimension, value, clicks)
+    ON CONFLICT (short_link, day, dimension, value)
+    DO UPDATE SET clicks = link_click_breakdown.clicks + EXCLUDED.clicks
+"""
+
+# Rows are locked in key order, so concurrent writers cannot deadlock
+LOCK_SKETCHES_QUERY = """
+    SELECT sketch.short_link, sketch.day, sketch.sketch
+    FROM link_visitor_sketches AS sketch
+    JOIN unnest(CAST(:short_links AS VARCHAR[]), CAST(:days AS DATE[])) AS batch (short_link, day)
+      ON sketch.short_link = batch.short_link AND sketch.day = batch.day
+    ORDER BY sketch.short_link, sketch.day
+    FOR UPDATE OF sketch
+"""
+
+UPSERT_SKETCHES_QUERY = """
+    INSERT INTO link_visitor_sketches (short_link, day, sketch)
+    SELECT short_link, day, sketch
+    FROM unnest(
+        CAST(:short_links AS VARCHAR[]),
+        CAST(:days AS DATE[]),
+        CAST(:sketches AS BYTEA[])
+    ) AS batch (short_link, day, sketch)
+    ON CONFLICT (short_link, day)
+    DO UPDATE SET sketch = EXCLUDED.sketch
+"""
+
+UNKNOWN = "unknown"
+EPOCH_DAY = date(1970, 1, 1)
+# Accepted click timestamps: from 2000-01-01 up to this far ahead of the
+# consumer's clock
+MIN_CLICK_TS = 946684800
+MAX_CLOCK_SKEW = 86400
+
+# link_click_breakdown.dimension -> enriched event field
+DIMENSION_FIELDS = {
+    "country": "country",
+    "browser": "browser",
+    "os": "os",
+    "device": "device",
+    "referrer": "referrer_domain",
+    "source": "referrer_source",
+}
+BREAKDOWN_DIMENSIONS = tuple(DIMENSION_FIELDS)
+
+
+def _naive_utc(timestamp: int) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _epoch_day(day: date) -> int:
+    return (day - EPOCH_DAY).days * 86400
+
+
+def _invalid_reason(event, now: float) -> Optional[str]:
+    """Why `event` cannot be aggregated, or None if it can"""
+    if not isinstance(event, dict):
+        return "payload"
+    short_link = event.get("short_link")
+    if not isinstance(short_link, str) or not short_link:
+        return "short_link"
+    ts = event.get("ts")
+    if isinstance(ts, bool) or not isinstance(ts, (int, float)) or not math.isfinite(ts):
+        return "ts"
+    if not MIN_CLICK_TS <= ts <= now + MAX_CLOCK_SKEW:
+        return "ts_range"
+    for field in ("ip", "user_agent", "referrer"):
+        if not isinstance(event.get(field), (str, type(None))):
+            return field
+    return None
+
+
+class ClickProcessor:
+    def __init__(self, db: databases.Database = database_w, geo: Optional[GeoDatabase] = None):
+        self.db = db
+        self.geo = geo
+
+    def enrich(self, events: List[Dict]) -> List[Dict]:
+        """Add derived dimensions to each event in place"""
+        if self.geo is not None:
+            countries = self.geo.countries_for(event.get("ip") or "" for event in events)
+        else:
+            countries = [None] * len(events)
+        agents, referrers = classify_batch(
+            (event.get("user_agent") for event in events),
+            (event.get("referrer") for event in events)
+        )
+        for event, country, agent, referrer in zip(events, countries, agents, referrers):
+            event["country"] = country or UNKNOWN
+            event["browser"] = agent.browser
+            event["os"] = agent.os
+            event["device"] = agent.device
+            event["is_bot"] = agent.is_bot
+            event["referrer_domain"] = referrer.domain
+            event["referrer_source"] = referrer.source
+        return events
+
+    def aggregate(self, events: List[Dict]):
+        """
+        (per-minute clicks, per-day dimension clicks) counters and per-day
+        visitor sketches keyed by (short_link, day epoch)
+        """
+        minutes = DateTimeUtil.truncate_timestamps((event["ts"] for event in events), "minute")
+        buckets: Counter = Counter()
+        breakdown: Counter = Counter()
+        sketches: Dict[Tuple[str, int], HyperLogLog] = {}
+        for event, minute in zip(events, minutes):
+            short_link = event["short_link"]
+            buckets[(short_link, minute)] += 1
+            day = minute - minute % 86400
+            breakdown[(short_link, day, "traffic", "bot" if event["is_bot"] else "human")] += 1
+            if event["is_bot"]:
+                # Bots are counted once above, not in the audience breakdowns
+                continue
+            for dimension in BREAKDOWN_DIMENSIONS:
+                breakdown[(short_link, day, dimension, event[DIMENSION_FIELDS[dimension]])] += 1
+            if event.get("ip"):
+                sketch = sketches.get((short_link, day))
+                if sketch is None:
+                    sketch = sketches[(short_link, day)] = HyperLogLog(settings.analytics.hll_precision)
+                sketch.add(event["ip"])
+        return buckets, breakdown, sketches
+
+    async def _write_sketches(self, sketches: Dict[Tuple[str, int], HyperLogLog]):
+        keys = sorted(sketches)
+        values = {
+            "short_links": [short_link for short_link, _ in keys],
+            "days": [_naive_utc(day).date() for _, day in keys],
+        }
+        for row in await self.db.fetch_all(query=LOCK_SKETCHES_QUERY, values=values):
+            key = (row["short_link"], _epoch_day(row["day"]))
+            stored = HyperLogLog.from_bytes(bytes(row["sketch"]))
+            if stored.precision != sketches[key].precision:
+                # ANALYTICS_HLL_PRECISION changed since the row was written
+                precision = min(stored.precision, sketches[key].precision)
+                stored, sketches[key] = stored.fold(precision), sketches[key].fold(precision)
+            sketches[key] = stored.merge(sketches[key])
+        values["sketches"] = [sketches[key].to_bytes() for key in keys]
+        await self.db.execute(query=UPSERT_SKETCHES_QUERY, values=values)
+
+    async def _write(self, buckets: Counter, breakdown: Counter, sketches: Dict[Tuple[str, int], HyperLogLog]):
+        async with self.db.transaction():
+            if buckets:
+                keys = list(buckets)
+                await self.db.execute(query=UPSERT_BUCKETS_QUERY, values={
+                    "resolution": "minute",
+                    "short_links": [short_link for short_link, _ in keys],
+                    "bucket_starts": [_naive_utc(minute) for _, minute in keys],
+                    "clicks": [buckets[key] for key in keys],
+                })
+            if breakdown:
+                keys = list(breakdown)
+                await self.db.execute(query=UPSERT_BREAKDOWN_QUERY, values={
+                    "short_links": [key[0] for key in keys],
+                    "days": [_naive_utc(key[1]).date() for key in keys],
+                    "dimensions": [key[2] for key in keys],
+                    "values": [key[3] for key in keys],
+                    "clicks": [breakdown[key] for key in keys],
+                })
+            if sketches:
+                await self._write_sketches(sketches)
+            # Committed with the counts, so a redelivered batch is never counted twice
+            await save_checkpoint(self.db)
+
+    async def handle(self, events: List[Dict]):
+        """
+        Batch handler for KafkaManager.start_batch_consumer
+
+        Malformed events are counted and skipped: retrying the batch would
+        fail on them again and stall the partition.
+        """
+        now = time.time()
+        valid = []
+        invalid: Counter = Counter()
+        for event in events:
+            reason = _invalid_reason(event, now)
+            if reason is None:
+                valid.append(event)
+            else:
+                invalid[reason] += 1
+        if invalid:
+            for reason, count in invalid.items():
+                CLICKS_INVALID.labels(reason).inc(count)
+            logger.warning("Skipped %s malformed click events: %s", sum(invalid.values()), dict(invalid))
+        events = valid
+        if not events:
+            return
+        self.enrich(events)
+        buckets, breakdown, sketches = self.aggregate(events)
+        await self._write(buckets, breakdown, sketches)
+        logger.debug("Processed %s clicks into %s minute buckets", len(events), len(buckets))
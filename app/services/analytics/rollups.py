@@ -0,0 +1,252 @@
+"""
+Click rollup compaction and per-plan retention
+
+The click processor only writes minute buckets. In the background, minute
+buckets older than ANALYTICS_ROLLUP_MINUTES_HOURS are folded into hour
+buckets, and hour buckets older than ANALYTICS_ROLLUP_HOURS_DAYS into day
+buckets. Each batch is a single statement: the DELETE ... RETURNING of the
+finer rows feeds an aggregated upsert into the coarser ones, so a batch
+either moves completely or not at all. Rows older than the retention of the
+link owner's plan are then deleted from every analytics table, in batches;
+the links whose plan keeps them longer or shorter than the default are
+looked up once per pass.
+
+At any point in time a link's clicks are stored at exactly one resolution,
+so a range query sums every resolution up to the one it reports in.
+
+Several processes may run the engine; a transaction-level advisory lock
+lets only one compact at a time.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import databases
+
+from app.config import settings
+from app.core.db_session import database_w
+from app.utils.shared.datetime_utils import BUCKET_SECONDS, DateTimeUtil
+
+
+logger = logging.getLogger(__name__)
+
+
+RESOLUTIONS = ("minute", "hour", "day")
+
+# Arbitrary key shared by every process running the engine
+ROLLUP_LOCK_KEY = 740_215_339
+
+TRY_LOCK_QUERY = "SELECT pg_try_advisory_xact_lock(:key)"
+
+_ROLLUP_TEMPLATE = """
+    WITH moved AS (
+        DELETE FROM link_click_buckets
+        WHERE ctid = ANY(ARRAY(
+            SELECT ctid
+            FROM link_click_buckets
+            WHERE resolution = '{source}' AND bucket_start < :cutoff
+            LIMIT :batch_size
+        ))
+        RETURNING short_link, bucket_start, clicks
+    ), merged AS (
+        INSERT INTO link_click_buckets (short_link, resolution, bucket_start, clicks)
+        SELECT short_link, '{target}', date_trunc('{target}', bucket_start), SUM(clicks)
+        FROM moved
+        GROUP BY short_link, date_trunc('{target}', bucket_start)
+        ON CONFLICT (short_link, resolution, bucket_start)
+        DO UPDATE SET clicks = link_click_buckets.clicks + EXCLUDED.clicks
+    )
+    SELECT count(*) FROM moved
+"""
+
+# source resolution -> statement folding one batch of it into the next
+ROLLUP_QUERIES = {
+    "minute": _ROLLUP_TEMPLATE.format(source="minute", target="hour"),
+    "hour": _ROLLUP_TEMPLATE.format(source="hour", target="day"),
+}
+
+# Links whose retention differs from the default (FREE) one, with their
+# retention in days; read once per pass. Links of users without a
+# subscription, deleted links and unknown plans keep the default.
+PLAN_RETENTION_QUERY = """
+    WITH owner_plans AS (
+        SELECT DISTINCT ON (user_id) user_id, UPPER(subscription_mode) AS plan
+        FROM user_subscriptions
+        WHERE is_active AND deleted_on IS NULL
+          AND (expiry IS NULL OR expiry > :now)
+        ORDER BY user_id, expiry DESC NULLS FIRST
+    )
+    SELECT user_links.short_link, retention.days
+    FROM owner_plans
+    JOIN unnest(CAST(:plans AS VARCHAR[]), CAST(:plan_days AS INTEGER[])) AS retention (plan, days)
+      ON retention.plan = owner_plans.plan
+    JOIN user_links ON user_links.user_id = owner_plans.user_id AND user_links.deleted_on IS NULL
+    WHERE retention.days <> :default_days
+"""
+
+# Rows older than the shortest retention are candidates; each is dropped
+# past its link's cutoff from PLAN_RETENTION_QUERY, or the default one
+_RETENTION_TEMPLATE = """
+    WITH deleted AS (
+        DELETE FROM {table}
+        WHERE ctid = ANY(ARRAY(
+            SELECT candidate.ctid
+            FROM {table} AS candidate
+            LEFT JOIN unnest(CAST(:short_links AS VARCHAR[]), CAST(:cutoffs AS TIMESTAMP[]))
+              AS plan_cutoff (short_link, cutoff)
+              ON plan_cutoff.short_link = candidate.short_link
+            WHERE candidate.{column} < :oldest_cutoff
+              AND candidate.{column} < COALESCE(plan_cutoff.cutoff, :default_cutoff)
+            LIMIT :batch_size
+        ))
+        RETURNING 1
+    )
+    SELECT count(*) FROM deleted
+"""
+
+# table -> retention statement
+RETENTION_QUERIES = {
+    table: _RETENTION_TEMPLATE.format(table=table, column=column)
+    for table, column in (
+        ("link_click_buckets", "bucket_start"),
+        ("link_click_breakdown", "day"),
+        ("link_visitor_sketches", "day"),
+    )
+}
+
+
+def rollup_cutoffs(now: datetime) -> Dict[str, datetime]:
+    """source resolution -> bucket_start before which it is rolled up"""
+    minutes_until = now - timedelta(hours=settings.analytics.rollup_minutes_hours)
+    hours_until = now - timedelta(days=settings.analytics.rollup_hours_days)
+    return {
+        "minute": DateTimeUtil.truncate_datetimes([minutes_until], "hour")[0],
+        "hour": DateTimeUtil.truncate_datetimes([hours_until], "day")[0],
+    }
+
+
+def series_resolution(start: datetime, end: datetime, now: datetime, requested: Optional[str] = None) -> str:
+    """
+    Finest resolution a click series over [start, end) can be reported in:
+    no finer than what is still stored at `start`, and no finer than
+    ANALYTICS_SERIES_MAX_POINTS points allow. `requested` may ask for a
+    coarser one.
+    """
+    cutoffs = rollup_cutoffs(now)
+    if start < cutoffs["hour"]:
+        stored = "day"
+    elif start < cutoffs["minute"]:
+        stored = "hour"
+    else:
+        stored = "minute"
+
+    span = (end - start).total_seconds()
+    fits = next(
+        (resolution for resolution in RESOLUTIONS
+         if span / BUCKET_SECONDS[resolution] <= settings.analytics.series_max_points),
+        "day"
+    )
+    candidates = [stored, fits] + ([requested] if requested else [])
+    return max(candidates, key=RESOLUTIONS.index)
+
+
+class RollupEngine:
+    """Runs compaction and retention every ANALYTICS_ROLLUP_INTERVAL seconds"""
+
+    def __init__(self, db: databases.Database = database_w):
+        self.db = db
+        self.interval = settings.analytics.rollup_interval
+        self.batch_size = settings.analytics.rollup_batch_size
+        self.max_batches = settings.analytics.rollup_max_batches
+        self.task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def _locked_batch(self, query: str, values: Dict) -> Optional[int]:
+        """Run one batch under the advisory lock; None if another process holds it"""
+        async with self.db.transaction():
+            if not await self.db.fetch_val(query=TRY_LOCK_QUERY, values={"key": ROLLUP_LOCK_KEY}):
+                return None
+            return await self.db.fetch_val(query=query, values=values)
+
+    async def _drain(self, query: str, values: Dict) -> int:
+        """Repeat a batch until it comes back short (or max_batches); rows affected"""
+        total = 0
+        for _ in range(self.max_batches):
+            if self._stopping.is_set():
+                break
+            affected = await self._locked_batch(query, {**values, "batch_size": self.batch_size})
+            if affected is None:
+                break
+            total += affected
+            if affected < self.batch_size:
+                break
+            # Let redirects and consumers in between batches
+            await asyncio.sleep(0)
+        return total
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        One compaction and retention pass
+
+        Returns:
+            Rows moved or deleted per step
+        """
+        # Buckets are stored as naive UTC
+        now = now or DateTimeUtil.get_current_timestamp().replace(tzinfo=None)
+        stats: Dict[str, int] = {}
+        for source, cutoff in rollup_cutoffs(now).items():
+            stats[f"rollup_{source}"] = await self._drain(ROLLUP_QUERIES[source], {"cutoff": cutoff})
+
+        retention = {plan.upper(): days for plan, days in settings.analytics.retention_days.items()}
+        default_days = retention.get("FREE", min(retention.values(), default=0))
+        if default_days <= 0:
+            return stats
+        rows = await self.db.fetch_all(query=PLAN_RETENTION_QUERY, values={
+            "now": now,
+            "plans": list(retention),
+            "plan_days": list(retention.values()),
+            "default_days": default_days,
+        })
+        values = {
+            "short_links": [row["short_link"] for row in rows],
+            "cutoffs": [now - timedelta(days=row["days"]) for row in rows],
+            "default_cutoff": now - timedelta(days=default_days),
+            "oldest_cutoff": now - timedelta(days=min([default_days, *retention.values()])),
+        }
+        for table, query in RETENTION_QUERIES.items():
+            stats[f"retention_{table}"] = await self._drain(query, values)
+        return stats
+
+    async def _run(self):
+        logger.info("Click rollup engine started.")
+        while not self._stopping.is_set():
+            try:
+                stats = await self.run_once()
+                if any(stats.values()):
+                    logger.info("Click rollup pass: %s", stats)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Click rollup pass failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("Click rollup engine stopped.")
+
+    async def start(self):
+        if self.task:
+            return
+        self._stopping.clear()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        if not self.task:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(self.task, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.task.cancel()
+        self.task = None
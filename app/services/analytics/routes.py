@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends
+
+from app.core.auth import require_admin
+from app.services.analytics.operations import Operations as AnalyticsOperations
+
+# Per-link and per-user analytics are not public; operators only until
+# user authentication exists
+router = APIRouter(dependencies=[Depends(require_admin)])
+analytics_operations = AnalyticsOperations()
+
+handlers = [
+    {
+        "path": "/links/{short_link}/visitors",
+        "endpoint": analytics_operations.link_visitors,
+        "methods": ["GET"]
+    },
+    {
+        "path": "/links/{short_link}/clicks",
+        "endpoint": analytics_operations.link_clicks,
+        "methods": ["GET"]
+    },
+    {
+        "path": "/users/{user_id}/visitors",
+        "endpoint": analytics_operations.user_visitors,
+        "methods": ["GET"]
+    }
+]
+
+for route in handlers:
+    router.add_api_route(
+        path=route["path"],
+        endpoint=route["endpoint"],
+        methods=route["methods"]
+    )
@@ -1,11 +1,15 @@
 import json
 from http import HTTPStatus
-from typing import cast, Any, List
+from typing import cast, Any, AsyncIterator, Iterable, List, Optional
 from enum import Enum
 from fastapi.responses import JSONResponse
 from fastapi import Request
 from app.core.db_session import database_r, database_w
+from app.core.cache_invalidation import invalidation_events
+from app.core.outbox import enqueue_event
+from app.core.request_timing import timed_phase
 from app.schemas.health_check.response_models import Response
+from app.utils.shared.streaming_utils import StreamingUtil
 
 
 from app.utils.base_exception import AppException
@@ -25,13 +29,28 @@ class BaseOperations:
         self.db_r = database_r
         self.db_w = database_w
 
+    async def _enqueue_event(self, topic: str, key: Optional[str], value: dict):
+        """Stage a Kafka event; await inside the db_w transaction of the write"""
+        await enqueue_event(self.db_w, topic, key, value)
+
+    async def _invalidate_links(self, short_links: Iterable[str]):
+        """
+        Evict edited, deactivated or deleted links from every pod's caches
+
+        Await inside the db_w transaction of the change, so the eviction is
+        published only if the change commits.
+        """
+        for topic, key, value in invalidation_events(short_links):
+            await self._enqueue_event(topic, key, value)
+
     def __create_json_response(self, response: Response):
-        return cast(
-            Any,
-            JSONResponse(
-                status_code=response.status_code, content=response.model_dump()
-            ),
-        )
+        with timed_phase("serialize"):
+            return cast(
+                Any,
+                JSONResponse(
+                    status_code=response.status_code, content=response.model_dump()
+                ),
+            )
 
     def _successResponse(
             self,
@@ -60,6 +79,26 @@ class BaseOperations:
         return self.__create_json_response(response)
     
 
+    def _streamingResponse(
+            self,
+            items: AsyncIterator[Any],
+            http_status: HTTPStatus = HTTPStatus.OK,
+            message: str = "Success",
+            meta: dict = {}
+    ):
+        """
+        Same envelope as _successResponse, with "data" streamed from `items`
+        (e.g. DataFormatter.iterate_result_dicts) instead of built in memory.
+        meta gets an "items" count once the stream ends.
+        """
+        head = {"success": True, "status_code": http_status.value, "message": message}
+        return StreamingUtil.json_response(
+            items,
+            head,
+            tail=lambda count: {"meta": {**meta, "items": count}},
+            status_code=http_status.value
+        )
+
     def paginated_response(
             self,
             items: List[Any],
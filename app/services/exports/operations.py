@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import defaultdict
+from http import HTTPStatus
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import Path
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.config import settings
+from app.core.db_session import database_export
+from app.messages.global_messages import EXPORT_LIMIT_REACHED, EXPORT_NOT_ALLOWED
+from app.schemas.exports.response_models import ExportDataset, ExportFormat
+from app.services.common.base import BaseOperations
+from app.utils.base_exception import AppException
+from app.utils.data_formatters import DataFormatter
+from app.utils.shared.streaming_utils import StreamingUtil
+
+
+logger = logging.getLogger(__name__)
+
+
+ACTIVE_PLAN_QUERY = """
+    SELECT subscription_mode
+    FROM user_subscriptions
+    WHERE user_id = :user_id AND is_active AND deleted_on IS NULL
+      AND (expiry IS NULL OR expiry > now() AT TIME ZONE 'utc')
+    ORDER BY expiry DESC NULLS FIRST
+    LIMIT 1
+"""
+
+# dataset -> (query, CSV columns); rows are read through a server-side cursor
+EXPORT_QUERIES = {
+    ExportDataset.LINKS: (
+        """
+        SELECT id, link, short_link, is_active, expiry_timestamp, created_on, updated_on
+        FROM user_links
+        WHERE user_id = :user_id AND deleted_on IS NULL
+        ORDER BY id
+        """,
+        ("id", "link", "short_link", "is_active", "expiry_timestamp", "created_on", "updated_on"),
+    ),
+    # Click counts at whatever resolution the rollups left each bucket in
+    ExportDataset.CLICKS: (
+        """
+        SELECT b.short_link, b.resolution, b.bucket_start, b.clicks
+        FROM user_links l
+        JOIN link_click_buckets b ON b.short_link = l.short_link
+        WHERE l.user_id = :user_id AND l.deleted_on IS NULL
+        ORDER BY b.short_link, b.resolution, b.bucket_start
+        """,
+        ("short_link", "resolution", "bucket_start", "clicks"),
+    ),
+}
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+class _ExportSlot:
+    """One running export; release() is idempotent"""
+
+    def __init__(self, slots: "ExportSlots", user_id: int):
+        self.slots = slots
+        self.user_id = user_id
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.slots.active -= 1
+            self.slots.per_user[self.user_id] -= 1
+            if not self.slots.per_user[self.user_id]:
+                del self.slots.per_user[self.user_id]
+
+
+class ExportSlots:
+    """Process-local limits on concurrent exports, overall and per user"""
+
+    def __init__(self):
+        self.active = 0
+        self.per_user: Dict[int, int] = defaultdict(int)
+
+    def acquire(self, user_id: int, user_limit: int) -> Optional[_ExportSlot]:
+        if self.active >= settings.export.max_concurrent or self.per_user[user_id] >= user_limit:
+            return None
+        self.active += 1
+        self.per_user[user_id] += 1
+        return _ExportSlot(self, user_id)
+
+
+export_slots = ExportSlots()
+
+
+class Operations(BaseOperations):
+    # Private Methods
+    async def _plan_limit(self, user_id: int) -> int:
+        plan = await self.db_r.fetch_val(query=ACTIVE_PLAN_QUERY, values={"user_id": user_id})
+        return settings.export.plan_concurrency.get((plan or "").upper(), 0)
+
+    async def _stream(self, chunks: AsyncIterator[bytes], slot: _ExportSlot, user_id: int, dataset: str):
+        sent = 0
+        try:
+            async for chunk in chunks:
+                sent += len(chunk)
+                yield chunk
+            logger.info("Export of %s for user %s finished, %s bytes", dataset, user_id, sent)
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away; closing `chunks` closes the DB cursor
+            logger.info("Export of %s for user %s cancelled after %s bytes", dataset, user_id, sent)
+            raise
+        finally:
+            await chunks.aclose()
+            slot.release()
+
+    # Public Methods
+    async def export(
+            self,
+            user_id: int = Path(..., ge=1),
+            dataset: ExportDataset = Path(...),
+            format: ExportFormat = ExportFormat.CSV,
+            gzip: bool = False
+    ):
+        user_limit = await self._plan_limit(user_id)
+        if user_limit <= 0:
+            raise AppException(message=EXPORT_NOT_ALLOWED, status_code=HTTPStatus.FORBIDDEN)
+        slot = export_slots.acquire(user_id, user_limit)
+        if slot is None:
+            raise AppException(message=EXPORT_LIMIT_REACHED, status_code=HTTPStatus.TOO_MANY_REQUESTS)
+
+        query, columns = EXPORT_QUERIES[dataset]
+        rows = DataFormatter.iterate_result_dicts(database_export, query, {"user_id": user_id})
+        chunk_size = settings.export.chunk_size
+        if format is ExportFormat.CSV:
+            chunks = StreamingUtil.csv_rows(rows, columns, chunk_size)
+        else:
+            chunks = StreamingUtil.ndjson_lines(rows, chunk_size)
+
+        filename = f"{dataset.value}-{user_id}.{format.value}"
+        media_type = MEDIA_TYPES[format]
+        if gzip:
+            chunks = StreamingUtil.gzipped(chunks, settings.export.gzip_level)
+            filename += ".gz"
+            media_type = "application/gzip"
+
+        return StreamingResponse(
+            self._stream(chunks, slot, user_id, dataset.value),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            # Frees the slot even if the body was never started
+            background=BackgroundTask(slot.release)
+        )
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from app.core.auth import require_admin
+from app.services.exports.operations import Operations as ExportOperations
+
+# No user accounts exist yet, so user_id in the path is only trusted from
+# an operator holding the admin token
+router = APIRouter(dependencies=[Depends(require_admin)])
+export_operations = ExportOperations()
+
+handlers = [
+    {
+        "path": "/users/{user_id}/exports/{dataset}",
+        "endpoint": export_operations.export,
+        "methods": ["GET"]
+    }
+]
+
+for route in handlers:
+    router.add_api_route(
+        path=route["path"],
+        endpoint=route["endpoint"],
+        methods=route["methods"]
+    )
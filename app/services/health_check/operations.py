@@ -1,6 +1,7 @@
 import time
 import logging
 from http import HTTPStatus
+from typing import Optional
 
 from app.services.common.base import BaseOperations
 from app.schemas.health_check.response_models import (
@@ -8,10 +9,14 @@ from app.schemas.health_check.response_models import (
     Health,
     DatabaseStatus,
     AppStatus,
+    KafkaStatus,
+    Readiness,
 )
 from app.config import settings
+from app.core.lifecycle import readiness, request_tracker
 from app.messages.global_messages import (
-    HEALTH_CHECK_FAILED, HEALTH_CHECK_SUCCESS 
+    HEALTH_CHECK_FAILED, HEALTH_CHECK_SUCCESS,
+    READINESS_FAILED, READINESS_SUCCESS,
 )
 
 
@@ -56,23 +61,63 @@ class Operations(BaseOperations):
                 error=str(exception),
             )
 
+    def __kafka_health(self) -> Optional[KafkaStatus]:
+        if not settings.kafka.enabled:
+            return None
+        from app.core.kafka_flow import consumer_lag
+
+        max_lag = consumer_lag.max_lag()
+        status = KafkaStatus(
+            status=StatusEnum.STATUS_UP,
+            lag=consumer_lag.by_topic(),
+            max_partition_lag=max_lag,
+            sampled_at=consumer_lag.sampled_at,
+        )
+        if 0 < settings.kafka.lag_unhealthy < max_lag:
+            status.status = StatusEnum.STATUS_DOWN
+            status.error = f"Partition lag {max_lag} above {settings.kafka.lag_unhealthy}"
+        return status
+
     # Public Methods
     async def check_health(self):
         db_status = await self.__db_health()
         service_status = await self.__app_health()
+        kafka_status = self.__kafka_health()
+        data = Health(database=db_status, service=service_status, kafka=kafka_status)
 
         if (
             db_status.status is StatusEnum.STATUS_DOWN
             or service_status.status is StatusEnum.STATUS_DOWN
+            or (kafka_status is not None and kafka_status.status is StatusEnum.STATUS_DOWN)
         ):
             return self._errorResponse(
-                data=Health(database=db_status, service=service_status),
+                data=data,
                 http_status=HTTPStatus.SERVICE_UNAVAILABLE,
                 message=HEALTH_CHECK_FAILED,
             )
 
         return self._successResponse(
-            data=Health(database=db_status, service=service_status),
+            data=data,
             http_status=HTTPStatus.OK,
             message=HEALTH_CHECK_SUCCESS,
         )
+
+    async def check_readiness(self):
+        """Cheap probe for load balancers: no I/O, just the lifecycle state"""
+        data = Readiness(
+            ready=readiness.ready,
+            reason=readiness.reason,
+            in_flight=request_tracker.active,
+        )
+        if not readiness.ready:
+            return self._errorResponse(
+                data=data,
+                http_status=HTTPStatus.SERVICE_UNAVAILABLE,
+                message=READINESS_FAILED,
+            )
+
+        return self._successResponse(
+            data=data,
+            http_status=HTTPStatus.OK,
+            message=READINESS_SUCCESS,
+        )
@@ -10,6 +10,11 @@ handlers = [
         "path": "/health-check",
         "endpoint": health_check_operations.check_health,
         "methods": ["GET"]
+    },
+    {
+        "path": "/ready",
+        "endpoint": health_check_operations.check_readiness,
+        "methods": ["GET"]
     }
 ]
 
@@ -0,0 +1,184 @@
+import ipaddress
+import logging
+import time
+from datetime import timezone
+from http import HTTPStatus
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import RedirectResponse
+
+from app.config import settings
+from app.core.cache import NOT_FOUND, redirect_cache
+from app.core.cache_snapshot import redirect_snapshot
+from app.core.click_stream import click_publisher
+from app.core.shared_table import shared_redirects
+from app.messages.global_messages import LINK_EXPIRED, LINK_NOT_FOUND
+from app.services.common.base import BaseOperations
+from app.utils.base_exception import AppException
+
+
+logger = logging.getLogger(__name__)
+
+
+RESOLVE_LINK_QUERY = """
+    SELECT link, expiry_timestamp
+    FROM user_links
+    WHERE short_link = :short_link AND is_active AND deleted_on IS NULL
+"""
+
+# Startup has no click history in memory yet, so warm-up favours the most
+# recently created or edited links; trending links are added once clicks flow
+WARMUP_LINKS_QUERY = """
+    SELECT short_link, link, expiry_timestamp
+    FROM user_links
+    WHERE is_active AND deleted_on IS NULL
+      AND (expiry_timestamp IS NULL OR expiry_timestamp > now() AT TIME ZONE 'utc')
+    ORDER BY COALESCE(updated_on, created_on) DESC NULLS LAST
+    LIMIT :limit
+"""
+
+WARM_LINKS_QUERY = """
+    SELECT short_link, link, expiry_timestamp
+    FROM user_links
+    WHERE short_link = ANY(:short_links) AND is_active AND deleted_on IS NULL
+"""
+
+
+_TRUSTED_PROXIES = [ipaddress.ip_network(proxy, strict=False) for proxy in settings.api.trusted_proxies]
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _TRUSTED_PROXIES)
+
+
+def _client_ip(request: Request) -> Optional[str]:
+    """
+    Address of the client; X-Forwarded-For is only followed through trusted
+    proxies, from the right, since anything left of them is client supplied
+    """
+    peer = request.client.host if request.client else None
+    if peer is None or not _TRUSTED_PROXIES or not _trusted(peer):
+        return peer
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded:
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",")]
+    for hop in reversed(hops):
+        if hop and not _trusted(hop):
+            return hop
+    return hops[0] or peer
+
+
+def _cache_entry(row) -> Tuple[Tuple[str, Optional[float]], float]:
+    """Cache value and TTL for a user_links row; never outlives the link"""
+    expiry = row["expiry_timestamp"]
+    if expiry is not None and expiry.tzinfo is None:
+        # Timestamps are stored as naive UTC
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    expires_at = expiry.timestamp() if expiry is not None else None
+    ttl = redirect_cache.ttl
+    if expires_at is not None:
+        ttl = max(0.0, min(ttl, expires_at - time.time()))
+    return (row["link"], expires_at), ttl
+
+
+def _remember(short_link: str, entry: Tuple[str, Optional[float]], ttl: float):
+    if ttl <= 0:
+        return
+    if shared_redirects is not None and shared_redirects.submit(short_link, entry[0], entry[1], ttl):
+        # Read from the shared table from now on; a private copy in every
+        # worker is what the table is there to avoid
+        return
+    redirect_cache.set(short_link, entry, ttl=ttl)
+
+
+def _cached(short_link: str) -> bool:
+    return short_link in redirect_cache or (
+        shared_redirects is not None and shared_redirects.get(short_link) is not None
+    )
+
+
+class Operations(BaseOperations):
+    # Private Methods
+    async def _resolve(self, short_link: str) -> Tuple[str, Optional[float]]:
+        if shared_redirects is not None:
+            shared = shared_redirects.get(short_link)
+            if shared is not None:
+                return shared
+
+        cached = redirect_cache.get(short_link)
+        if cached is NOT_FOUND:
+            raise AppException(message=LINK_NOT_FOUND, status_code=HTTPStatus.NOT_FOUND)
+        if cached is not None:
+            return cached
+
+        snapshotted = redirect_snapshot.get(short_link)
+        if snapshotted is not None:
+            ttl = min(redirect_cache.ttl, redirect_snapshot.seconds_left())
+            if snapshotted[1] is not None:
+                ttl = min(ttl, snapshotted[1] - time.time())
+            _remember(short_link, snapshotted, ttl)
+            return snapshotted
+
+        row = await self.db_r.fetch_one(query=RESOLVE_LINK_QUERY, values={"short_link": short_link})
+        if row is None:
+            redirect_cache.set(short_link, NOT_FOUND, ttl=settings.cache.redirect_negative_ttl)
+            raise AppException(message=LINK_NOT_FOUND, status_code=HTTPStatus.NOT_FOUND)
+
+        entry, ttl = _cache_entry(row)
+        _remember(short_link, entry, ttl)
+        return entry
+
+    # Public Methods
+    async def redirect(self, short_link: str, request: Request):
+        destination, expires_at = await self._resolve(short_link)
+        if expires_at is not None and expires_at <= time.time():
+            raise AppException(message=LINK_EXPIRED, status_code=HTTPStatus.GONE)
+        if click_publisher.running:
+            headers = request.headers
+            click_publisher.record(
+                short_link,
+                _client_ip(request),
+                headers.get("user-agent"),
+                headers.get("referer"),
+            )
+        return RedirectResponse(url=destination, status_code=HTTPStatus.FOUND)
+
+    async def warm_cache(self, limit: Optional[int] = None) -> int:
+        """
+        Preload the redirect cache before the service reports ready
+
+        Returns:
+            Number of links loaded
+        """
+        rows = await self.db_r.fetch_all(
+            query=WARMUP_LINKS_QUERY,
+            values={"limit": limit or settings.cache.warmup_limit}
+        )
+        for row in rows:
+            entry, ttl = _cache_entry(row)
+            _remember(row["short_link"], entry, ttl)
+        logger.info("Warmed redirect cache with %d links", len(rows))
+        return len(rows)
+
+    async def warm_links(self, short_links: List[str]) -> int:
+        """
+        Load the given links (e.g. trending ones) unless already cached
+
+        Returns:
+            Number of links loaded
+        """
+        missing = [short_link for short_link in short_links if not _cached(short_link)]
+        if not missing:
+            return 0
+        rows = await self.db_r.fetch_all(query=WARM_LINKS_QUERY, values={"short_links": missing})
+        for row in rows:
+            entry, ttl = _cache_entry(row)
+            _remember(row["short_link"], entry, ttl)
+        logger.debug("Loaded %d trending links into the redirect cache", len(rows))
+        return len(rows)
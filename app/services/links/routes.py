@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from app.services.links.operations import Operations as LinkOperations
+
+router = APIRouter()
+link_operations = LinkOperations()
+
+handlers = [
+    {
+        "path": "/r/{short_link}",
+        "endpoint": link_operations.redirect,
+        "methods": ["GET"]
+    }
+]
+
+for route in handlers:
+    router.add_api_route(
+        path=route["path"],
+        endpoint=route["endpoint"],
+        methods=route["methods"]
+    )
@@ -0,0 +1,10 @@
+from fastapi.responses import Response
+
+from app.core.metrics import REGISTRY, CONTENT_TYPE
+from app.services.common.base import BaseOperations
+
+
+class Operations(BaseOperations):
+    # Public Methods
+    async def get_metrics(self):
+        return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
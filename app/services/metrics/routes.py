@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from app.services.metrics.operations import Operations as MetricsOperations
+
+router = APIRouter()
+metrics_operations = MetricsOperations()
+
+handlers = [
+    {
+        "path": "/metrics",
+        "endpoint": metrics_operations.get_metrics,
+        "methods": ["GET"]
+    }
+]
+
+for route in handlers:
+    router.add_api_route(
+        path=route["path"],
+        endpoint=route["endpoint"],
+        methods=route["methods"],
+        include_in_schema=False
+    )
@@ -32,5 +32,5 @@ async def exception_handler(request: Request, exc):
         message=message,
         data=getattr(exc, "data", {}),
     )
-    logger.error("Exception: " + exc.__class__.__name__ + "\nMessage: " + message)
+    logger.error("Exception: %s\nMessage: %s", exc.__class__.__name__, message)
     return JSONResponse(status_code=response.status_code, content=dict(response))
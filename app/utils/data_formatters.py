@@ -1,4 +1,4 @@
-from typing import Any, List, Dict
+from typing import Any, AsyncIterator, List, Dict, Optional
 
 
 class DataFormatter:
@@ -9,3 +9,13 @@ class DataFormatter:
     @staticmethod
     def query_result_dict(data: Any) -> Dict:
         return dict(data._mapping)
+
+    @staticmethod
+    async def iterate_result_dicts(db: Any, query: str, values: Optional[dict] = None) -> AsyncIterator[Dict]:
+        """
+        Lazy counterpart of query_result_list: rows are fetched through
+        `db.iterate()` and converted one at a time, so memory stays flat
+        however large the result is
+        """
+        async for row in db.iterate(query=query, values=values):
+            yield dict(row._mapping)
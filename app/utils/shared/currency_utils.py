@@ -1,5 +1,5 @@
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, Optional, Union
+from typing import Dict, Iterable, List, Optional, Union
 from enum import Enum
 import re
 
@@ -47,6 +47,9 @@ class CurrencyCode(str, Enum):
     ILS = "ILS"
 
 
+Amount = Union[int, float, Decimal, str]
+
+
 class CurrencyInfo:
     """Currency information class"""
     def __init__(self, code: str, name: str, symbol: str, decimal_places: int = 2):
@@ -54,6 +57,19 @@ class CurrencyInfo:
         self.name = name
         self.symbol = symbol
         self.decimal_places = decimal_places
+        # Precomputed once so the hot paths don't rebuild them per call
+        self.quantizer = Decimal(1).scaleb(-decimal_places)
+        self.multiplier = Decimal(10) ** decimal_places
+        self.format_spec = f",.{decimal_places}f"
+
+
+def _to_decimal(amount: Amount) -> Decimal:
+    """Decimal for an amount; floats go through str() to keep their shortest repr"""
+    if isinstance(amount, Decimal):
+        return amount
+    if isinstance(amount, int):
+        return Decimal(amount)
+    return Decimal(str(amount)) if isinstance(amount, float) else Decimal(amount)
 
 
 class CurrencyUtil:
@@ -102,15 +118,28 @@ class CurrencyUtil:
         "ILS": CurrencyInfo("ILS", "Israeli Shekel", "₪", 2),
     }
     
+    # CURRENCY_INFO keyed by upper and lower case codes, filled in below
+    _LOOKUP: Dict[str, CurrencyInfo] = {}
+
     @staticmethod
     def is_valid_currency_code(currency_code: str) -> bool:
         """Check if a currency code is valid"""
-        return currency_code.upper() in CurrencyUtil.CURRENCY_INFO
+        return CurrencyUtil.get_currency_info(currency_code) is not None
     
     @staticmethod
     def get_currency_info(currency_code: str) -> Optional[CurrencyInfo]:
         """Get currency information by code"""
-        return CurrencyUtil.CURRENCY_INFO.get(currency_code.upper())
+        info = CurrencyUtil._LOOKUP.get(currency_code)
+        if info is None:
+            info = CurrencyUtil.CURRENCY_INFO.get(currency_code.upper())
+        return info
+
+    @staticmethod
+    def _require_info(currency_code: str) -> CurrencyInfo:
+        info = CurrencyUtil.get_currency_info(currency_code)
+        if not info:
+            raise ValueError(f"Invalid currency code: {currency_code}")
+        return info
     
     @staticmethod
     def get_currency_symbol(currency_code: str) -> str:
@@ -132,45 +161,43 @@ class CurrencyUtil:
     
     @staticmethod
     def format_amount(
-        amount: Union[int, float, Decimal, str],
+        amount: Amount,
         currency_code: str,
         show_symbol: bool = True,
         show_code: bool = False,
         locale: str = "en_US"
     ) -> str:
         """Format currency amount with proper decimal places and symbol"""
-        # Convert to Decimal for precise calculations
-        if isinstance(amount, str):
-            amount = Decimal(amount)
-        elif isinstance(amount, (int, float)):
-            amount = Decimal(str(amount))
-        
-        # Get currency info
-        info = CurrencyUtil.get_currency_info(currency_code)
-        if not info:
-            raise ValueError(f"Invalid currency code: {currency_code}")
-        
+        info = CurrencyUtil._require_info(currency_code)
+
         # Round to appropriate decimal places
-        decimal_places = info.decimal_places
-        quantized_amount = amount.quantize(
-            Decimal('0.1') ** decimal_places,
-            rounding=ROUND_HALF_UP
-        )
-        
-        # Format the amount
-        if decimal_places == 0:
-            formatted_amount = f"{quantized_amount:,.0f}"
-        else:
-            formatted_amount = f"{quantized_amount:,.{decimal_places}f}"
-        
+        quantized_amount = _to_decimal(amount).quantize(info.quantizer, rounding=ROUND_HALF_UP)
+        result = format(quantized_amount, info.format_spec)
+
         # Add symbol and/or code
-        result = formatted_amount
         if show_symbol:
             result = f"{info.symbol}{result}"
         if show_code:
             result = f"{result} {info.code}"
         
         return result
+
+    @staticmethod
+    def format_amounts(
+        amounts: Iterable[Amount],
+        currency_code: str,
+        show_symbol: bool = True,
+        show_code: bool = False
+    ) -> List[str]:
+        """Format many amounts of one currency; same output as format_amount"""
+        info = CurrencyUtil._require_info(currency_code)
+        quantizer, spec = info.quantizer, info.format_spec
+        prefix = info.symbol if show_symbol else ""
+        suffix = f" {info.code}" if show_code else ""
+        return [
+            f"{prefix}{format(_to_decimal(amount).quantize(quantizer, rounding=ROUND_HALF_UP), spec)}{suffix}"
+            for amount in amounts
+        ]
     
     @staticmethod
     def parse_amount(amount_str: str, currency_code: str) -> Decimal:
@@ -193,61 +220,57 @@ class CurrencyUtil:
             raise ValueError(f"Invalid amount format: {amount_str}") from e
     
     @staticmethod
-    def convert_to_minor_units(amount: Union[int, float, Decimal, str], currency_code: str) -> int:
+    def convert_to_minor_units(amount: Amount, currency_code: str) -> int:
         """Convert currency amount to minor units (cents, paise, etc.)"""
-        # Convert to Decimal
-        if isinstance(amount, str):
-            amount = Decimal(amount)
-        elif isinstance(amount, (int, float)):
-            amount = Decimal(str(amount))
-        
-        # Get decimal places
-        decimal_places = CurrencyUtil.get_decimal_places(currency_code)
-        
-        # Convert to minor units
-        multiplier = Decimal('10') ** decimal_places
-        return int(amount * multiplier)
+        return int(_to_decimal(amount) * CurrencyUtil.get_currency_multiplier(currency_code))
+
+    @staticmethod
+    def to_minor_units_many(amounts: Iterable[Amount], currency_code: str) -> List[int]:
+        """convert_to_minor_units for a whole list of amounts in one currency"""
+        multiplier = CurrencyUtil.get_currency_multiplier(currency_code)
+        return [int(_to_decimal(amount) * multiplier) for amount in amounts]
     
     @staticmethod
     def convert_from_minor_units(minor_units: int, currency_code: str) -> Decimal:
         """Convert minor units to currency amount"""
-        decimal_places = CurrencyUtil.get_decimal_places(currency_code)
-        divisor = Decimal('10') ** decimal_places
-        return Decimal(minor_units) / divisor
+        return Decimal(minor_units) / CurrencyUtil.get_currency_multiplier(currency_code)
+
+    @staticmethod
+    def get_currency_multiplier(currency_code: str) -> Decimal:
+        """10 ** decimal places; unknown codes default to 2 places"""
+        info = CurrencyUtil.get_currency_info(currency_code)
+        return info.multiplier if info else _DEFAULT_MULTIPLIER
+
+    @staticmethod
+    def compare_amounts(amount1: Amount, amount2: Amount, currency_code: str) -> int:
+        """Compare two amounts at the currency's precision: -1, 0 or 1"""
+        info = CurrencyUtil.get_currency_info(currency_code)
+        quantizer = info.quantizer if info else _DEFAULT_QUANTIZER
+        first = _to_decimal(amount1).quantize(quantizer, rounding=ROUND_HALF_UP)
+        second = _to_decimal(amount2).quantize(quantizer, rounding=ROUND_HALF_UP)
+        return (first > second) - (first < second)
     
     @staticmethod
-    def is_zero_amount(amount: Union[int, float, Decimal, str], currency_code: str) -> bool:
+    def is_zero_amount(amount: Amount, currency_code: str) -> bool:
         """Check if amount is zero considering currency precision"""
         return CurrencyUtil.compare_amounts(amount, 0, currency_code) == 0
     
     @staticmethod
-    def is_positive_amount(amount: Union[int, float, Decimal, str], currency_code: str) -> bool:
+    def is_positive_amount(amount: Amount, currency_code: str) -> bool:
         """Check if amount is positive considering currency precision"""
         return CurrencyUtil.compare_amounts(amount, 0, currency_code) > 0
     
     @staticmethod
-    def is_negative_amount(amount: Union[int, float, Decimal, str], currency_code: str) -> bool:
+    def is_negative_amount(amount: Amount, currency_code: str) -> bool:
         """Check if amount is negative considering currency precision"""
         return CurrencyUtil.compare_amounts(amount, 0, currency_code) < 0
     
     @staticmethod
-    def get_absolute_amount(amount: Union[int, float, Decimal, str], currency_code: str) -> Decimal:
+    def get_absolute_amount(amount: Amount, currency_code: str) -> Decimal:
         """Get absolute value of currency amount"""
-        # Convert to Decimal
-        if isinstance(amount, str):
-            amount = Decimal(amount)
-        elif isinstance(amount, (int, float)):
-            amount = Decimal(str(amount))
-        
-        # Get absolute value
-        result = abs(amount)
-        
-        # Round to appropriate decimal places
-        decimal_places = CurrencyUtil.get_decimal_places(currency_code)
-        return result.quantize(
-            Decimal('0.1') ** decimal_places,
-            rounding=ROUND_HALF_UP
-        )
+        info = CurrencyUtil.get_currency_info(currency_code)
+        quantizer = info.quantizer if info else _DEFAULT_QUANTIZER
+        return abs(_to_decimal(amount)).quantize(quantizer, rounding=ROUND_HALF_UP)
     
     @staticmethod
     def validate_amount(amount: Union[int, float, Decimal, str], 
@@ -256,11 +279,7 @@ class CurrencyUtil:
                        max_amount: Optional[Union[int, float, Decimal, str]] = None) -> bool:
         """Validate currency amount within optional min/max bounds"""
         try:
-            # Convert to Decimal
-            if isinstance(amount, str):
-                amount = Decimal(amount)
-            elif isinstance(amount, (int, float)):
-                amount = Decimal(str(amount))
+            amount = _to_decimal(amount)
             
             # Check if currency is valid
             if not CurrencyUtil.is_valid_currency_code(currency_code):
@@ -291,6 +310,13 @@ class CurrencyUtil:
         return list(CurrencyUtil.CURRENCY_INFO.keys())
 
 
+_DEFAULT_QUANTIZER = Decimal("0.01")
+_DEFAULT_MULTIPLIER = Decimal(100)
+
+for _code, _info in CurrencyUtil.CURRENCY_INFO.items():
+    CurrencyUtil._LOOKUP[_code] = CurrencyUtil._LOOKUP[_code.lower()] = _info
+
+
 # Quick helper functions
 def format_currency(amount: Union[int, float, Decimal, str], currency_code: str) -> str:
     """Quick currency formatting"""
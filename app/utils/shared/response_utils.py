@@ -6,6 +6,8 @@ from pydantic import BaseModel, Field, ConfigDict
 from enum import Enum
 import json
 
+from app.core.request_timing import timed_phase
+
 
 class ResponseStatus(str, Enum):
     
@@ -45,15 +47,16 @@ class ResponseUtil:
     ) -> JSONResponse:
         
         try:
-            # Convert to dict and handle datetime serialization
-            content_dict = response_data.model_dump(exclude_none=True)
-            content_str = json.dumps(content_dict, default=ResponseUtil._serialize_datetime)
-            content = json.loads(content_str)
-            
-            return JSONResponse(
-                status_code=status_code,
-                content=content
-            )
+            with timed_phase("serialize"):
+                # Convert to dict and handle datetime serialization
+                content_dict = response_data.model_dump(exclude_none=True)
+                content_str = json.dumps(content_dict, default=ResponseUtil._serialize_datetime)
+                content = json.loads(content_str)
+
+                return JSONResponse(
+                    status_code=status_code,
+                    content=content
+                )
         except Exception:
             # Fallback response for serialization errors
             fallback_response = {
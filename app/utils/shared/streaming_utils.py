@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from contextlib import aclosing
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
+
+from fastapi import status
+from fastapi.responses import StreamingResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Bytes buffered before a chunk is handed to the server
+CHUNK_SIZE = 64 * 1024
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+class StreamingUtil:
+
+    @staticmethod
+    def encode(obj: Any) -> str:
+        return json.dumps(obj, default=_default, separators=(",", ":"))
+
+    @staticmethod
+    async def json_envelope(
+        items: AsyncIterator[Any],
+        head: Dict[str, Any],
+        tail: Optional[Callable[[int], Dict[str, Any]]] = None,
+        chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Encode `{**head, "data": [items...], **tail(count)}` incrementally
+
+        Items are encoded as they arrive and flushed every `chunk_size`
+        bytes, so memory use doesn't grow with the number of items. `tail`
+        is called once the items are exhausted, e.g. to report the count.
+        """
+        encode = StreamingUtil.encode
+        buffer = ["{"]
+        for key, value in head.items():
+            buffer.append(f"{encode(key)}:{encode(value)},")
+        buffer.append('"data":[')
+        size = 0
+        count = 0
+
+        async with aclosing(items):
+            async for item in items:
+                encoded = encode(item)
+                buffer.append(f",{encoded}" if count else encoded)
+                count += 1
+                size += len(encoded)
+                if size >= chunk_size:
+                    yield "".join(buffer).encode("utf-8")
+                    buffer.clear()
+                    size = 0
+
+        buffer.append("]")
+        for key, value in (tail(count) if tail else {}).items():
+            buffer.append(f",{encode(key)}:{encode(value)}")
+        buffer.append("}")
+        yield "".join(buffer).encode("utf-8")
+
+    @staticmethod
+    async def ndjson_lines(items: AsyncIterator[Dict], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """One JSON object per line, flushed every `chunk_size` bytes"""
+        encode = StreamingUtil.encode
+        buffer = []
+        size = 0
+        async with aclosing(items):
+            async for item in items:
+                line = encode(item)
+                buffer.append(line)
+                size += len(line) + 1
+                if size >= chunk_size:
+                    buffer.append("")
+                    yield "\n".join(buffer).encode("utf-8")
+                    buffer.clear()
+                    size = 0
+        if buffer:
+            buffer.append("")
+            yield "\n".join(buffer).encode("utf-8")
+
+    @staticmethod
+    async def csv_rows(
+        items: AsyncIterator[Dict],
+        columns: Sequence[str],
+        chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """CSV with a header row, flushed every `chunk_size` bytes"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        async with aclosing(items):
+            async for item in items:
+                writer.writerow([
+                    value.isoformat() if isinstance(value, (datetime, date)) else value
+                    for value in (item.get(column) for column in columns)
+                ])
+                if buffer.tell() >= chunk_size:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    async def gzipped(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+        """Compress a byte stream on the fly into a single gzip member"""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                compressed = compressor.compress(chunk)
+                if compressed:
+                    yield compressed
+        yield compressor.flush()
+
+    @staticmethod
+    def json_response(
+        items: AsyncIterator[Any],
+        head: Dict[str, Any],
+        tail: Optional[Callable[[int], Dict[str, Any]]] = None,
+        status_code: int = status.HTTP_200_OK
+    ) -> StreamingResponse:
+        """
+        StreamingResponse for a JSON object whose "data" array is streamed
+
+        The status code is sent before the first item is read; an error
+        mid-stream can only cut the body short, which clients see as
+        invalid JSON.
+        """
+        return StreamingResponse(
+            StreamingUtil._logged(StreamingUtil.json_envelope(items, head, tail)),
+            status_code=status_code,
+            media_type="application/json"
+        )
+
+    @staticmethod
+    async def _logged(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        try:
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    yield chunk
+        except Exception:
+            logger.exception("Streaming response failed mid-body")
+            raise
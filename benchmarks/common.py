@@ -0,0 +1,91 @@
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of latencies given in seconds, reported in ms"""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    """What the numbers were measured on, so runs can be compared fairly"""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=False
+        ).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: str, payload: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf8") as results_file:
+        json.dump(payload, results_file, indent=2, sort_keys=True)
+        results_file.write("\n")
+
+
+def compare_results(
+        current: Dict[str, Dict[str, float]],
+        baseline: Dict[str, Dict[str, float]],
+        metric: str,
+        threshold: float,
+        higher_is_better: bool = False
+) -> List[str]:
+    """
+    Compare two {case: {metric: value}} maps
+
+    Returns:
+        One line per case that regressed by more than `threshold` (a fraction)
+    """
+    regressions = []
+    for case, values in sorted(current.items()):
+        before = baseline.get(case, {}).get(metric)
+        after = values.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regressed = change < -threshold if higher_is_better else change > threshold
+        marker = "REGRESSION" if regressed else "ok"
+        print(f"  {case:<40} {metric} {before:>12.4f} -> {after:>12.4f} ({change:+.1%}) {marker}")
+        if regressed:
+            regressions.append(case)
+    return regressions
+
+
+def load_results(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not path:
+        return None
+    with open(path, encoding="utf8") as results_file:
+        return json.load(results_file)
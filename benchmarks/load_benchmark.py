@@ -0,0 +1,417 @@
+"""
+End-to-end load benchmark for the FastAPI app, run in process
+
+The app is driven through its ASGI interface (no sockets), so the numbers
+measure routing, middleware, handlers, serialization and the database
+round trips, not the HTTP server.
+
+Usage:
+    python -m benchmarks.load_benchmark --fake-db --concurrency 32 --duration 20
+    python -m benchmarks.load_benchmark --concurrency 64 --links 50000 \\
+        --output benchmarks/results/load.json --compare benchmarks/results/baseline.json
+
+Without --fake-db the database configured in .env.db is used (run
+`alembic upgrade head` first); seeded rows are removed afterwards unless
+--keep-data is given.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from benchmarks.common import (
+    compare_results,
+    environment_info,
+    latency_summary,
+    load_results,
+    write_results,
+)
+
+
+BENCH_EMAIL = "bench@shortify.local"
+BENCH_PREFIX = "bench-"
+
+
+class Scenario:
+    def __init__(
+            self,
+            name: str,
+            method: str,
+            path: Callable[[random.Random], str],
+            weight: int = 1,
+            body: Optional[Callable[[random.Random], bytes]] = None
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.weight = weight
+        self.body = body
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+
+
+def build_scenarios(args) -> List[Scenario]:
+    def code(rng: random.Random) -> str:
+        # Zipf-like skew: most traffic goes to a small hot set, like real links
+        index = min(args.links - 1, int(rng.paretovariate(1.2)) - 1)
+        return f"{BENCH_PREFIX}{index:08d}"
+
+    def link_body(rng: random.Random) -> bytes:
+        return f'{{"link": "https://example.com/{rng.getrandbits(64):x}"}}'.encode()
+
+    return [
+        Scenario("redirect", "GET", lambda rng: args.redirect_path.format(code=code(rng)), weight=args.redirect_weight),
+        Scenario("create", "POST", lambda rng: args.create_path, weight=args.create_weight, body=link_body),
+        Scenario(
+            "list", "GET",
+            lambda rng: args.list_path.format(page=rng.randint(1, max(1, args.links // 20))),
+            weight=args.list_weight
+        ),
+        Scenario("health", "GET", lambda rng: args.health_path, weight=args.health_weight),
+    ]
+
+
+# In-process ASGI driver
+
+class ASGIDriver:
+    def __init__(self, app):
+        self.app = app
+        self._lifespan_task: Optional[asyncio.Task] = None
+        self._lifespan_queue: asyncio.Queue = asyncio.Queue()
+        self._lifespan_events: asyncio.Queue = asyncio.Queue()
+
+    async def startup(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(
+            self.app(scope, self._lifespan_queue.get, self._lifespan_events.put)
+        )
+        await self._lifespan_queue.put({"type": "lifespan.startup"})
+        event = await self._lifespan_events.get()
+        if event["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"App startup failed: {event.get('message')}")
+
+    async def shutdown(self):
+        if self._lifespan_task is None:
+            return
+        await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+        await self._lifespan_events.get()
+        await self._lifespan_task
+
+    def has_route(self, method: str, path: str) -> bool:
+        from starlette.routing import Match
+
+        scope = self._scope(method, path)
+        return any(route.matches(scope)[0] == Match.FULL for route in self.app.routes)
+
+    @staticmethod
+    def _scope(method: str, target: str, body: bytes = b"") -> Dict[str, Any]:
+        parts = urlsplit(target)
+        headers = [(b"host", b"bench"), (b"user-agent", b"shortify-bench")]
+        if body:
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+            "state": {},
+        }
+
+    async def request(self, method: str, target: str, body: bytes = b"") -> int:
+        scope = self._scope(method, target, body)
+        sent_body = False
+        status = 0
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await self.app(scope, receive, send)
+        return status
+
+
+# Fake database: answers every query from an in-memory data set after a
+# configurable delay, behind the real InstrumentedDatabase wrapper
+
+class FakeRecord(Mapping):
+    def __init__(self, values: Dict[str, Any]):
+        self._values = values
+
+    @property
+    def _mapping(self):
+        return self
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._values.values())[key]
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+
+def install_fake_db(links: int, latency: float):
+    import databases
+
+    now = datetime.utcnow()
+    rows = {
+        f"{BENCH_PREFIX}{index:08d}": {
+            "id": index + 1,
+            "user_id": 1,
+            "link": f"https://example.com/{index}",
+            "short_link": f"{BENCH_PREFIX}{index:08d}",
+            "is_active": True,
+            "expiry_timestamp": None,
+            "created_on": now,
+            "updated_on": now,
+            "deleted_on": None,
+            "clicks": links - index,
+        }
+        for index in range(links)
+    }
+    ordered = list(rows.values())
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def noop(self, *args, **kwargs):
+        return None
+
+    async def fetch_one(self, query, values=None):
+        await delay()
+        for value in (values or {}).values():
+            if isinstance(value, str) and value in rows:
+                return FakeRecord(rows[value])
+        return FakeRecord(ordered[0]) if ordered else None
+
+    async def fetch_all(self, query, values=None):
+        await delay()
+        values = values or {}
+        limit = int(values.get("limit", 20))
+        offset = int(values.get("offset", 0))
+        return [FakeRecord(row) for row in ordered[offset:offset + limit]]
+
+    async def fetch_val(self, query, values=None, column=0):
+        await delay()
+        return len(ordered)
+
+    async def execute(self, query, values=None):
+        await delay()
+        return len(ordered) + 1
+
+    async def execute_many(self, query, values):
+        await delay()
+
+    async def iterate(self, query, values=None):
+        for row in await fetch_all(self, query, values):
+            yield row
+
+    @asynccontextmanager
+    async def transaction(self, *args, **kwargs):
+        yield
+
+    databases.Database.connect = noop
+    databases.Database.disconnect = noop
+    databases.Database.fetch_one = fetch_one
+    databases.Database.fetch_all = fetch_all
+    databases.Database.fetch_val = fetch_val
+    databases.Database.execute = execute
+    databases.Database.execute_many = execute_many
+    databases.Database.iterate = iterate
+    databases.Database.transaction = transaction
+
+
+async def seed_database(links: int):
+    from app.core.db_session import database_w
+
+    now = datetime.utcnow()
+    user_id = await database_w.fetch_val(
+        query='SELECT user_id FROM "user" WHERE email = :email', values={"email": BENCH_EMAIL}
+    )
+    if user_id is None:
+        user_id = await database_w.fetch_val(
+            query='INSERT INTO "user" (email, password, is_active, created_on) '
+                  'VALUES (:email, :password, true, :now) RETURNING user_id',
+            values={"email": BENCH_EMAIL, "password": "!", "now": now}
+        )
+    await database_w.execute(
+        query="DELETE FROM user_links WHERE short_link LIKE :prefix", values={"prefix": f"{BENCH_PREFIX}%"}
+    )
+    batch = 5000
+    for start in range(0, links, batch):
+        await database_w.execute_many(
+            query="INSERT INTO user_links (user_id, link, short_link, is_active, created_on) "
+                  "VALUES (:user_id, :link, :short_link, true, :now)",
+            values=[
+                {
+                    "user_id": user_id,
+                    "link": f"https://example.com/{index}",
+                    "short_link": f"{BENCH_PREFIX}{index:08d}",
+                    "now": now,
+                }
+                for index in range(start, min(links, start + batch))
+            ]
+        )
+
+
+async def cleanup_database():
+    from app.core.db_session import database_w
+
+    await database_w.execute(
+        query="DELETE FROM user_links WHERE short_link LIKE :prefix", values={"prefix": f"{BENCH_PREFIX}%"}
+    )
+
+
+async def run_load(driver: ASGIDriver, scenarios: List[Scenario], args) -> float:
+    weighted = [scenario for scenario in scenarios for _ in range(scenario.weight)]
+    deadline_warmup = time.perf_counter() + args.warmup
+    deadline = deadline_warmup + args.duration
+
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            scenario = rng.choice(weighted)
+            body = scenario.body(rng) if scenario.body else b""
+            start = time.perf_counter()
+            try:
+                status = await driver.request(scenario.method, scenario.path(rng), body)
+            except Exception:
+                status = 0
+            elapsed = time.perf_counter() - start
+            if start < deadline_warmup:
+                continue
+            scenario.latencies.append(elapsed)
+            scenario.statuses[status] = scenario.statuses.get(status, 0) + 1
+            if status == 0 or status >= 500:
+                scenario.errors += 1
+
+    await asyncio.gather(*(worker(args.seed + index) for index in range(args.concurrency)))
+    return args.duration
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="In-process load benchmark for the Shortify API")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before")
+    parser.add_argument("--links", type=int, default=10000, help="synthetic links to seed")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--fake-db", action="store_true", help="serve queries from memory")
+    parser.add_argument("--fake-db-latency", type=float, default=0.0005, help="seconds per fake query")
+    parser.add_argument("--keep-data", action="store_true", help="keep seeded rows in the real database")
+    parser.add_argument("--redirect-path", default="/v1/r/{code}")
+    parser.add_argument("--create-path", default="/v1/links")
+    parser.add_argument("--list-path", default="/v1/links?page={page}&per_page=20")
+    parser.add_argument("--health-path", default="/v1/health-check")
+    parser.add_argument("--redirect-weight", type=int, default=8)
+    parser.add_argument("--create-weight", type=int, default=1)
+    parser.add_argument("--list-weight", type=int, default=1)
+    parser.add_argument("--health-weight", type=int, default=1)
+    parser.add_argument("--output", default=None, help="results JSON path")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p99 regression (fraction)")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.fake_db:
+        install_fake_db(args.links, args.fake_db_latency)
+
+    from app.main import app
+
+    driver = ASGIDriver(app)
+    await driver.startup()
+    try:
+        if not args.fake_db:
+            await seed_database(args.links)
+
+        scenarios = []
+        for scenario in build_scenarios(args):
+            probe = scenario.path(random.Random(0))
+            if scenario.weight <= 0:
+                continue
+            if not driver.has_route(scenario.method, probe):
+                print(f"skipping {scenario.name}: no route for {scenario.method} {probe}")
+                continue
+            scenarios.append(scenario)
+        if not scenarios:
+            print("nothing to benchmark")
+            return 1
+
+        print(f"running {', '.join(s.name for s in scenarios)} at concurrency {args.concurrency} "
+              f"for {args.duration}s (+{args.warmup}s warm-up)")
+        elapsed = await run_load(driver, scenarios, args)
+    finally:
+        if not args.fake_db and not args.keep_data:
+            await cleanup_database()
+        await driver.shutdown()
+
+    results = {}
+    print(f"\n{'scenario':<12}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for scenario in scenarios:
+        summary = latency_summary(scenario.latencies)
+        results[scenario.name] = {
+            "requests": len(scenario.latencies),
+            "rps": round(len(scenario.latencies) / elapsed, 2),
+            "errors": scenario.errors,
+            "statuses": {str(code): count for code, count in scenario.statuses.items()},
+            **summary,
+        }
+        row = results[scenario.name]
+        print(f"{scenario.name:<12}{row['requests']:>10}{row['rps']:>10.1f}{row['p50_ms']:>10.2f}"
+              f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['errors']:>8}")
+
+    payload = {
+        "benchmark": "load",
+        "environment": environment_info(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"load-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    write_results(output, payload)
+    print(f"\nresults written to {output}")
+
+    baseline = load_results(args.compare)
+    if baseline:
+        print(f"\ncomparing p99 against {args.compare}")
+        if compare_results(results, baseline["results"], "p99_ms", args.threshold):
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,507 @@
+"""
+Microbenchmarks for the shared utility modules
+
+Every case times one hot call over a realistic batch. Each case is warmed
+up, the loop count is calibrated so a repeat lasts at least --min-time, and
+the fastest and median of --repeat repeats are reported per item, with GC
+disabled while timing.
+
+Usage:
+    python -m benchmarks.micro_benchmark
+    python -m benchmarks.micro_benchmark -k currency --output run.json --compare baseline.json
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from benchmarks.common import compare_results, environment_info, load_results, write_results
+
+
+class Case:
+    def __init__(self, name: str, batch: int, setup: Callable[[], Callable[[], object]]):
+        self.name = name
+        self.batch = batch
+        self.setup = setup
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, batch: int):
+    """Register `setup`; it prepares the data and returns the callable to time"""
+    def register(setup):
+        CASES.append(Case(name, batch, setup))
+        return setup
+    return register
+
+
+def _rng() -> random.Random:
+    return random.Random(42)
+
+
+def _amounts(count: int) -> List[float]:
+    rng = _rng()
+    return [round(rng.uniform(0, 5000), 2) for _ in range(count)]
+
+
+def _timestamps(count: int) -> List[int]:
+    rng = _rng()
+    base = 1_700_000_000
+    return [base + rng.randrange(0, 90 * 86400) for _ in range(count)]
+
+
+# CurrencyUtil
+
+@case("currency.format_amount[pricing page]", batch=3 * 39)
+def bench_format_amount():
+    from app.utils.shared.currency_utils import CurrencyUtil
+
+    codes = CurrencyUtil.get_currency_codes()
+    prices = [(amount, code) for code in codes for amount in (0, 9.99, 99.0)]
+
+    def run():
+        for amount, code in prices:
+            CurrencyUtil.format_amount(amount, code)
+    return run
+
+
+@case("currency.format_amount[invoice list]", batch=500)
+def bench_format_invoices():
+    from app.utils.shared.currency_utils import CurrencyUtil
+
+    amounts = _amounts(500)
+
+    def run():
+        for amount in amounts:
+            CurrencyUtil.format_amount(amount, "usd", show_code=True)
+    return run
+
+
+@case("currency.convert_to_minor_units", batch=1000)
+def bench_minor_units():
+    from app.utils.shared.currency_utils import CurrencyUtil
+
+    amounts = _amounts(1000)
+
+    def run():
+        for amount in amounts:
+            CurrencyUtil.convert_to_minor_units(amount, "INR")
+    return run
+
+
+@case("currency.parse_amount", batch=500)
+def bench_parse_amount():
+    from app.utils.shared.currency_utils import CurrencyUtil
+
+    texts = [f"${amount:,.2f}" for amount in _amounts(500)]
+
+    def run():
+        for text in texts:
+            CurrencyUtil.parse_amount(text, "USD")
+    return run
+
+
+@case("currency.format_amounts[invoice list]", batch=500)
+def bench_format_amounts():
+    from app.utils.shared.currency_utils import CurrencyUtil
+
+    amounts = _amounts(500)
+
+    def run():
+        CurrencyUtil.format_amounts(amounts, "usd", show_code=True)
+    return run
+
+
+@case("currency.to_minor_units_many", batch=1000)
+def bench_minor_units_many():
+    from app.utils.shared.currency_utils import CurrencyUtil
+
+    amounts = _amounts(1000)
+
+    def run():
+        CurrencyUtil.to_minor_units_many(amounts, "INR")
+    return run
+
+
+@case("currency.compare_amounts", batch=1000)
+def bench_compare_amounts():
+    from app.utils.shared.currency_utils import CurrencyUtil
+
+    amounts = _amounts(1000)
+    pairs = list(zip(amounts, reversed(amounts)))
+
+    def run():
+        for first, second in pairs:
+            CurrencyUtil.compare_amounts(first, second, "USD")
+    return run
+
+
+# DateTimeUtil
+
+@case("datetime.from_timestamp", batch=10000)
+def bench_from_timestamp():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    timestamps = _timestamps(10000)
+
+    def run():
+        for timestamp in timestamps:
+            DateTimeUtil.from_timestamp(timestamp)
+    return run
+
+
+@case("datetime.from_iso_format", batch=10000)
+def bench_from_iso():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    texts = [datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z") for ts in _timestamps(10000)]
+
+    def run():
+        for text in texts:
+            DateTimeUtil.from_iso_format(text)
+    return run
+
+
+@case("datetime.parse_datetime", batch=10000)
+def bench_parse_datetime():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    texts = [datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S") for ts in _timestamps(10000)]
+
+    def run():
+        for text in texts:
+            DateTimeUtil.parse_datetime(text)
+    return run
+
+
+@case("datetime.format_datetime", batch=10000)
+def bench_format_datetime():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    values = [datetime.fromtimestamp(ts, timezone.utc) for ts in _timestamps(10000)]
+
+    def run():
+        for value in values:
+            DateTimeUtil.format_datetime(value)
+    return run
+
+
+@case("datetime.format_relative_time", batch=1000)
+def bench_relative_time():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    now = datetime(2026, 1, 1)
+    values = [now - timedelta(seconds=offset) for offset in _timestamps(1000)]
+
+    def run():
+        for value in values:
+            DateTimeUtil.format_relative_time(value, now)
+    return run
+
+
+@case("datetime.from_timestamps", batch=10000)
+def bench_from_timestamps():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    timestamps = _timestamps(10000)
+
+    def run():
+        DateTimeUtil.from_timestamps(timestamps)
+    return run
+
+
+@case("datetime.from_iso_formats", batch=10000)
+def bench_from_isos():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    texts = [datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z") for ts in _timestamps(10000)]
+
+    def run():
+        DateTimeUtil.from_iso_formats(texts)
+    return run
+
+
+@case("datetime.parse_datetimes", batch=10000)
+def bench_parse_datetimes():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    texts = [datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S") for ts in _timestamps(10000)]
+
+    def run():
+        DateTimeUtil.parse_datetimes(texts)
+    return run
+
+
+@case("datetime.truncate_timestamps[hour]", batch=10000)
+def bench_truncate_timestamps():
+    from app.utils.shared.datetime_utils import DateTimeUtil
+
+    timestamps = _timestamps(10000)
+
+    def run():
+        DateTimeUtil.truncate_timestamps(timestamps, "hour")
+    return run
+
+
+# ResponseUtil / DataFormatter
+
+def _link_rows(count: int) -> List[Dict[str, object]]:
+    created = datetime(2026, 1, 1)
+    return [
+        {
+            "id": index,
+            "user_id": 7,
+            "link": f"https://example.com/some/long/path/{index}?utm_source=newsletter",
+            "short_link": f"s{index:07d}",
+            "is_active": True,
+            "expiry_timestamp": None,
+            "created_on": created + timedelta(minutes=index),
+            "updated_on": created,
+        }
+        for index in range(count)
+    ]
+
+
+@case("response.success[20 links]", batch=1)
+def bench_response_success():
+    from app.utils.shared.response_utils import ResponseUtil
+
+    rows = _link_rows(20)
+
+    def run():
+        ResponseUtil.success(data=rows)
+    return run
+
+
+@case("response.paginated_response[100 links]", batch=1)
+def bench_response_paginated():
+    from app.utils.shared.response_utils import ResponseUtil
+
+    rows = _link_rows(100)
+
+    def run():
+        ResponseUtil.paginated_response(rows, total=10000, page=3, per_page=100)
+    return run
+
+
+class _Row:
+    __slots__ = ("_mapping",)
+
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+
+@case("data_formatter.query_result_list[1000 rows]", batch=1000)
+def bench_query_result_list():
+    from app.utils.data_formatters import DataFormatter
+
+    rows = [_Row(row) for row in _link_rows(1000)]
+
+    def run():
+        DataFormatter.query_result_list(rows)
+    return run
+
+
+@case("streaming.json_envelope[1000 links]", batch=1000)
+def bench_json_envelope():
+    import asyncio
+
+    from app.utils.shared.streaming_utils import StreamingUtil
+
+    rows = _link_rows(1000)
+    loop = asyncio.new_event_loop()
+
+    async def items():
+        for row in rows:
+            yield row
+
+    async def drain():
+        async for _ in StreamingUtil.json_envelope(items(), {"success": True}):
+            pass
+
+    def run():
+        loop.run_until_complete(drain())
+    return run
+
+
+# Click analytics
+
+@case("geoip.country[200k ranges]", batch=10000)
+def bench_geoip_country():
+    import tempfile
+
+    from app.core.geoip import GeoDatabase, build_database
+
+    rng = _rng()
+    rows, address = [], 0
+    for _ in range(200000):
+        address += rng.randint(1, 10000)
+        end = address + rng.randint(0, 10000)
+        rows.append((str(address), str(end), rng.choice(("US", "IN", "DE", "BR"))))
+        address = end
+    path = os.path.join(tempfile.mkdtemp(), "geoip.bin")
+    build_database(rows, path)
+    database = GeoDatabase(path)
+    ips = [".".join(str(rng.randrange(256)) for _ in range(4)) for _ in range(10000)]
+
+    def run():
+        for ip in ips:
+            database.country(ip)
+    return run
+
+
+@case("click_classifier.classify_batch[2000 clicks]", batch=2000)
+def bench_classify_batch():
+    from app.core.click_classifier import classify_batch
+
+    agents = [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "Version/17.0 Mobile/15E148 Safari/604.1",
+        "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    ]
+    referrers = ["https://www.google.com/", "https://t.co/abc", None, "https://news.ycombinator.com/item?id=1"]
+    rng = _rng()
+    batch_agents = [rng.choice(agents) for _ in range(2000)]
+    batch_referrers = [rng.choice(referrers) for _ in range(2000)]
+
+    def run():
+        classify_batch(batch_agents, batch_referrers)
+    return run
+
+
+@case("hyperloglog.merged[30 daily sketches]", batch=30)
+def bench_hyperloglog_merged():
+    from app.core.hyperloglog import HyperLogLog
+
+    rng = _rng()
+    sketches = []
+    for _ in range(30):
+        sketch = HyperLogLog()
+        sketch.update(str(rng.randrange(200000)) for _ in range(rng.choice((50, 500, 5000))))
+        sketches.append(sketch.to_bytes())
+
+    def run():
+        HyperLogLog.merged(sketches).count()
+    return run
+
+
+@case("trending.record[2000 clicks]", batch=2000)
+def bench_trending_record():
+    from app.core.trending import TrendingTracker
+
+    rng = _rng()
+    links = [f"link{index}" for index in range(20000)]
+    weights = [1 / (index + 1) for index in range(len(links))]
+    now = time.time()
+    clicks = [(link, now - rng.random() * 300) for link in rng.choices(links, weights, k=2000)]
+    tracker = TrendingTracker(slice_seconds=60, window_slices=60, capacity=2000, max_top=100)
+
+    def run():
+        tracker.record(clicks)
+    return run
+
+
+# Runner
+
+def _time_once(run: Callable[[], object], loops: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(loops):
+        run()
+    return (time.perf_counter_ns() - start) / loops
+
+
+def measure(bench: Case, repeat: int, min_time: float, warmup: float) -> Dict[str, float]:
+    run = bench.setup()
+
+    # Warm up caches, lazy imports and the allocator
+    deadline = time.perf_counter() + warmup
+    while time.perf_counter() < deadline:
+        run()
+
+    # Calibrate the loop count so one repeat lasts at least min_time
+    loops = 1
+    while True:
+        elapsed = _time_once(run, loops) * loops / 1e9
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        timings = [_time_once(run, loops) for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    best = min(timings)
+    median = statistics.median(timings)
+    return {
+        "batch": bench.batch,
+        "loops": loops,
+        "best_call_us": round(best / 1000, 3),
+        "median_call_us": round(median / 1000, 3),
+        "per_item_ns": round(best / bench.batch, 2),
+        "items_per_sec": round(bench.batch / (best / 1e9)),
+        "spread": round((max(timings) - best) / best, 4) if best else 0.0,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the shared utilities")
+    parser.add_argument("-k", dest="keyword", default=None, help="only run cases containing this text")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--warmup", type=float, default=0.3, help="seconds of warm-up per case")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    parser.add_argument("--output", default=None, help="results JSON path")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (fraction)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    selected = [bench for bench in CASES if not args.keyword or args.keyword in bench.name]
+    if args.list:
+        for bench in selected:
+            print(bench.name)
+        return 0
+
+    results = {}
+    print(f"{'case':<48}{'batch':>7}{'best us':>12}{'median us':>12}{'ns/item':>12}{'spread':>9}")
+    for bench in selected:
+        row = measure(bench, args.repeat, args.min_time, args.warmup)
+        results[bench.name] = row
+        print(f"{bench.name:<48}{row['batch']:>7}{row['best_call_us']:>12.1f}{row['median_call_us']:>12.1f}"
+              f"{row['per_item_ns']:>12.1f}{row['spread']:>9.1%}")
+
+    payload = {
+        "benchmark": "micro",
+        "environment": environment_info(),
+        "parameters": {"repeat": args.repeat, "min_time": args.min_time, "warmup": args.warmup},
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"micro-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    write_results(output, payload)
+    print(f"\nresults written to {output}")
+
+    baseline = load_results(args.compare)
+    if baseline:
+        print(f"\ncomparing per-item time against {args.compare}")
+        if compare_results(results, baseline["results"], "per_item_ns", args.threshold):
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())